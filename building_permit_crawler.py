@@ -1,14 +1,32 @@
 import requests
-from bs4 import BeautifulSoup
 import time
 import random
 import logging
 from datetime import datetime, date
 import re
 import os
+import sys
 from dotenv import load_dotenv
 from database_manager import DatabaseManager
 
+# 與 oci/ 爬蟲共用失敗重試佇列
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'oci'))
+from retry_queue import RetryQueue
+import permit_parser
+
+# 資料庫欄位 -> permit_parser 的 (區塊, 標籤)
+DB_COLUMN_FIELDS = [
+    ('designer_name', ('設計人', '姓名')),
+    ('designer_company', ('設計人', '事務所')),
+    ('supervisor_name', ('監造人', '姓名')),
+    ('supervisor_company', ('監造人', '事務所')),
+    ('contractor_name', ('承造人', '姓名')),
+    ('contractor_company', ('承造人', '營造廠')),
+    ('engineer_name', ('承造人', '專任工程人員')),
+    ('site_city', ('基地概要', '地址')),
+    ('site_zone', ('基地概要', '使用分區')),
+]
+
 load_dotenv()
 
 class BuildingPermitCrawler:
@@ -33,6 +51,9 @@ class BuildingPermitCrawler:
         self.delay_min = int(os.getenv('DELAY_MIN', 1))
         self.delay_max = int(os.getenv('DELAY_MAX', 3))
         
+        # 失敗的 INDEX_KEY 排入延遲重試佇列，不在爬取迴圈中原地重試
+        self.retry_queue = RetryQueue(os.getenv('RETRY_QUEUE_FILE', 'retry-queue.json'))
+        
         # 統計資料
         self.total_crawled = 0
         self.new_records = 0
@@ -59,37 +80,38 @@ class BuildingPermitCrawler:
             'version': version
         }
     
-    def fetch_page_with_retry(self, index_key, max_retries=3):
-        """獲取頁面內容，包含重試機制"""
+    def fetch_page(self, index_key):
+        """獲取頁面內容（需要重新整理兩次），不原地重試
+
+        Returns:
+            response、"NO_DATA"（查無資料），或 None（失敗，由呼叫端排入重試佇列）
+        """
         url = f"{self.base_url}?INDEX_KEY={index_key}"
         
-        for attempt in range(max_retries):
-            try:
-                # 根據用戶提到的需要重新整理兩次的情況
-                for refresh_count in range(2):
-                    response = self.session.get(url, timeout=30)
-                    time.sleep(random.uniform(0.5, 1.5))
-                
-                if response.status_code == 200:
-                    # 檢查是否為正常頁面
-                    if '建築執照號碼' in response.text or '○○○代表遺失個資歡迎' in response.text:
-                        return response
-                    else:
-                        logging.warning(f"頁面內容異常，INDEX_KEY: {index_key}")
-                        
-            except Exception as e:
-                logging.error(f"獲取頁面時發生錯誤 (嘗試 {attempt + 1}/{max_retries}): {e}")
+        try:
+            # 根據用戶提到的需要重新整理兩次的情況
+            for refresh_count in range(2):
+                response = self.session.get(url, timeout=30)
+                time.sleep(random.uniform(0.5, 1.5))
+            
+            if response.status_code == 200:
+                # 檢查是否為正常頁面
+                if '查無任何資訊' in response.text:
+                    return "NO_DATA"
+                if any(mark in response.text for mark in ('建造執照號碼', '建築執照號碼', '○○○代表遺失個資歡迎')):
+                    return response
+                logging.warning(f"頁面內容異常，INDEX_KEY: {index_key}")
+            else:
+                logging.warning(f"HTTP {response.status_code}，INDEX_KEY: {index_key}")
                 
-            if attempt < max_retries - 1:
-                time.sleep(random.uniform(2, 5))
+        except Exception as e:
+            logging.error(f"獲取頁面時發生錯誤: {e}")
         
         return None
     
     def parse_permit_data(self, html_content, index_key):
-        """解析建照資料"""
+        """解析建照資料（共用的 permit_parser），轉成資料庫欄位"""
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
             # 檢查是否為有效的建照頁面
             if '○○○代表遺失個資歡迎' in html_content:
                 logging.info(f"INDEX_KEY {index_key}: 包含遺失個資訊息，跳過")
@@ -100,89 +122,29 @@ class BuildingPermitCrawler:
             if not key_info:
                 return None
             
+            permit = permit_parser.parse_permit(html_content, index_key)
+            if not permit:
+                logging.warning(f"INDEX_KEY {index_key}: 未找到建照號碼")
+                return None
+            
+            values = permit_parser.extract_values(html_content)
+            
             permit_data = {
-                'permit_number': None,
+                'permit_number': permit['permitNumber'],
                 'permit_year': key_info['year'],
                 'permit_type': key_info['permit_type'],
                 'sequence_number': key_info['sequence'],
                 'version_number': key_info['version'],
-                'applicant_name': None,
-                'designer_name': None,
-                'designer_company': None,
-                'supervisor_name': None,
-                'supervisor_company': None,
-                'contractor_name': None,
-                'contractor_company': None,
-                'engineer_name': None,
-                'site_address': None,
-                'site_city': None,
-                'site_zone': None,
-                'site_area': None,
+                'applicant_name': permit.get('applicantName'),
                 'crawled_at': datetime.now()
             }
+            for column, key in DB_COLUMN_FIELDS:
+                permit_data[column] = values.get(key) or None
+            permit_data['site_address'] = permit.get('siteAddress')
             
-            # 尋找表格資料
-            tables = soup.find_all('table')
-            
-            for table in tables:
-                rows = table.find_all('tr')
-                
-                for row in rows:
-                    cells = row.find_all(['td', 'th'])
-                    if len(cells) >= 2:
-                        label = cells[0].get_text(strip=True)
-                        
-                        if '建造執照號碼' in label:
-                            permit_data['permit_number'] = cells[1].get_text(strip=True)
-                        
-                        elif '起造人' in label and len(cells) >= 3:
-                            if '姓名' in cells[1].get_text(strip=True):
-                                permit_data['applicant_name'] = cells[2].get_text(strip=True)
-                        
-                        elif '設計人' in label and len(cells) >= 4:
-                            if '姓名' in cells[1].get_text(strip=True):
-                                permit_data['designer_name'] = cells[2].get_text(strip=True)
-                            if '事務所' in cells[3].get_text(strip=True) and len(cells) >= 5:
-                                permit_data['designer_company'] = cells[4].get_text(strip=True)
-                        
-                        elif '監造人' in label and len(cells) >= 4:
-                            if '姓名' in cells[1].get_text(strip=True):
-                                permit_data['supervisor_name'] = cells[2].get_text(strip=True)
-                            if '事務所' in cells[3].get_text(strip=True) and len(cells) >= 5:
-                                permit_data['supervisor_company'] = cells[4].get_text(strip=True)
-                        
-                        elif '承造人' in label and len(cells) >= 4:
-                            if '姓名' in cells[1].get_text(strip=True):
-                                permit_data['contractor_name'] = cells[2].get_text(strip=True)
-                            if len(cells) >= 5:
-                                permit_data['contractor_company'] = cells[4].get_text(strip=True)
-                        
-                        elif '專任工程人員' in label:
-                            permit_data['engineer_name'] = cells[1].get_text(strip=True)
-                        
-                        elif '地號' in label:
-                            permit_data['site_address'] = cells[1].get_text(strip=True)
-                        
-                        elif '地址' in label:
-                            permit_data['site_city'] = cells[1].get_text(strip=True)
-                        
-                        elif '使用分區' in label:
-                            permit_data['site_zone'] = cells[1].get_text(strip=True)
-                        
-                        elif '基地面積' in label and len(cells) >= 4:
-                            area_text = cells[3].get_text(strip=True)
-                            # 提取數字部分
-                            area_match = re.search(r'([\d.]+)', area_text)
-                            if area_match:
-                                try:
-                                    permit_data['site_area'] = float(area_match.group(1))
-                                except ValueError:
-                                    pass
-            
-            # 檢查是否有必要資料
-            if not permit_data['permit_number']:
-                logging.warning(f"INDEX_KEY {index_key}: 未找到建照號碼")
-                return None
+            # 基地面積取合計的數字部分
+            area_match = re.match(r'([\d.]+)', values.get(('基地概要', '合計'), ''))
+            permit_data['site_area'] = float(area_match.group(1)) if area_match else None
             
             return permit_data
             
@@ -194,11 +156,16 @@ class BuildingPermitCrawler:
         """爬取單一建照資料"""
         try:
             # 獲取頁面
-            response = self.fetch_page_with_retry(index_key)
+            response = self.fetch_page(index_key)
             if not response:
-                logging.error(f"無法獲取頁面: INDEX_KEY {index_key}")
+                logging.error(f"無法獲取頁面，排入重試佇列: INDEX_KEY {index_key}")
+                self.retry_queue.fail(index_key, "fetch failed")
                 self.error_records += 1
                 return False
+            self.retry_queue.succeed(index_key)
+            if response == "NO_DATA":
+                logging.info(f"INDEX_KEY {index_key}: 查無資料")
+                return False
             
             # 解析資料
             permit_data = self.parse_permit_data(response.text, index_key)
@@ -254,6 +221,15 @@ class BuildingPermitCrawler:
         
         logging.info(f"完成爬取 {year} 年資料，連續失敗 {max_consecutive_failures} 次後停止")
     
+    def retry_due(self):
+        """重試退避時間已到的失敗 INDEX_KEY（再次失敗會依退避時間重新排入）"""
+        due = self.retry_queue.due()
+        if due:
+            logging.info(f"重試 {len(due)} 筆先前失敗的 INDEX_KEY")
+        for index_key in due:
+            self.crawl_single_permit(index_key)
+            time.sleep(random.uniform(self.delay_min, self.delay_max))
+    
     def daily_crawl(self):
         """每日爬蟲執行"""
         crawl_date = date.today()
@@ -280,6 +256,7 @@ class BuildingPermitCrawler:
             
             # 開始爬取
             self.crawl_year_permits(current_year, self.crawl_type, start_sequence)
+            self.retry_due()
             
             # 更新爬蟲記錄
             self.db_manager.update_crawl_log(
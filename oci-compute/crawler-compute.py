@@ -3,16 +3,18 @@
 台中市建照爬蟲 - OCI Compute Instance 版本
 每日自動爬取新的建照資料並上傳到 OCI Object Storage
 """
-import json
 import logging
 import os
 import subprocess
+import sys
 import time
 from datetime import datetime
 from pathlib import Path
 
-import oci
-from oci.object_storage import ObjectStorageClient
+# 共用模組在 oci/（部署到 Compute Instance 時與本檔放在同一目錄）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'oci'))
+from object_storage import open_storage
+import permit_parser
 
 # 設定日誌
 logging.basicConfig(
@@ -31,41 +33,27 @@ BUCKET_NAME = "taichung-building-permits"
 
 class OCIStorage:
     def __init__(self):
-        # 使用 Instance Principal 認證
-        try:
-            signer = oci.auth.signers.InstancePrincipalsSecurityTokenSigner()
-            self.object_storage = ObjectStorageClient(config={}, signer=signer)
-            logger.info("使用 Instance Principal 認證")
-        except Exception:
-            # 如果 Instance Principal 失敗，使用預設設定檔
-            config = oci.config.from_file()
-            self.object_storage = ObjectStorageClient(config)
-            logger.info("使用設定檔認證")
+        # 共用的物件儲存（設定檔認證，沒有 ~/.oci/config 時使用 Instance Principal）
+        self.object_storage = open_storage(NAMESPACE, BUCKET_NAME)
     
     def get_json_object(self, object_name):
         """從 OCI 讀取 JSON 物件"""
         try:
-            response = self.object_storage.get_object(NAMESPACE, BUCKET_NAME, object_name)
-            return json.loads(response.data.content.decode('utf-8'))
-        except Exception as e:
+            data = self.object_storage.get_json(object_name)
+            if data is None:
+                logger.error(f"讀取物件失敗 {object_name}")
+            return data
+        except ValueError as e:
             logger.error(f"讀取物件失敗 {object_name}: {str(e)}")
             return None
     
     def put_json_object(self, object_name, data):
         """寫入 JSON 物件到 OCI"""
-        try:
-            json_data = json.dumps(data, ensure_ascii=False, indent=2)
-            self.object_storage.put_object(
-                NAMESPACE, 
-                BUCKET_NAME, 
-                object_name,
-                json_data.encode('utf-8')
-            )
+        if self.object_storage.put_json(object_name, data, indent=2):
             logger.info(f"成功寫入 {object_name}")
             return True
-        except Exception as e:
-            logger.error(f"寫入物件失敗 {object_name}: {str(e)}")
-            return False
+        logger.error(f"寫入物件失敗 {object_name}")
+        return False
     
     def get_current_progress(self):
         """取得目前爬取進度"""
@@ -154,85 +142,13 @@ class BuildingPermitCrawler:
             return None
     
     def parse_permit_data(self, html_content, index_key):
-        """解析建照資料"""
+        """解析建照資料（共用的 permit_parser）"""
         try:
-            import re
-            
             # 檢查是否包含遺失個資
             if '○○○代表遺失個資' in html_content:
                 return "NO_DATA"
             
-            permit_data = {
-                'indexKey': index_key,
-                'permitYear': int(index_key[0:3]),
-                'permitType': int(index_key[3:4]),
-                'sequenceNumber': int(index_key[4:9]),
-                'versionNumber': int(index_key[9:11]),
-                'crawledAt': datetime.now().isoformat()
-            }
-            
-            # 建照號碼
-            match = re.search(r'建造執照號碼[：:]\s*([^\s<]+)', html_content)
-            if not match:
-                match = re.search(r'建築執照號碼[：:]\s*([^\s<]+)', html_content)
-            if match:
-                permit_data['permitNumber'] = match.group(1).strip()
-            else:
-                return None
-            
-            # 申請人
-            match = re.search(r'起造人[^>]*姓名[^>]*>([^<]+)', html_content)
-            if match:
-                permit_data['applicantName'] = match.group(1).strip()
-            
-            # 地址
-            match = re.search(r'地號[^>]*>([^<]+)', html_content)
-            if not match:
-                match = re.search(r'地址[^>]*>([^<]+)', html_content)
-            if match:
-                permit_data['siteAddress'] = match.group(1).strip()
-            
-            # 行政區
-            if permit_data.get('siteAddress'):
-                district_match = re.search(r'臺中市([^區]+區)', permit_data['siteAddress'])
-                if district_match:
-                    permit_data['district'] = district_match.group(1)
-            
-            # 樓層資訊
-            match = re.search(r'地上.*?層.*?棟.*?戶|地上.*?層.*?幢.*?棟.*?戶', html_content)
-            if match:
-                permit_data['floorInfo'] = match.group(0)
-                
-                floor_match = re.search(r'地上(\d+)層', match.group(0))
-                if floor_match:
-                    permit_data['floorsAbove'] = int(floor_match.group(1))
-                    permit_data['floors'] = int(floor_match.group(1))
-                
-                building_match = re.search(r'(\d+)棟', match.group(0))
-                if building_match:
-                    permit_data['buildingCount'] = int(building_match.group(1))
-                    permit_data['buildings'] = int(building_match.group(1))
-                
-                unit_match = re.search(r'(\d+)戶', match.group(0))
-                if unit_match:
-                    permit_data['unitCount'] = int(unit_match.group(1))
-                    permit_data['units'] = int(unit_match.group(1))
-            
-            # 總樓地板面積
-            match = re.search(r'總樓地板面積.*?<span[^>]*>([0-9.,]+)', html_content)
-            if match:
-                permit_data['totalFloorArea'] = float(match.group(1).replace(',', ''))
-            
-            # 發照日期
-            match = re.search(r'發照日期.*?(\d{3})/(\d{2})/(\d{2})', html_content)
-            if match:
-                year = int(match.group(1))
-                month = int(match.group(2))
-                day = int(match.group(3))
-                permit_data['issueDate'] = f"{year + 1911}-{month:02d}-{day:02d}"
-                permit_data['issueDateROC'] = f"{match.group(1)}/{match.group(2)}/{match.group(3)}"
-            
-            return permit_data
+            return permit_parser.parse_permit(html_content, index_key)
             
         except Exception as e:
             logger.error(f'解析錯誤: {str(e)}')
@@ -2,16 +2,17 @@
 """
 修正版爬蟲 - 解決 session 問題
 """
-import json
 import logging
 import subprocess
+import sys
 import time
-from datetime import datetime
 import os
 from pathlib import Path
 
-import oci
-from oci.object_storage import ObjectStorageClient
+# 共用模組在 oci/（部署到 Compute Instance 時與本檔放在同一目錄）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'oci'))
+from object_storage import open_storage
+import permit_parser
 
 # 設定日誌
 logging.basicConfig(
@@ -112,10 +113,8 @@ def fetch_permit_with_session(index_key):
         return None
 
 def parse_permit_data(html_content, index_key):
-    """解析建照資料"""
+    """解析建照資料（共用的 permit_parser）"""
     try:
-        import re
-        
         # 檢查是否是查詢首頁
         if '建築執照存根查詢系統' in html_content and 'queryInfoAction.do' in html_content:
             logger.warning("這是查詢首頁，不是建照資料")
@@ -125,78 +124,11 @@ def parse_permit_data(html_content, index_key):
         if '○○○代表遺失個資' in html_content:
             return "NO_DATA"
         
-        permit_data = {
-            'indexKey': index_key,
-            'permitYear': int(index_key[0:3]),
-            'permitType': int(index_key[3:4]),
-            'sequenceNumber': int(index_key[4:9]),
-            'versionNumber': int(index_key[9:11]),
-            'crawledAt': datetime.now().isoformat()
-        }
-        
-        # 建照號碼
-        match = re.search(r'建造執照號碼[：:]\s*([^\s<]+)', html_content)
-        if not match:
-            match = re.search(r'建築執照號碼[：:]\s*([^\s<]+)', html_content)
-        if match:
-            permit_data['permitNumber'] = match.group(1).strip()
+        permit_data = permit_parser.parse_permit(html_content, index_key)
+        if permit_data:
             logger.info(f"找到建照號碼: {permit_data['permitNumber']}")
         else:
             logger.warning("未找到建照號碼")
-            return None
-        
-        # 申請人
-        match = re.search(r'起造人[^>]*姓名[^>]*>([^<]+)', html_content)
-        if match:
-            permit_data['applicantName'] = match.group(1).strip()
-        
-        # 地址
-        match = re.search(r'地號[^>]*>([^<]+)', html_content)
-        if not match:
-            match = re.search(r'地址[^>]*>([^<]+)', html_content)
-        if match:
-            permit_data['siteAddress'] = match.group(1).strip()
-        
-        # 行政區
-        if permit_data.get('siteAddress'):
-            district_match = re.search(r'臺中市([^區]+區)', permit_data['siteAddress'])
-            if district_match:
-                permit_data['district'] = district_match.group(1)
-        
-        # 樓層資訊
-        match = re.search(r'地上.*?層.*?棟.*?戶|地上.*?層.*?幢.*?棟.*?戶', html_content)
-        if match:
-            permit_data['floorInfo'] = match.group(0)
-            
-            floor_match = re.search(r'地上(\d+)層', match.group(0))
-            if floor_match:
-                permit_data['floorsAbove'] = int(floor_match.group(1))
-                permit_data['floors'] = int(floor_match.group(1))
-            
-            building_match = re.search(r'(\d+)棟', match.group(0))
-            if building_match:
-                permit_data['buildingCount'] = int(building_match.group(1))
-                permit_data['buildings'] = int(building_match.group(1))
-            
-            unit_match = re.search(r'(\d+)戶', match.group(0))
-            if unit_match:
-                permit_data['unitCount'] = int(unit_match.group(1))
-                permit_data['units'] = int(unit_match.group(1))
-        
-        # 總樓地板面積
-        match = re.search(r'總樓地板面積.*?<span[^>]*>([0-9.,]+)', html_content)
-        if match:
-            permit_data['totalFloorArea'] = float(match.group(1).replace(',', ''))
-        
-        # 發照日期
-        match = re.search(r'發照日期.*?(\d{3})/(\d{2})/(\d{2})', html_content)
-        if match:
-            year = int(match.group(1))
-            month = int(match.group(2))
-            day = int(match.group(3))
-            permit_data['issueDate'] = f"{year + 1911}-{month:02d}-{day:02d}"
-            permit_data['issueDateROC'] = f"{match.group(1)}/{match.group(2)}/{match.group(3)}"
-        
         return permit_data
         
     except Exception as e:
@@ -226,12 +158,13 @@ def test_crawl_1138():
 def upload_to_oci(permit_data):
     """上傳到 OCI"""
     try:
-        signer = oci.auth.signers.InstancePrincipalsSecurityTokenSigner()
-        client = ObjectStorageClient(config={}, signer=signer)
+        storage = open_storage(NAMESPACE, BUCKET_NAME)
         
         # 讀取現有資料
-        response = client.get_object(NAMESPACE, BUCKET_NAME, 'data/permits.json')
-        data = json.loads(response.data.content.decode('utf-8'))
+        data = storage.get_json('data/permits.json')
+        if data is None:
+            logger.error("讀取 data/permits.json 失敗")
+            return False
         
         # 新增資料
         data['permits'].append(permit_data)
@@ -249,13 +182,9 @@ def upload_to_oci(permit_data):
         data['yearCounts'] = year_counts
         
         # 上傳回 OCI
-        json_data = json.dumps(data, ensure_ascii=False, indent=2)
-        client.put_object(
-            NAMESPACE,
-            BUCKET_NAME,
-            'data/permits.json',
-            json_data.encode('utf-8')
-        )
+        if not storage.put_json('data/permits.json', data, indent=2):
+            logger.error("上傳失敗")
+            return False
         
         logger.info("✅ 成功上傳到 OCI")
         return True
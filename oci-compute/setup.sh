@@ -28,8 +28,8 @@ echo "📁 建立工作目錄..."
 mkdir -p /home/ubuntu/crawler
 cd /home/ubuntu/crawler
 
-# 複製爬蟲程式（請手動上傳 crawler-compute.py）
-echo "⚠️ 請將 crawler-compute.py 上傳到 /home/ubuntu/crawler/"
+# 複製爬蟲程式（請手動上傳 crawler-compute.py 與共用模組 oci/object_storage.py、oci/permit_parser.py）
+echo "⚠️ 請將 crawler-compute.py、object_storage.py、permit_parser.py 上傳到 /home/ubuntu/crawler/"
 
 # 設定 OCI CLI（如果使用設定檔認證）
 echo "🔧 設定 OCI CLI..."
@@ -84,7 +84,7 @@ chmod +x /home/ubuntu/test_crawler.sh
 echo "✅ 設定完成！"
 echo ""
 echo "下一步："
-echo "1. 上傳 crawler-compute.py 到 /home/ubuntu/crawler/"
+echo "1. 上傳 crawler-compute.py、object_storage.py、permit_parser.py 到 /home/ubuntu/crawler/"
 echo "2. 設定 OCI 認證（Instance Principal 或設定檔）"
 echo "3. 執行 /home/ubuntu/test_crawler.sh 測試連線"
 echo "4. 執行 /home/ubuntu/run_crawler.sh 手動執行爬蟲"
@@ -2,15 +2,16 @@
 """
 簡單爬蟲 - 使用重新整理技巧
 """
-import json
 import logging
 import subprocess
+import sys
 import time
-from datetime import datetime
 import os
 
-import oci
-from oci.object_storage import ObjectStorageClient
+# 共用模組在 oci/（部署到 Compute Instance 時與本檔放在同一目錄）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'oci'))
+from object_storage import open_storage
+import permit_parser
 
 # 設定日誌
 logging.basicConfig(
@@ -88,10 +89,8 @@ def fetch_permit_simple(index_key):
         return None
 
 def parse_permit_data(html_content, index_key):
-    """解析建照資料"""
+    """解析建照資料（共用的 permit_parser）"""
     try:
-        import re
-        
         # 檢查是否包含遺失個資
         if '○○○代表遺失個資' in html_content:
             return "NO_DATA"
@@ -101,56 +100,11 @@ def parse_permit_data(html_content, index_key):
             logger.warning("還是查詢首頁")
             return None
         
-        permit_data = {
-            'indexKey': index_key,
-            'permitYear': int(index_key[0:3]),
-            'permitType': int(index_key[3:4]),
-            'sequenceNumber': int(index_key[4:9]),
-            'versionNumber': int(index_key[9:11]),
-            'crawledAt': datetime.now().isoformat()
-        }
-        
-        # 建照號碼 - 多種模式
-        patterns = [
-            r'建造執照號碼[：:]\s*([^\s<]+)',
-            r'建築執照號碼[：:]\s*([^\s<]+)',
-            r'(114中都建字第\d+號)',
-            r'(113中都建字第\d+號)',
-            r'(112中都建字第\d+號)'
-        ]
-        
-        permit_number = None
-        for pattern in patterns:
-            match = re.search(pattern, html_content)
-            if match:
-                permit_number = match.group(1).strip()
-                break
-        
-        if permit_number:
-            permit_data['permitNumber'] = permit_number
-            logger.info(f"找到建照號碼: {permit_number}")
+        permit_data = permit_parser.parse_permit(html_content, index_key)
+        if permit_data:
+            logger.info(f"找到建照號碼: {permit_data['permitNumber']}")
         else:
             logger.warning("未找到建照號碼")
-            return None
-        
-        # 申請人
-        match = re.search(r'起造人[^>]*姓名[^>]*>([^<]+)', html_content)
-        if match:
-            permit_data['applicantName'] = match.group(1).strip()
-        
-        # 地址
-        match = re.search(r'地號[^>]*>([^<]+)', html_content)
-        if not match:
-            match = re.search(r'地址[^>]*>([^<]+)', html_content)
-        if match:
-            permit_data['siteAddress'] = match.group(1).strip()
-        
-        # 行政區
-        if permit_data.get('siteAddress'):
-            district_match = re.search(r'臺中市([^區]+區)', permit_data['siteAddress'])
-            if district_match:
-                permit_data['district'] = district_match.group(1)
-        
         return permit_data
         
     except Exception as e:
@@ -160,12 +114,13 @@ def parse_permit_data(html_content, index_key):
 def upload_to_oci(permit_data):
     """上傳到 OCI"""
     try:
-        signer = oci.auth.signers.InstancePrincipalsSecurityTokenSigner()
-        client = ObjectStorageClient(config={}, signer=signer)
+        storage = open_storage(NAMESPACE, BUCKET_NAME)
         
         # 讀取現有資料
-        response = client.get_object(NAMESPACE, BUCKET_NAME, 'data/permits.json')
-        data = json.loads(response.data.content.decode('utf-8'))
+        data = storage.get_json('data/permits.json')
+        if data is None:
+            logger.error("讀取 data/permits.json 失敗")
+            return False
         
         # 檢查是否已存在
         existing_keys = {p.get('indexKey') for p in data.get('permits', []) if isinstance(p, dict)}
@@ -187,13 +142,9 @@ def upload_to_oci(permit_data):
             data['yearCounts'] = year_counts
             
             # 上傳回 OCI
-            json_data = json.dumps(data, ensure_ascii=False, indent=2)
-            client.put_object(
-                NAMESPACE,
-                BUCKET_NAME,
-                'data/permits.json',
-                json_data.encode('utf-8')
-            )
+            if not storage.put_json('data/permits.json', data, indent=2):
+                logger.error("上傳失敗")
+                return False
             
             logger.info("✅ 成功上傳新資料到 OCI")
             return True
@@ -2,12 +2,14 @@
 """
 7:50 測試腳本 - 寫入測試資料到網頁
 """
-import json
 import logging
+import os
+import sys
 from datetime import datetime
 
-import oci
-from oci.object_storage import ObjectStorageClient
+# 共用模組在 oci/（部署到 Compute Instance 時與本檔放在同一目錄）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'oci'))
+from object_storage import open_storage
 
 # 設定日誌
 logging.basicConfig(
@@ -22,25 +24,16 @@ BUCKET_NAME = "taichung-building-permits"
 
 class OCIStorage:
     def __init__(self):
-        # 使用 Instance Principal 認證
-        signer = oci.auth.signers.InstancePrincipalsSecurityTokenSigner()
-        self.object_storage = ObjectStorageClient(config={}, signer=signer)
-        logger.info("使用 Instance Principal 認證")
+        # 共用的物件儲存（設定檔認證，沒有 ~/.oci/config 時使用 Instance Principal）
+        self.object_storage = open_storage(NAMESPACE, BUCKET_NAME)
     
     def put_object(self, object_name, content):
         """寫入物件到 OCI"""
-        try:
-            self.object_storage.put_object(
-                NAMESPACE, 
-                BUCKET_NAME, 
-                object_name,
-                content.encode('utf-8')
-            )
+        if self.object_storage.put_bytes(object_name, content.encode('utf-8'), 'text/html; charset=utf-8'):
             logger.info(f"成功寫入 {object_name}")
             return True
-        except Exception as e:
-            logger.error(f"寫入物件失敗 {object_name}: {str(e)}")
-            return False
+        logger.error(f"寫入物件失敗 {object_name}")
+        return False
 
 def create_test_page():
     """建立測試頁面"""
@@ -2,13 +2,15 @@
 """
 8:30 測試腳本 - 爬取序號 1138 並寫入網頁
 """
-import json
 import logging
+import os
 import subprocess
+import sys
 from datetime import datetime
 
-import oci
-from oci.object_storage import ObjectStorageClient
+# 共用模組在 oci/（部署到 Compute Instance 時與本檔放在同一目錄）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'oci'))
+from object_storage import open_storage
 
 # 設定日誌
 logging.basicConfig(
@@ -23,49 +25,35 @@ BUCKET_NAME = "taichung-building-permits"
 
 class OCIStorage:
     def __init__(self):
-        signer = oci.auth.signers.InstancePrincipalsSecurityTokenSigner()
-        self.object_storage = ObjectStorageClient(config={}, signer=signer)
-        logger.info("使用 Instance Principal 認證")
+        # 共用的物件儲存（設定檔認證，沒有 ~/.oci/config 時使用 Instance Principal）
+        self.object_storage = open_storage(NAMESPACE, BUCKET_NAME)
     
     def get_json_object(self, object_name):
         """從 OCI 讀取 JSON 物件"""
         try:
-            response = self.object_storage.get_object(NAMESPACE, BUCKET_NAME, object_name)
-            return json.loads(response.data.content.decode('utf-8'))
-        except Exception as e:
+            data = self.object_storage.get_json(object_name)
+            if data is None:
+                logger.error(f"讀取物件失敗 {object_name}")
+            return data
+        except ValueError as e:
             logger.error(f"讀取物件失敗 {object_name}: {str(e)}")
             return None
     
     def put_json_object(self, object_name, data):
         """寫入 JSON 物件到 OCI"""
-        try:
-            json_data = json.dumps(data, ensure_ascii=False, indent=2)
-            self.object_storage.put_object(
-                NAMESPACE, 
-                BUCKET_NAME, 
-                object_name,
-                json_data.encode('utf-8')
-            )
+        if self.object_storage.put_json(object_name, data, indent=2):
             logger.info(f"成功寫入 {object_name}")
             return True
-        except Exception as e:
-            logger.error(f"寫入物件失敗 {object_name}: {str(e)}")
-            return False
+        logger.error(f"寫入物件失敗 {object_name}")
+        return False
     
     def put_object(self, object_name, content):
         """寫入物件到 OCI"""
-        try:
-            self.object_storage.put_object(
-                NAMESPACE, 
-                BUCKET_NAME, 
-                object_name,
-                content.encode('utf-8')
-            )
+        if self.object_storage.put_bytes(object_name, content.encode('utf-8'), 'text/html; charset=utf-8'):
             logger.info(f"成功寫入 {object_name}")
             return True
-        except Exception as e:
-            logger.error(f"寫入物件失敗 {object_name}: {str(e)}")
-            return False
+        logger.error(f"寫入物件失敗 {object_name}")
+        return False
 
 def crawl_1138():
     """爬取序號 1138"""
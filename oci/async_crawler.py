@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+非同步爬取引擎 - 有上限的並行度
+策略：
+1. 同時保持 N 個 INDEX_KEY 在途，取代手動複製 worker_N.py 切分範圍
+2. 請求節奏由共用的 AIMD 控制 (crawl_pacer) 決定，max_rps 為上限，所有執行緒與其他爬蟲行程共用
+3. 結果可能亂序完成，但依序號順序記錄，自動停止規則（連續20無資料、連續5失敗）不變
+4. 批次上傳在背景執行緒進行，不阻塞派工
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from permit_fetcher import PermitFetcher
+
+
+class AsyncCrawlEngine:
+    def __init__(self, crawler, concurrency=8, max_rps=4.0):
+        self.crawler = crawler
+        self.concurrency = concurrency
+        self.max_rps = max_rps
+        self.pacer = crawler.pacer
+        self.pacer.max_rps = max_rps
+        # 所有執行緒共用一個 session 池：每個請求借出一個 session（cookie 不會同時被兩個請求使用），
+        # 已暖機的 session 跨 INDEX_KEY 重用；兩次請求之間不再固定 sleep，由共用的節奏控制決定
+        self.fetcher = PermitFetcher(
+            crawler.base_url,
+            timeout=crawler.timeout,
+            request_delay=0,
+            pool_size=1,
+            pacer=self.pacer,
+            sessions=concurrency
+        )
+
+    def _crawl_one(self, index_key):
+        return self.crawler.crawl_single_permit(index_key, fetcher=self.fetcher)
+
+    def run(self, year, start_seq, end_seq=None, auto_stop=False):
+        asyncio.run(self.crawl_year_range(year, start_seq, end_seq, auto_stop))
+
+    async def crawl_year_range(self, year, start_seq, end_seq=None, auto_stop=False):
+        """爬取指定年份範圍，參數語意與 OptimizedCrawler.crawl_year_range 相同"""
+        crawler = self.crawler
+        if end_seq:
+            print(f"🚀 開始非同步爬取 {year} 年資料 ({start_seq:05d}-{end_seq:05d})")
+        else:
+            print(f"🚀 開始非同步爬取 {year} 年資料 (從 {start_seq:05d} 開始，直到空白)")
+        print(f"🔧 參數: 並行={self.concurrency}, 速率上限={self.max_rps}/s, 超時={crawler.timeout}s, 批次={crawler.batch_size}")
+        print("=" * 70)
+
+        loop = asyncio.get_running_loop()
+        fetch_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawl')
+        upload_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload')
+
+        permit_type = 1
+        slots = asyncio.Semaphore(self.concurrency)
+        stop = asyncio.Event()
+        completed = {}  # seq -> result，等待依序記錄
+        ready = asyncio.Condition()
+
+        async def fetch(seq):
+            index_key = f"{year}{permit_type}{seq:05d}00"
+            try:
+                result = await loop.run_in_executor(fetch_pool, self._crawl_one, index_key)
+            except Exception as e:
+                print(f"❌ 錯誤 {index_key}: {e}")
+                result = None
+            finally:
+                slots.release()
+            async with ready:
+                completed[seq] = result
+                ready.notify_all()
+
+        async def dispatch():
+            seq = start_seq
+            tasks = []
+            while not stop.is_set() and not (end_seq and seq > end_seq):
+                await slots.acquire()
+                if stop.is_set():
+                    slots.release()
+                    break
+                tasks.append(asyncio.create_task(fetch(seq)))
+                seq += 1
+            await asyncio.gather(*tasks)
+            return seq  # 第一個未派出的序號
+
+        async def commit():
+            """依序號順序記錄結果並套用自動停止規則"""
+            counters = {'no_data': 0, 'failed': 0}
+            upload = None
+            seq = start_seq
+            while not (end_seq and seq > end_seq):
+                async with ready:
+                    await ready.wait_for(lambda: seq in completed)
+                    result = completed.pop(seq)
+                index_key = f"{year}{permit_type}{seq:05d}00"
+                print(f"🔍 [{seq:05d}] {index_key}...", end=' ')
+                if crawler.record_result(year, seq, index_key, result, counters, auto_stop):
+                    stop.set()
+                    break
+                if len(crawler.results) >= crawler.batch_size and (upload is None or upload.done()):
+                    upload = loop.run_in_executor(upload_pool, crawler.flush_batch)
+                seq += 1
+            stop.set()
+            if upload is not None:
+                await upload
+
+        dispatcher = asyncio.create_task(dispatch())
+        try:
+            await commit()
+            await dispatcher
+        finally:
+            fetch_pool.shutdown(wait=True)
+            upload_pool.shutdown(wait=True)
+
+        # 上傳最後剩餘的資料（停止點之後才完成的序號不計入）
+        if crawler.results:
+            print(f"\n💾 上傳最終資料 ({len(crawler.results)} 筆)...")
+            if crawler.upload_batch_data(crawler.results):
+                crawler.results = []
+        crawler.publish()
+
+        crawler.print_final_stats(self.fetcher)
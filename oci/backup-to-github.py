@@ -9,18 +9,14 @@ import json
 import os
 from datetime import datetime
 
+from object_storage import open_storage
+
 def backup_to_github():
     """備份資料到GitHub"""
     
     # 1. 下載最新資料
     print("📥 下載最新資料...")
-    subprocess.run([
-        'oci', 'os', 'object', 'get',
-        '--namespace', 'nrsdi1rz5vl8',
-        '--bucket-name', 'taichung-building-permits',
-        '--name', 'data/permits.json',
-        '--file', '/tmp/latest_permits.json'
-    ], capture_output=True)
+    open_storage().download('data/permits.json', '/tmp/latest_permits.json')
     
     # 2. 檢查資料
     with open('/tmp/latest_permits.json', 'r') as f:
@@ -5,22 +5,22 @@
 
 import json
 import requests
-import oci
 from datetime import datetime
 from collections import defaultdict
 
+from object_storage import open_storage
+
 def backup_current_data():
     """備份當前資料到GitHub"""
     try:
         # 初始化OCI客戶端
-        client = oci.object_storage.ObjectStorageClient({})
-        namespace = "nrsdi1rz5vl8"
-        bucket_name = "taichung-building-permits"
+        storage = open_storage()
         
         print("📥 下載當前資料...")
         # 下載現有資料
-        obj = client.get_object(namespace, bucket_name, "data/permits.json")
-        current_data = json.loads(obj.data.content.decode('utf-8'))
+        current_data = storage.get_json("data/permits.json")
+        if current_data is None:
+            raise RuntimeError("無法下載 data/permits.json")
         
         # 創建備份檔名
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -29,13 +29,8 @@ def backup_current_data():
         print(f"💾 備份資料到: backups/{backup_filename}")
         
         # 上傳備份
-        client.put_object(
-            namespace_name=namespace,
-            bucket_name=bucket_name,
-            object_name=f"backups/{backup_filename}",
-            put_object_body=json.dumps(current_data, ensure_ascii=False, indent=2).encode('utf-8'),
-            content_type="application/json"
-        )
+        if not storage.put_json(f"backups/{backup_filename}", current_data, indent=2):
+            raise RuntimeError("備份上傳失敗")
         
         print(f"✅ 備份完成: {len(current_data['permits'])} 筆資料")
         return current_data
@@ -5,9 +5,10 @@
 
 import json
 import requests
-import subprocess
 from datetime import datetime
 
+from object_storage import open_storage
+
 def backup_current_data():
     """備份當前資料到本地和OCI"""
     
@@ -31,24 +32,10 @@ def backup_current_data():
     
     # 上傳到OCI backups目錄
     print(f"\n📤 上傳到OCI backups/...")
-    namespace = "nrsdi1rz5vl8"
-    bucket_name = "taichung-building-permits"
-    
-    cmd = [
-        "oci", "os", "object", "put",
-        "--namespace", namespace,
-        "--bucket-name", bucket_name,
-        "--name", f"backups/{backup_filename}",
-        "--file", backup_filename,
-        "--content-type", "application/json",
-        "--force"
-    ]
-    
-    result = subprocess.run(cmd, capture_output=True)
-    if result.returncode == 0:
+    if open_storage().upload(backup_filename, f"backups/{backup_filename}", "application/json"):
         print(f"✅ 備份成功上傳到OCI")
     else:
-        print(f"❌ 上傳失敗: {result.stderr.decode()}")
+        print(f"❌ 上傳失敗")
     
     # 統計各年份
     from collections import defaultdict
@@ -106,20 +106,8 @@ def get_filtered_permits():
 def get_all_permits():
     """取得所有建照資料"""
     # 下載最新資料
-    permits_file = '/tmp/all_permits.json'
-    
-    import subprocess
-    subprocess.run([
-        'oci', 'os', 'object', 'get',
-        '--namespace', manager.oci_namespace,
-        '--bucket-name', manager.bucket_name,
-        '--name', 'data/permits.json',
-        '--file', permits_file
-    ], capture_output=True)
-    
-    if os.path.exists(permits_file):
-        with open(permits_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    data = manager.storage.get_json('data/permits.json')
+    if data is not None:
         return jsonify(data)
     else:
         return jsonify({'error': '無法載入建照資料'}), 500
@@ -6,9 +6,10 @@
 
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import json
-import subprocess
 import os
 
+from object_storage import open_storage
+
 class BaojiaAPIHandler(BaseHTTPRequestHandler):
     
     def do_OPTIONS(self):
@@ -29,17 +30,9 @@ class BaojiaAPIHandler(BaseHTTPRequestHandler):
             
             try:
                 # 從 OCI 下載最新的公司名單
-                cmd = [
-                    "oci", "os", "object", "get",
-                    "--namespace", "nrsdi1rz5vl8",
-                    "--bucket-name", "taichung-building-permits",
-                    "--name", "baojia_companies.json",
-                    "--file", "/tmp/baojia_companies_temp.json"
-                ]
-                subprocess.run(cmd, capture_output=True)
-                
-                with open('/tmp/baojia_companies_temp.json', 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = open_storage().get_json("baojia_companies.json")
+                if data is None:
+                    raise Exception("下載失敗")
                 
                 self.wfile.write(json.dumps(data).encode('utf-8'))
                 
@@ -59,24 +52,8 @@ class BaojiaAPIHandler(BaseHTTPRequestHandler):
                 # 解析請求資料
                 data = json.loads(post_data.decode('utf-8'))
                 
-                # 儲存到臨時檔案
-                temp_file = '/tmp/baojia_companies_update.json'
-                with open(temp_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                
                 # 上傳到 OCI
-                cmd = [
-                    "oci", "os", "object", "put",
-                    "--namespace", "nrsdi1rz5vl8",
-                    "--bucket-name", "taichung-building-permits",
-                    "--name", "baojia_companies.json",
-                    "--file", temp_file,
-                    "--content-type", "application/json",
-                    "--force"
-                ]
-                result = subprocess.run(cmd, capture_output=True)
-                
-                if result.returncode == 0:
+                if open_storage().put_json("baojia_companies.json", data, indent=2):
                     self.send_response(200)
                     self.send_header('Content-Type', 'application/json')
                     self.send_header('Access-Control-Allow-Origin', '*')
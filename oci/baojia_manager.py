@@ -6,17 +6,38 @@
 
 import json
 import os
-import subprocess
+from datetime import datetime
 from typing import List, Dict, Set
 import re
 
+from company_matcher import CompanyMatcher
+from object_storage import open_storage
+
 class BaojiaManager:
     def __init__(self, db_file='baojia_companies.json', oci_namespace='nrsdi1rz5vl8', bucket_name='taichung-building-permits'):
         self.db_file = db_file
         self.oci_namespace = oci_namespace
         self.bucket_name = bucket_name
+        self.storage = open_storage(oci_namespace, bucket_name)
+        self._matcher = None
         self.companies = self._load_companies()
     
+    @property
+    def companies(self) -> Set[str]:
+        return self._companies
+    
+    @companies.setter
+    def companies(self, value: Set[str]):
+        # 公司清單換版時，比對器需重新編譯
+        self._companies = value
+        self._matcher = None
+    
+    def _get_matcher(self) -> CompanyMatcher:
+        """取得目前公司清單編譯好的比對器（含包含比對規則）"""
+        if self._matcher is None:
+            self._matcher = CompanyMatcher(self._companies, containment=True)
+        return self._matcher
+    
     def _load_companies(self) -> Set[str]:
         """載入寶佳機構公司清單"""
         if os.path.exists(self.db_file):
@@ -27,9 +48,10 @@ class BaojiaManager:
     
     def _save_companies(self):
         """儲存公司清單"""
+        self._matcher = None
         data = {
             "companies": sorted(list(self.companies)),
-            "lastUpdated": subprocess.run(['date', '+%Y-%m-%d'], capture_output=True, text=True).stdout.strip(),
+            "lastUpdated": datetime.now().strftime('%Y-%m-%d'),
             "description": "寶佳機構體系公司清單"
         }
         with open(self.db_file, 'w', encoding='utf-8') as f:
@@ -41,19 +63,10 @@ class BaojiaManager:
     def _upload_to_oci(self):
         """上傳到OCI物件儲存"""
         print("📤 上傳寶佳公司資料庫到OCI...")
-        result = subprocess.run([
-            'oci', 'os', 'object', 'put',
-            '--namespace', self.oci_namespace,
-            '--bucket-name', self.bucket_name,
-            '--name', 'data/baojia_companies.json',
-            '--file', self.db_file,
-            '--force'
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
+        if self.storage.upload(self.db_file, 'data/baojia_companies.json', 'application/json'):
             print("✅ 上傳成功")
         else:
-            print(f"❌ 上傳失敗: {result.stderr}")
+            print("❌ 上傳失敗")
     
     def add_company(self, company_name: str) -> bool:
         """新增公司"""
@@ -90,13 +103,7 @@ class BaojiaManager:
         """篩選寶佳機構的建照"""
         # 下載最新建照資料
         print("📥 下載最新建照資料...")
-        subprocess.run([
-            'oci', 'os', 'object', 'get',
-            '--namespace', self.oci_namespace,
-            '--bucket-name', self.bucket_name,
-            '--name', 'data/permits.json',
-            '--file', permits_file
-        ], capture_output=True)
+        self.storage.download('data/permits.json', permits_file)
         
         with open(permits_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -104,6 +111,7 @@ class BaojiaManager:
         # 智慧篩選
         baojia_permits = []
         company_stats = {}
+        matcher = self._get_matcher()
         
         for permit in data.get('permits', []):
             applicant = permit.get('applicantName', '').strip()
@@ -115,19 +123,17 @@ class BaojiaManager:
                 continue
             
             # 智慧匹配 (包含公司名稱的一部分)
-            for company in self.companies:
-                # 檢查是否包含主要關鍵字
-                if self._smart_match(applicant, company):
-                    baojia_permits.append(permit)
-                    company_stats[company] = company_stats.get(company, 0) + 1
-                    break
+            company = matcher.match(applicant)
+            if company is not None:
+                baojia_permits.append(permit)
+                company_stats[company] = company_stats.get(company, 0) + 1
         
         # 儲存結果
         result = {
             "totalCount": len(baojia_permits),
             "permits": baojia_permits,
             "companyStats": company_stats,
-            "lastUpdated": subprocess.run(['date', '+%Y-%m-%d %H:%M:%S'], capture_output=True, text=True).stdout.strip()
+            "lastUpdated": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -135,14 +141,7 @@ class BaojiaManager:
         
         # 上傳結果到OCI
         print(f"\n📤 上傳篩選結果到OCI...")
-        subprocess.run([
-            'oci', 'os', 'object', 'put',
-            '--namespace', self.oci_namespace,
-            '--bucket-name', self.bucket_name,
-            '--name', 'data/baojia_permits.json',
-            '--file', output_file,
-            '--force'
-        ], capture_output=True)
+        self.storage.upload(output_file, 'data/baojia_permits.json', 'application/json')
         
         return result
     
@@ -7,30 +7,20 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from baojia_realtime_filter import BaojiaRealtimeFilter
-import subprocess
-import json
-import os
+from object_storage import open_storage
 
 app = Flask(__name__)
 CORS(app)
 
 # 初始化篩選器
-filter_instance = BaojiaRealtimeFilter()
+storage = open_storage()
+filter_instance = BaojiaRealtimeFilter(storage=storage)
 
 @app.route('/api/baojia/check/<permit_number>')
 def check_permit(permit_number):
     """即時檢查單筆建照是否為寶佳機構"""
     # 從OCI下載最新資料
-    subprocess.run([
-        'oci', 'os', 'object', 'get',
-        '--namespace', 'nrsdi1rz5vl8',
-        '--bucket-name', 'taichung-building-permits',
-        '--name', 'data/permits.json',
-        '--file', '/tmp/check_permits.json'
-    ], capture_output=True)
-    
-    with open('/tmp/check_permits.json', 'r') as f:
-        data = json.load(f)
+    data = storage.get_json('data/permits.json', {})
     
     # 尋找指定建照
     for permit in data.get('permits', []):
@@ -51,33 +41,14 @@ def check_permit(permit_number):
 def realtime_stats():
     """取得即時統計資料"""
     # 檢查是否有最新的即時篩選結果
-    try:
-        subprocess.run([
-            'oci', 'os', 'object', 'get',
-            '--namespace', 'nrsdi1rz5vl8',
-            '--bucket-name', 'taichung-building-permits',
-            '--name', 'data/baojia_realtime_results.json',
-            '--file', '/tmp/realtime_results.json'
-        ], capture_output=True, check=True)
-        
-        with open('/tmp/realtime_results.json', 'r') as f:
-            return jsonify(json.load(f))
+    results = storage.get_json('data/baojia_realtime_results.json')
+    if results is not None:
+        return jsonify(results)
     
-    except:
-        # 如果沒有即時結果，執行即時篩選
-        subprocess.run([
-            'oci', 'os', 'object', 'get',
-            '--namespace', 'nrsdi1rz5vl8',
-            '--bucket-name', 'taichung-building-permits',
-            '--name', 'data/permits.json',
-            '--file', '/tmp/all_permits.json'
-        ], capture_output=True)
-        
-        with open('/tmp/all_permits.json', 'r') as f:
-            data = json.load(f)
-        
-        result = filter_instance.filter_permits_realtime(data.get('permits', []))
-        return jsonify(result)
+    # 如果沒有即時結果，執行即時篩選
+    data = storage.get_json('data/permits.json', {})
+    result = filter_instance.filter_permits_realtime(data.get('permits', []))
+    return jsonify(result)
 
 @app.route('/api/baojia/companies/sync', methods=['POST'])
 def sync_companies():
@@ -91,14 +62,14 @@ def sync_companies():
         if success:
             return jsonify({'message': f'已新增並同步: {company_name}'})
         else:
-            return jsonify({'error': '公司已存在或名稱無效'}), 400
+            return jsonify({'error': '公司已存在、名稱無效或同步失敗'}), 400
     
     elif action == 'remove':
         success = filter_instance.remove_company_realtime(company_name)
         if success:
             return jsonify({'message': f'已刪除並同步: {company_name}'})
         else:
-            return jsonify({'error': '公司不存在'}), 404
+            return jsonify({'error': '公司不存在或同步失敗'}), 404
     
     return jsonify({'error': '無效的操作'}), 400
 
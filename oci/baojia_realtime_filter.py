@@ -4,61 +4,135 @@
 寶佳機構建照即時篩選系統
 """
 
+import hashlib
 import json
-import subprocess
+import time
 from typing import List, Dict, Set
 import os
 from datetime import datetime
 
+from company_matcher import CompanyMatcher
+from object_storage import open_storage
+
+COMPANIES_OBJECT = 'data/baojia_companies.json'
+
+
+def _content_version(raw: bytes) -> str:
+    """物件儲存沒有提供 ETag 時，以內容雜湊作為版本"""
+    return f"sha1:{hashlib.sha1(raw).hexdigest()}"
+
 class BaojiaRealtimeFilter:
-    def __init__(self, db_file='baojia_companies.json'):
+    def __init__(self, db_file='baojia_companies.json', revalidate_interval=60, storage=None):
         self.db_file = db_file
-        self.companies = self._load_companies()
         self.oci_namespace = 'nrsdi1rz5vl8'
         self.bucket_name = 'taichung-building-permits'
+        self.storage = storage or open_storage(self.oci_namespace, self.bucket_name)
+        self.revalidate_interval = revalidate_interval  # 最多每N秒向OCI確認一次版本
+        self.companies_version = None  # 公司清單的 ETag（沒有 ETag 時為 sha1:<內容雜湊>，本地檔案時為 local:<mtime>）
+        self._last_checked = None
+        self._listeners = []
+        self._companies = None
+        self._matcher = None
+        self.companies = self._load_companies()
+        self._last_checked = time.monotonic()
+    
+    @property
+    def companies(self) -> Set[str]:
+        return self._companies
+    
+    @companies.setter
+    def companies(self, value: Set[str]):
+        # 公司清單換版時，比對器需重新編譯
+        if value is not self._companies:
+            self._companies = value
+            self._matcher = None
+    
+    def _get_matcher(self) -> CompanyMatcher:
+        """取得目前公司清單編譯好的比對器"""
+        if self._matcher is None:
+            self._matcher = CompanyMatcher(self._companies)
+        return self._matcher
+    
+    def on_companies_changed(self, callback):
+        """註冊公司清單版本改變時的通知 callback()"""
+        self._listeners.append(callback)
+    
+    def _notify_changed(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ 公司清單更新通知失敗: {e}")
     
     def _load_companies(self) -> Set[str]:
-        """從OCI載入最新的寶佳公司清單"""
+        """從OCI載入最新的寶佳公司清單（ETag 未變時沿用目前清單，不重新下載）"""
         # 先嘗試從OCI下載最新版本
         try:
-            subprocess.run([
-                'oci', 'os', 'object', 'get',
-                '--namespace', 'nrsdi1rz5vl8',
-                '--bucket-name', 'taichung-building-permits',
-                '--name', 'data/baojia_companies.json',
-                '--file', '/tmp/baojia_companies_latest.json'
-            ], capture_output=True, check=True)
+            meta = self.storage.head(COMPANIES_OBJECT)
+            if meta is None:
+                raise RuntimeError('OCI 上沒有公司清單')
+            etag = meta.get('etag')
+            if etag and etag == self.companies_version and self._companies is not None:
+                return self._companies
             
-            with open('/tmp/baojia_companies_latest.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return set(data.get('companies', []))
-        except:
+            raw = self.storage.get_bytes(COMPANIES_OBJECT)
+            if raw is None:
+                raise RuntimeError('下載公司清單失敗')
+            version = etag or _content_version(raw)
+            if version == self.companies_version and self._companies is not None:
+                return self._companies
+            data = json.loads(raw.decode('utf-8'))
+            self.companies_version = version
+            return set(data.get('companies', []))
+        except Exception:
             # 如果OCI下載失敗，使用本地檔案
             if os.path.exists(self.db_file):
+                version = f"local:{os.path.getmtime(self.db_file)}"
+                if version == self.companies_version and self._companies is not None:
+                    return self._companies
                 with open(self.db_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    return set(data.get('companies', []))
+                self.companies_version = version
+                return set(data.get('companies', []))
+            if self._companies is not None:
+                return self._companies
             return set()
     
+    def refresh_companies(self, force=False) -> bool:
+        """依版本重新驗證公司清單，距上次確認未滿 revalidate_interval 秒時直接略過
+        
+        Returns:
+            bool: 公司清單是否換版
+        """
+        now = time.monotonic()
+        if not force and self._last_checked is not None and now - self._last_checked < self.revalidate_interval:
+            return False
+        self._last_checked = now
+        
+        old_version = self.companies_version
+        self.companies = self._load_companies()
+        changed = self.companies_version != old_version
+        if changed:
+            self._notify_changed()
+        return changed
+    
     def is_baojia_company(self, applicant_name: str) -> bool:
         """即時判斷是否為寶佳機構公司"""
         if not applicant_name:
             return False
         
-        # 重新載入最新公司清單（確保即時性）
-        if not self.companies:  # 只在沒有公司資料時才重新載入
-            self.companies = self._load_companies()
-        
-        # 完全匹配
-        if applicant_name in self.companies:
-            return True
-        
-        # 智慧匹配
-        for company in self.companies:
-            if self._smart_match(applicant_name, company):
-                return True
+        # 沒有公司資料時才重新驗證（受 revalidate_interval 限制，不會每筆都呼叫OCI）
+        if not self.companies:
+            self.refresh_companies()
         
-        return False
+        # 完全匹配 + 智慧匹配（預先編譯、結果記憶化）
+        return self._get_matcher().is_match(applicant_name)
+    
+    def match_company(self, applicant_name: str):
+        """找出起造人對應的寶佳公司名稱（依清單順序第一個符合者），沒有則回傳 None"""
+        if not applicant_name:
+            return None
+        return self._get_matcher().match(applicant_name)
     
     def _smart_match(self, applicant: str, company: str) -> bool:
         """智慧匹配公司名稱"""
@@ -86,25 +160,21 @@ class BaojiaRealtimeFilter:
     
     def filter_permits_realtime(self, permits: List[Dict]) -> Dict:
         """即時篩選建照資料"""
-        # 重新載入最新公司清單
-        self.companies = self._load_companies()
+        # 確認公司清單版本（只有版本改變才重新下載與編譯）
+        self.refresh_companies()
         
         baojia_permits = []
         company_stats = {}
+        matcher = self._get_matcher()
         
         for permit in permits:
             applicant = permit.get('applicantName', '').strip()
             
-            if self.is_baojia_company(applicant):
+            if applicant and matcher.is_match(applicant):
                 baojia_permits.append(permit)
                 
                 # 找出匹配的公司名稱用於統計
-                matched_company = applicant
-                for company in self.companies:
-                    if self._smart_match(applicant, company):
-                        matched_company = company
-                        break
-                
+                matched_company = matcher.match(applicant) or applicant
                 company_stats[matched_company] = company_stats.get(matched_company, 0) + 1
         
         return {
@@ -115,34 +185,56 @@ class BaojiaRealtimeFilter:
             "companiesCount": len(self.companies)
         }
     
+    def _publish_companies(self) -> bool:
+        """上傳到OCI並儲存本地，記錄新版本、通知訂閱者
+        
+        上傳失敗時不寫本地檔案，並重新讀取OCI（或本地）目前的版本，記憶體中的清單不會與OCI分歧。
+        
+        Returns:
+            bool: 是否上傳成功
+        """
+        data = {
+            "companies": sorted(list(self.companies)),
+            "lastUpdated": datetime.now().strftime('%Y-%m-%d'),
+            "description": "寶佳機構體系公司清單"
+        }
+        body = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        
+        # 上傳到OCI
+        try:
+            uploaded = self.storage.put_bytes(COMPANIES_OBJECT, body)
+        except Exception as e:
+            print(f"⚠️ 上傳公司清單失敗: {e}")
+            uploaded = False
+        if not uploaded:
+            print("⚠️ 公司清單未同步，改回目前已發布的版本")
+            old_version, self.companies_version = self.companies_version, None
+            self.companies = self._load_companies()
+            self._last_checked = time.monotonic()
+            if self.companies_version != old_version:
+                self._notify_changed()
+            return False
+        
+        # 儲存本地
+        with open(self.db_file, 'w', encoding='utf-8') as f:
+            f.write(body.decode('utf-8'))
+        
+        # 記下自己寫入的版本，下次重新驗證時不必再下載
+        meta = self.storage.head(COMPANIES_OBJECT) or {}
+        self.companies_version = meta.get('etag') or _content_version(body)
+        self._last_checked = time.monotonic()
+        self._notify_changed()
+        return True
+    
     def add_company_realtime(self, company_name: str) -> bool:
         """即時新增公司並同步到OCI"""
-        # 載入最新資料
-        self.companies = self._load_companies()
+        # 確認是最新版本再修改
+        self.refresh_companies(force=True)
         
         if company_name and company_name not in self.companies:
-            self.companies.add(company_name)
-            
-            # 儲存到本地和OCI
-            data = {
-                "companies": sorted(list(self.companies)),
-                "lastUpdated": datetime.now().strftime('%Y-%m-%d'),
-                "description": "寶佳機構體系公司清單"
-            }
-            
-            # 儲存本地
-            with open(self.db_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            # 上傳到OCI
-            subprocess.run([
-                'oci', 'os', 'object', 'put',
-                '--namespace', self.oci_namespace,
-                '--bucket-name', self.bucket_name,
-                '--name', 'data/baojia_companies.json',
-                '--file', self.db_file,
-                '--force'
-            ], capture_output=True)
+            self.companies = self.companies | {company_name}
+            if not self._publish_companies():
+                return False
             
             print(f"✅ 已新增並同步: {company_name}")
             return True
@@ -151,32 +243,13 @@ class BaojiaRealtimeFilter:
     
     def remove_company_realtime(self, company_name: str) -> bool:
         """即時刪除公司並同步到OCI"""
-        # 載入最新資料
-        self.companies = self._load_companies()
+        # 確認是最新版本再修改
+        self.refresh_companies(force=True)
         
         if company_name in self.companies:
-            self.companies.remove(company_name)
-            
-            # 儲存到本地和OCI
-            data = {
-                "companies": sorted(list(self.companies)),
-                "lastUpdated": datetime.now().strftime('%Y-%m-%d'),
-                "description": "寶佳機構體系公司清單"
-            }
-            
-            # 儲存本地
-            with open(self.db_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            # 上傳到OCI
-            subprocess.run([
-                'oci', 'os', 'object', 'put',
-                '--namespace', self.oci_namespace,
-                '--bucket-name', self.bucket_name,
-                '--name', 'data/baojia_companies.json',
-                '--file', self.db_file,
-                '--force'
-            ], capture_output=True)
+            self.companies = self.companies - {company_name}
+            if not self._publish_companies():
+                return False
             
             print(f"✅ 已刪除並同步: {company_name}")
             return True
@@ -233,33 +306,13 @@ class EnhancedCrawler(OptimizedCrawler):
         """更新寶佳篩選結果到OCI"""
         try:
             # 下載最新建照資料
-            subprocess.run([
-                'oci', 'os', 'object', 'get',
-                '--namespace', self.namespace,
-                '--bucket-name', self.bucket_name,
-                '--name', 'data/permits.json',
-                '--file', '/tmp/permits_for_filter.json'
-            ], capture_output=True)
-            
-            with open('/tmp/permits_for_filter.json', 'r') as f:
-                data = json.load(f)
+            data = self.storage.get_json('data/permits.json', {})
             
             # 即時篩選
             filter_result = self.baojia_filter.filter_permits_realtime(data.get('permits', []))
             
-            # 儲存篩選結果
-            with open('/tmp/baojia_realtime_results.json', 'w') as f:
-                json.dump(filter_result, f, ensure_ascii=False, indent=2)
-            
             # 上傳到OCI
-            subprocess.run([
-                'oci', 'os', 'object', 'put',
-                '--namespace', self.namespace,
-                '--bucket-name', self.bucket_name,
-                '--name', 'data/baojia_realtime_results.json',
-                '--file', '/tmp/baojia_realtime_results.json',
-                '--force'
-            ], capture_output=True)
+            self.storage.put_json('data/baojia_realtime_results.json', filter_result, indent=2)
             
             print(f"  📊 寶佳篩選結果已更新: {filter_result['totalCount']} 筆")
             
@@ -306,30 +359,20 @@ def create_realtime_api():
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from baojia_realtime_filter import BaojiaRealtimeFilter
-import subprocess
-import json
-import os
+from object_storage import open_storage
 
 app = Flask(__name__)
 CORS(app)
 
 # 初始化篩選器
-filter_instance = BaojiaRealtimeFilter()
+storage = open_storage()
+filter_instance = BaojiaRealtimeFilter(storage=storage)
 
 @app.route('/api/baojia/check/<permit_number>')
 def check_permit(permit_number):
     """即時檢查單筆建照是否為寶佳機構"""
     # 從OCI下載最新資料
-    subprocess.run([
-        'oci', 'os', 'object', 'get',
-        '--namespace', 'nrsdi1rz5vl8',
-        '--bucket-name', 'taichung-building-permits',
-        '--name', 'data/permits.json',
-        '--file', '/tmp/check_permits.json'
-    ], capture_output=True)
-    
-    with open('/tmp/check_permits.json', 'r') as f:
-        data = json.load(f)
+    data = storage.get_json('data/permits.json', {})
     
     # 尋找指定建照
     for permit in data.get('permits', []):
@@ -350,33 +393,14 @@ def check_permit(permit_number):
 def realtime_stats():
     """取得即時統計資料"""
     # 檢查是否有最新的即時篩選結果
-    try:
-        subprocess.run([
-            'oci', 'os', 'object', 'get',
-            '--namespace', 'nrsdi1rz5vl8',
-            '--bucket-name', 'taichung-building-permits',
-            '--name', 'data/baojia_realtime_results.json',
-            '--file', '/tmp/realtime_results.json'
-        ], capture_output=True, check=True)
-        
-        with open('/tmp/realtime_results.json', 'r') as f:
-            return jsonify(json.load(f))
-    
-    except:
-        # 如果沒有即時結果，執行即時篩選
-        subprocess.run([
-            'oci', 'os', 'object', 'get',
-            '--namespace', 'nrsdi1rz5vl8',
-            '--bucket-name', 'taichung-building-permits',
-            '--name', 'data/permits.json',
-            '--file', '/tmp/all_permits.json'
-        ], capture_output=True)
-        
-        with open('/tmp/all_permits.json', 'r') as f:
-            data = json.load(f)
-        
-        result = filter_instance.filter_permits_realtime(data.get('permits', []))
-        return jsonify(result)
+    results = storage.get_json('data/baojia_realtime_results.json')
+    if results is not None:
+        return jsonify(results)
+    
+    # 如果沒有即時結果，執行即時篩選
+    data = storage.get_json('data/permits.json', {})
+    result = filter_instance.filter_permits_realtime(data.get('permits', []))
+    return jsonify(result)
 
 @app.route('/api/baojia/companies/sync', methods=['POST'])
 def sync_companies():
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+寶佳標記欄位 - 寫入時預先計算
+取代每次讀取（列表、搜尋、統計）都對全部建照重新跑公司比對的作法：
+1. 寫入時 (upload_batch_data / 每日爬蟲) 每筆建照記下比對到的公司與公司清單版本
+2. 壓實時只重新比對「標記版本不是目前公司清單版本」的建照，並產生寶佳統計彙總
+3. API 端公司清單換版時，背景只找出標記會改變的建照，查詢直接讀取標記
+"""
+
+import threading
+
+TAG_FIELD = 'baojiaCompany'  # 比對到的公司名稱（公司清單以名稱為識別），未符合為 None
+VERSION_FIELD = 'baojiaListVersion'  # 標記時的公司清單版本 (ETag)
+FLAG_FIELD = 'isBaojia'
+STATS_FIELD = 'baojiaStats'
+
+# 由公司清單推導出的欄位，不算在建照本身的欄位數內
+DERIVED_FIELDS = (TAG_FIELD, VERSION_FIELD, FLAG_FIELD)
+
+
+def company_for(baojia_filter, applicant):
+    """起造人對應的寶佳公司名稱，沒有則回傳 None"""
+    applicant = (applicant or '').strip()
+    if not applicant:
+        return None
+    company = baojia_filter.match_company(applicant)
+    if company is None and applicant in baojia_filter.companies:
+        company = applicant
+    return company
+
+
+def stamp(permit, company, version):
+    permit[TAG_FIELD] = company
+    permit[FLAG_FIELD] = company is not None
+    permit[VERSION_FIELD] = version
+
+
+def stamp_permits(permits, baojia_filter):
+    """寫入前為每筆建照加上標記（呼叫端負責先確認公司清單版本）"""
+    version = baojia_filter.companies_version
+    for permit in permits:
+        stamp(permit, company_for(baojia_filter, permit.get('applicantName')), version)
+    return permits
+
+
+def is_current(permit, version):
+    """標記是否以指定版本的公司清單計算"""
+    return VERSION_FIELD in permit and permit[VERSION_FIELD] == version
+
+
+def diff_tags(permits, baojia_filter):
+    """找出標記與目前公司清單不一致的建照
+
+    已用目前版本標記的建照直接略過；舊版本或未標記的才重新比對（比對結果依起造人記憶化）。
+
+    Returns:
+        {indexKey: company}，只包含公司會改變（或尚未標記）的建照
+    """
+    version = baojia_filter.companies_version
+    changes = {}
+    for permit in permits:
+        if is_current(permit, version):
+            continue
+        index_key = permit.get('indexKey')
+        company = company_for(baojia_filter, permit.get('applicantName'))
+        if index_key and (VERSION_FIELD not in permit or permit.get(TAG_FIELD) != company):
+            changes[index_key] = company
+    return changes
+
+
+def retag(permits, baojia_filter):
+    """就地把舊版本的標記更新為目前公司清單版本
+
+    Returns:
+        (重新比對數, 公司改變數)
+    """
+    version = baojia_filter.companies_version
+    checked = changed = 0
+    for permit in permits:
+        if is_current(permit, version):
+            continue
+        company = company_for(baojia_filter, permit.get('applicantName'))
+        if VERSION_FIELD not in permit or permit.get(TAG_FIELD) != company:
+            changed += 1
+        stamp(permit, company, version)
+        checked += 1
+    return checked, changed
+
+
+def compute_stats(permits, version=None, changes=None):
+    """由標記欄位彙總寶佳統計（不需比對）
+
+    Args:
+        changes: 尚未寫回快照的標記差異 {indexKey: company}
+    """
+    changes = changes or {}
+    company_stats = {}
+    total = 0
+    for permit in permits:
+        index_key = permit.get('indexKey')
+        company = changes[index_key] if index_key in changes else permit.get(TAG_FIELD)
+        if company is not None:
+            total += 1
+            company_stats[company] = company_stats.get(company, 0) + 1
+    return {
+        'listVersion': version,
+        'totalPermits': len(permits),
+        'totalBaojiPermits': total,
+        'companyStats': company_stats,
+    }
+
+
+class BaojiaTagView:
+    """讀取端：快照中的標記 + 公司清單換版後尚未寫回快照的差異
+
+    差異與統計只在資料集或公司清單換版時（背景）重新計算，請求一律直接讀取。
+    """
+
+    def __init__(self, baojia_filter):
+        self.baojia_filter = baojia_filter
+        self.changes = {}  # indexKey -> company，與快照標記不同的部分
+        self.stats = None
+        self._lock = threading.Lock()
+
+    def rebuild(self, snapshot):
+        """依目前公司清單重新計算差異與統計
+
+        Returns:
+            {indexKey: company}，寶佳公司與重新計算前不同的建照
+        """
+        with self._lock:
+            permits = snapshot.permits
+            version = self.baojia_filter.companies_version
+            old = self.changes
+            new = diff_tags(permits, self.baojia_filter)
+
+            affected = {}
+            for permit in permits:
+                index_key = permit.get('indexKey')
+                if index_key in old or index_key in new:
+                    before = old[index_key] if index_key in old else permit.get(TAG_FIELD)
+                    after = new[index_key] if index_key in new else permit.get(TAG_FIELD)
+                    if before != after:
+                        affected[index_key] = after
+
+            stored = snapshot.data.get(STATS_FIELD)
+            if not new and stored and stored.get('listVersion') == version:
+                stats = stored  # 壓實時預先彙總的結果
+            else:
+                stats = compute_stats(permits, version, new)
+
+            self.changes = new
+            self.stats = stats
+            return affected
+
+    def company(self, permit):
+        changes = self.changes
+        index_key = permit.get('indexKey')
+        if index_key in changes:
+            return changes[index_key]
+        return permit.get(TAG_FIELD)
+
+    def is_baojia(self, permit):
+        return self.company(permit) is not None
+
+    def view(self, permit):
+        """回傳帶有目前寶佳標記的建照；標記未變時直接回傳原物件（不複製）"""
+        index_key = permit.get('indexKey')
+        changes = self.changes
+        if index_key in changes:
+            company = changes[index_key]
+            return dict(permit, **{TAG_FIELD: company, FLAG_FIELD: company is not None})
+        if FLAG_FIELD not in permit:
+            return dict(permit, **{FLAG_FIELD: permit.get(TAG_FIELD) is not None})
+        return permit
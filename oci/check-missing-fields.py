@@ -5,7 +5,6 @@
 """
 
 import json
-import subprocess
 import time
 from datetime import datetime
 
@@ -15,16 +14,7 @@ exec(open('optimized-crawler-stable.py').read().split('if __name__ == "__main__"
 def check_missing_fields():
     """檢查缺少必要欄位的資料"""
     print("📥 下載最新資料...")
-    subprocess.run([
-        'oci', 'os', 'object', 'get',
-        '--namespace', 'nrsdi1rz5vl8',
-        '--bucket-name', 'taichung-building-permits',
-        '--name', 'data/permits.json',
-        '--file', '/tmp/check_fields.json'
-    ], capture_output=True)
-    
-    with open('/tmp/check_fields.json', 'r') as f:
-        data = json.load(f)
+    data = open_storage().get_json('data/permits.json')
     
     # 必要欄位
     required_fields = ['floors', 'buildings', 'units', 'totalFloorArea', 'issueDate']
@@ -138,6 +128,9 @@ def recrawl_missing_fields(missing_data):
         print(f"\n💾 上傳最後 {len(batch)} 筆資料...")
         crawler.upload_batch_data(batch)
     
+    # 壓實發佈到 permits.json
+    crawler.publish()
+    
     print(f"\n✅ 重新爬取完成")
 
 if __name__ == "__main__":
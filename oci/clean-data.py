@@ -3,11 +3,12 @@
 清理建照資料 - 移除無效記錄
 """
 
-import json
-import subprocess
 from datetime import datetime
 import logging
 
+from object_storage import open_storage
+from permit_store import PermitStore
+
 # 設定日誌
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -36,104 +37,32 @@ def is_valid_permit(permit):
     return True
 
 def clean_permits_data():
-    """清理建照資料"""
-    namespace = "nrsdi1rz5vl8"
-    bucket_name = "taichung-building-permits"
+    """清理建照資料（條件式寫入，與爬蟲的壓實同時執行也不會互相覆蓋）"""
+    storage = open_storage()
+    store = PermitStore(storage)
+    counts = {}
     
     logger.info("🧹 開始清理建照資料...")
     
-    # 下載現有資料
-    try:
-        cmd = [
-            "oci", "os", "object", "get",
-            "--namespace", namespace,
-            "--bucket-name", bucket_name,
-            "--name", "data/permits.json",
-            "--file", "/tmp/permits_to_clean.json"
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            logger.error(f"下載資料失敗: {result.stderr}")
-            return False
-            
-    except Exception as e:
-        logger.error(f"下載資料失敗: {e}")
-        return False
+    def remove_invalid(permits):
+        # 快照被其他寫入端更新時會以最新資料重新呼叫
+        valid_permits = [permit for permit in permits if is_valid_permit(permit)]
+        counts.update(original=len(permits), valid=len(valid_permits))
+        logger.info(f"📊 原始資料數量: {len(permits)}")
+        logger.info(f"✅ 有效資料數量: {len(valid_permits)}")
+        logger.info(f"❌ 移除無效資料: {len(permits) - len(valid_permits)}")
+        return valid_permits
     
-    # 讀取並清理資料
     try:
-        with open('/tmp/permits_to_clean.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        original_permits = data.get('permits', [])
-        original_count = len(original_permits)
-        
-        logger.info(f"📊 原始資料數量: {original_count}")
-        
-        # 過濾有效資料
-        valid_permits = []
-        invalid_count = 0
-        
-        for permit in original_permits:
-            if is_valid_permit(permit):
-                valid_permits.append(permit)
-            else:
-                invalid_count += 1
-                logger.debug(f"移除無效記錄: {permit.get('indexKey')} - {permit.get('applicantName')}")
-        
-        logger.info(f"✅ 有效資料數量: {len(valid_permits)}")
-        logger.info(f"❌ 移除無效資料: {invalid_count}")
-        
-        # 按建照號碼重新排序（新的在前）
-        valid_permits.sort(key=lambda x: (
-            -x.get('permitYear', 0),
-            -x.get('sequenceNumber', 0)
-        ))
-        
-        # 重新計算統計
-        year_counts = {}
-        for permit in valid_permits:
-            year = permit['permitYear']
-            if year not in year_counts:
-                year_counts[year] = 0
-            year_counts[year] += 1
-        
-        # 創建清理後的資料
-        cleaned_data = {
-            "lastUpdate": datetime.now().isoformat(),
-            "totalCount": len(valid_permits),
-            "yearCounts": year_counts,
-            "permits": valid_permits
-        }
-        
-        # 儲存到臨時檔案
-        with open('/tmp/permits_cleaned.json', 'w', encoding='utf-8') as f:
-            json.dump(cleaned_data, f, ensure_ascii=False, indent=2)
-        
-        # 上傳清理後的資料
-        cmd = [
-            "oci", "os", "object", "put",
-            "--namespace", namespace,
-            "--bucket-name", bucket_name,
-            "--name", "data/permits.json",
-            "--file", "/tmp/permits_cleaned.json",
-            "--content-type", "application/json",
-            "--force"
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
+        if store.update_snapshot(remove_invalid):
             logger.info(f"✅ 已上傳清理後的資料到OCI")
             
             # 更新爬取記錄
-            update_crawl_log(original_count, len(valid_permits), invalid_count)
+            update_crawl_log(counts['original'], counts['valid'], counts['original'] - counts['valid'])
             
             return True
         else:
-            logger.error(f"上傳失敗: {result.stderr}")
+            logger.error("上傳失敗")
             return False
             
     except Exception as e:
@@ -143,8 +72,7 @@ def clean_permits_data():
 def update_crawl_log(original_count, valid_count, removed_count):
     """更新爬取記錄"""
     try:
-        namespace = "nrsdi1rz5vl8"
-        bucket_name = "taichung-building-permits"
+        storage = open_storage()
         
         new_log = {
             "date": datetime.now().date().isoformat(),
@@ -164,23 +92,8 @@ def update_crawl_log(original_count, valid_count, removed_count):
         
         # 載入現有記錄
         try:
-            cmd = [
-                "oci", "os", "object", "get",
-                "--namespace", namespace,
-                "--bucket-name", bucket_name,
-                "--name", "data/crawl-logs.json",
-                "--file", "-"
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                log_data = json.loads(result.stdout)
-                logs = log_data.get('logs', [])
-            else:
-                logs = []
-                
-        except:
+            logs = storage.get_json("data/crawl-logs.json", {}).get('logs', [])
+        except ValueError:
             logs = []
         
         # 新增清理記錄
@@ -188,20 +101,7 @@ def update_crawl_log(original_count, valid_count, removed_count):
         logs = logs[:30]  # 只保留最近30天
         
         # 上傳記錄
-        with open('/tmp/crawl-logs-updated.json', 'w', encoding='utf-8') as f:
-            json.dump({"logs": logs}, f, ensure_ascii=False, indent=2)
-        
-        cmd = [
-            "oci", "os", "object", "put",
-            "--namespace", namespace,
-            "--bucket-name", bucket_name,
-            "--name", "data/crawl-logs.json",
-            "--file", "/tmp/crawl-logs-updated.json",
-            "--content-type", "application/json",
-            "--force"
-        ]
-        
-        subprocess.run(cmd, capture_output=True, text=True)
+        storage.put_json("data/crawl-logs.json", {"logs": logs}, indent=2)
         logger.info("✅ 已更新爬取記錄")
         
     except Exception as e:
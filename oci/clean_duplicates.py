@@ -4,24 +4,13 @@
 保留欄位最完整的版本
 """
 
-import json
-import requests
-import subprocess
 from collections import defaultdict
-from datetime import datetime
 
-def clean_duplicates():
-    """清理重複資料"""
-    
-    # 下載現有資料
-    print("📥 下載現有資料...")
-    url = "https://objectstorage.ap-tokyo-1.oraclecloud.com/n/nrsdi1rz5vl8/b/taichung-building-permits/o/data/permits.json"
-    response = requests.get(url)
-    data = response.json()
-    
-    permits = data['permits']
-    print(f"原始資料: {len(permits)} 筆")
-    
+from object_storage import open_storage
+from permit_store import PermitStore
+
+def remove_duplicates(permits):
+    """同一年份+序號只保留欄位最多且最新的版本，回傳 (清理後的清單, 刪除數)"""
     # 找出重複的資料
     duplicates = defaultdict(list)
     for permit in permits:
@@ -63,64 +52,38 @@ def clean_duplicates():
         else:
             cleaned_permits.append(dup_list[0])
     
-    print(f"\n清理後: {len(cleaned_permits)} 筆")
-    print(f"刪除了 {removed_count} 筆重複資料")
-    
-    # 排序所有資料
-    sorted_permits = sorted(cleaned_permits, key=lambda x: (
-        -x.get('permitYear', 0),
-        -x.get('sequenceNumber', 0)
-    ))
+    return cleaned_permits, removed_count
+
+def clean_duplicates():
+    """清理重複資料"""
+    result = {}
+    
+    def mutate(permits):
+        # 快照被其他寫入端更新時會以最新資料重新呼叫
+        print(f"原始資料: {len(permits)} 筆")
+        cleaned_permits, removed_count = remove_duplicates(permits)
+        result.update(permits=cleaned_permits, removed=removed_count)
+        print(f"\n清理後: {len(cleaned_permits)} 筆")
+        print(f"刪除了 {removed_count} 筆重複資料")
+        return cleaned_permits if removed_count else None
+    
+    # 以條件式寫入更新快照並同步到各發佈位置，不會覆蓋同時執行的爬蟲結果
+    print("📥 下載現有資料...")
+    if not PermitStore(open_storage()).update_snapshot(mutate):
+        raise RuntimeError("上傳清理後的資料失敗")
+    print("✅ 上傳成功")
     
     # 統計各年份數量
-    year_counts = {}
-    for permit in sorted_permits:
-        year = permit.get('permitYear', 0)
-        if year not in year_counts:
-            year_counts[year] = 0
-        year_counts[year] += 1
-    
-    # 準備上傳資料
-    clean_data = {
-        "lastUpdate": datetime.now().isoformat(),
-        "totalCount": len(sorted_permits),
-        "yearCounts": year_counts,
-        "permits": sorted_permits
-    }
-    
-    # 保存到臨時檔案
-    temp_file = "/tmp/permits_cleaned.json"
-    with open(temp_file, 'w', encoding='utf-8') as f:
-        json.dump(clean_data, f, ensure_ascii=False, indent=2)
-    
-    print("\n📤 上傳清理後的資料...")
-    
-    # 上傳到OCI
-    namespace = "nrsdi1rz5vl8"
-    bucket_name = "taichung-building-permits"
-    
-    for dest_path in ["permits.json", "data/permits.json"]:
-        cmd = [
-            "oci", "os", "object", "put",
-            "--namespace", namespace,
-            "--bucket-name", bucket_name,
-            "--name", dest_path,
-            "--file", temp_file,
-            "--content-type", "application/json",
-            "--force"
-        ]
-        result = subprocess.run(cmd, capture_output=True)
-        if result.returncode == 0:
-            print(f"✅ 上傳成功: {dest_path}")
-        else:
-            print(f"❌ 上傳失敗: {dest_path}")
+    year_counts = defaultdict(int)
+    for permit in result['permits']:
+        year_counts[permit.get('permitYear', 0)] += 1
     
     # 顯示統計
     print("\n📊 各年份資料統計:")
     for year in sorted(year_counts.keys(), reverse=True):
         print(f"  {year}年: {year_counts[year]} 筆")
     
-    return len(cleaned_permits), removed_count
+    return len(result['permits']), result['removed']
 
 if __name__ == "__main__":
     print("🧹 開始清理重複資料...")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+寶佳機構公司名稱比對器 - 預先編譯版
+取代「每筆建照 × 每家公司 × 每個後綴」重複 str.replace 的作法：
+1. 公司清單每個版本只編譯一次：去後綴名稱的雜湊表 + Aho-Corasick 自動機
+2. 同一個起造人字串的結果記憶化
+3. 規則與原本 _smart_match 完全相同，並保留「依公司清單順序取第一個符合」的語意
+"""
+
+# 去除順序與原本相同（先去「股份有限公司」，因此「建設股份有限公司」會剩下「建設」）
+SUFFIXES = ['股份有限公司', '有限公司', '建設股份有限公司', '營造股份有限公司', '營造有限公司']
+
+BAOJIA_KEYWORD = '寶佳'
+
+
+def clean_name(name):
+    """移除公司後綴"""
+    for suffix in SUFFIXES:
+        name = name.replace(suffix, '')
+    return name.strip()
+
+
+class AhoCorasick:
+    """多模式子字串比對，找出文字中出現的所有模式"""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+    def add(self, pattern, value):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        self.output[node].append(value)
+
+    def build(self):
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                fallback = self.goto[state].get(ch, 0)
+                self.fail[nxt] = fallback if fallback != nxt else 0
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+        return self
+
+    def find_all(self, text):
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            found.update(self.output[node])
+        return found
+
+
+class CompanyMatcher:
+    """依公司清單（保留迭代順序）編譯的比對器
+
+    Args:
+        companies: 公司名稱，順序即原本迴圈的比對順序
+        containment: True 時加入 BaojiaManager 的包含比對規則；
+                     False 為 BaojiaRealtimeFilter 規則（寶佳變體需排除「非」字）
+    """
+
+    def __init__(self, companies, containment=False):
+        self.companies = list(companies)
+        self.company_set = set(self.companies)
+        self.containment = containment
+        self._memo = {}
+
+        # 去後綴名稱 -> 最早出現的位置
+        self.clean_positions = {}
+        for pos, company in enumerate(self.companies):
+            self.clean_positions.setdefault(clean_name(company), pos)
+
+        # 名稱含「寶佳」的第一家公司
+        self.baojia_position = next(
+            (pos for pos, company in enumerate(self.companies) if BAOJIA_KEYWORD in company), None
+        )
+
+        if containment:
+            # 去後綴後為空字串的公司名稱包含於任何起造人
+            self.empty_position = self.clean_positions.get('')
+            # 公司名稱包含於起造人：Aho-Corasick
+            self.automaton = AhoCorasick()
+            for clean, pos in self.clean_positions.items():
+                if clean:
+                    self.automaton.add(clean, pos)
+            self.automaton.build()
+            # 起造人包含於公司名稱：所有子字串 -> 最早位置
+            self.substring_positions = {}
+            for clean, pos in self.clean_positions.items():
+                for i in range(len(clean)):
+                    for j in range(i + 1, len(clean) + 1):
+                        sub = clean[i:j]
+                        if pos < self.substring_positions.get(sub, len(self.companies)):
+                            self.substring_positions[sub] = pos
+
+    def _first_position(self, applicant):
+        clean = clean_name(applicant)
+        candidates = []
+
+        pos = self.clean_positions.get(clean)
+        if pos is not None:
+            candidates.append(pos)
+
+        if self.containment:
+            found = self.automaton.find_all(clean)
+            if found:
+                candidates.append(min(found))
+            if self.empty_position is not None:
+                candidates.append(self.empty_position)
+            pos = self.substring_positions.get(clean)
+            if pos is not None:
+                candidates.append(pos)
+            elif clean == '':
+                # 空字串包含於任何名稱（與原本規則相同）
+                if self.companies:
+                    candidates.append(0)
+            if self.baojia_position is not None and BAOJIA_KEYWORD in applicant:
+                candidates.append(self.baojia_position)
+        elif self.baojia_position is not None and BAOJIA_KEYWORD in applicant and '非' not in applicant:
+            candidates.append(self.baojia_position)
+
+        return min(candidates) if candidates else None
+
+    def match(self, applicant):
+        """回傳第一個符合的公司名稱，沒有則回傳 None"""
+        if applicant in self._memo:
+            return self._memo[applicant]
+        pos = self._first_position(applicant)
+        company = self.companies[pos] if pos is not None else None
+        self._memo[applicant] = company
+        return company
+
+    def is_match(self, applicant):
+        if applicant in self.company_set:
+            return True
+        return self.match(applicant) is not None
@@ -8,11 +8,26 @@
 """
 
 import json
+import os
 import re
 from collections import defaultdict
 
+import permit_columnar
+from object_storage import open_storage
+from sequence_state import SequenceStateIndex, UNKNOWN, FAILED, CRAWLED, EMPTY_FIELDS, NO_DATA
+
+LOCAL_ARROW = os.path.basename(permit_columnar.ARROW_NAME)
+
+
 def load_data():
-    """載入 all_permits.json 資料"""
+    """載入資料：安裝 pyarrow 時下載 PermitStore 發佈的欄式快照 (data/permits.arrow) 使用，否則讀 all_permits.json"""
+    if permit_columnar.pa is not None:
+        try:
+            if open_storage().download(permit_columnar.ARROW_NAME, LOCAL_ARROW):
+                return permit_columnar.load_permits(LOCAL_ARROW)
+            print(f"⚠️ 無法下載欄式快照 {permit_columnar.ARROW_NAME}，改讀 all_permits.json")
+        except Exception as e:
+            print(f"⚠️ 欄式快照載入失敗，改讀 all_permits.json: {e}")
     try:
         with open('all_permits.json', 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -89,40 +104,25 @@ def check_missing_sequences(permits):
     print("檢查缺失序號")
     print("=" * 60)
     
-    year_sequences = defaultdict(set)
-    
-    # 收集現有序號
-    for permit in permits:
-        year = permit.get('permitYear')
-        if not year:
-            continue
-            
-        seq = extract_sequence_from_permit_number(permit.get('permitNumber'))
-        if seq:
-            year_sequences[year].add(seq)
-    
-    # 定義各年份總數
-    year_totals = {
-        '112': 2039,
-        '113': 2201,
-        '114': 1098  # 根據之前的記錄
-    }
+    # 各年度範圍與缺失序號由序號狀態索引提供（爬蟲每筆結果即時更新），不再寫死各年總數
+    index = SequenceStateIndex()
+    # 索引中還沒有的年度由資料集建立（不含查無資料的序號）
+    unseeded = [p for p in permits if p.get('permitYear') and p.get('permitYear') not in index.years]
+    if unseeded:
+        index.seed(unseeded)
     
     missing_sequences = {}
     
-    for year, total in year_totals.items():
-        if year not in year_sequences:
-            print(f"\n{year}年: 完全無資料")
-            missing_sequences[year] = list(range(1, total + 1))
-            continue
-            
-        existing = year_sequences[year]
-        expected = set(range(1, total + 1))
-        missing = sorted(expected - existing)
+    for year in sorted(index.years):
+        total = index.last_issued(year)
+        missing = list(index.sequences(year, states=(UNKNOWN, FAILED), end=total))
+        counts = index.counts(year, end=total)
+        existing = counts[CRAWLED] + counts[EMPTY_FIELDS]
         
         print(f"\n{year}年統計:")
         print(f"  預期總數: {total}")
-        print(f"  現有數量: {len(existing)}")
+        print(f"  現有數量: {existing}")
+        print(f"  查無資料: {counts[NO_DATA]}")
         print(f"  缺失數量: {len(missing)}")
         
         if missing:
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬蟲吞吐量比較 - 對本機模擬網站 (mock_permit_site) 端到端測量每秒取得的建照數
+1. optimized-crawler-stable.py 的同步、非同步、分段管線三種模式，含日誌、序號狀態、批次上傳與壓實
+   （物件儲存改用暫存目錄中的 LocalStorage，含 HTML 存檔；節奏控制不與正式爬蟲共用，起始速率即為上限）
+2. permit_fetcher + permit_parser 單純逐筆抓取解析，作為下限參考
+3. 既有各支爬蟲的單筆抓取 + 解析（含其本身的固定等待）；所需套件（bs4、oci、fdk ...）未安裝時該項略過
+4. 每項分別啟動模擬網站，延遲、錯誤比例、session 失效次數相同，另列出每筆建照花費的請求數
+
+使用方式:
+    python crawl_benchmark.py [--count N] [--latency 最小ms-最大ms] [--errors 比例]
+                              [--session-requests N] [--max-rps N] [--only 名稱...]
+"""
+
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import time
+
+import permit_parser
+from mock_permit_site import MockPermitSite, _pop_option
+from object_storage import LocalStorage
+from html_archive import HtmlArchiveWriter
+from permit_fetcher import PermitFetcher
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+YEAR = 114
+
+# 既有爬蟲: (名稱, 檔案（相對於本目錄）, 類別名稱（模組函式為 None）, 單筆抓取解析 (物件, INDEX_KEY, 網址) -> 建照資料)
+REFERENCE_CRAWLERS = [
+    ('taichung-crawler-function', 'taichung-crawler-function/func.py', 'TaichungBuildingCrawler',
+     lambda c, key, url: c.crawl_single_permit(key)),
+    ('building_permit_crawler.py', '../building_permit_crawler.py', 'BuildingPermitCrawler',
+     lambda c, key, url: (lambda r: r and c.parse_permit_data(r.text, key))(c.fetch_page_with_retry(key))),
+    ('crawler-compute.py', '../oci-compute/crawler-compute.py', 'BuildingPermitCrawler',
+     lambda c, key, url: (lambda html: html and c.parse_permit_data(html, key))(c.fetch_permit(key))),
+    ('oci-functions/func.py', '../oci-functions/func.py', 'BuildingPermitCrawler',
+     lambda c, key, url: (lambda html: html and c.parse_permit_data(html, key))(c.fetch_permit(key))),
+    ('function/func.py', 'function/func.py', None,
+     lambda m, key, url: m.crawl_single_permit(key, url)),
+]
+
+
+def _load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, os.path.normpath(os.path.join(HERE, path)))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _offline_crawler(base_url, max_rps):
+    """建立指向模擬網站、使用本機儲存的 OptimizedCrawler（需在暫存工作目錄中呼叫）"""
+    from permit_store import PermitStore
+    module = _load_module('optimized-crawler-stable.py', '_bench_optimized')
+    crawler = module.OptimizedCrawler()
+    crawler.base_url = base_url
+    crawler.fetcher.base_url = base_url
+    crawler.pacer.state_file = None
+    crawler.pacer.start_rps = crawler.pacer.max_rps = max_rps
+    crawler.pacer._state = crawler.pacer._fresh_state()
+    storage = LocalStorage('bucket')
+    crawler.storage = crawler.baojia_filter.storage = storage
+    crawler.store = PermitStore(storage, tagger=crawler.baojia_filter)
+    crawler.html_archive = HtmlArchiveWriter(storage)
+    crawler.metrics_dir = 'crawl-metrics'
+    return crawler
+
+
+def _stored_count(crawler):
+    snapshot = crawler.store.load_snapshot()
+    return len({p['indexKey'] for p in snapshot.get('permits', [])})
+
+
+def optimized_runner(mode):
+    def run(base_url, count, max_rps):
+        crawler = _offline_crawler(base_url, max_rps)
+        started = time.perf_counter()
+        if mode == 'sync':
+            crawler.crawl_year_range(YEAR, 1, count, False)
+        elif mode == 'async':
+            crawler.crawl_year_range_async(YEAR, 1, count, False, max_rps=max_rps)
+            crawler.publish()
+        else:
+            crawler.crawl_year_range_pipeline(YEAR, 1, count, False, max_rps=max_rps)
+            crawler.publish()
+        return _stored_count(crawler), time.perf_counter() - started
+    return run
+
+
+def fetcher_runner(base_url, count, max_rps):
+    fetcher = PermitFetcher(base_url, request_delay=0)
+    started = time.perf_counter()
+    permits = 0
+    for seq in range(1, count + 1):
+        index_key = f"{YEAR}1{seq:05d}00"
+        html = fetcher.fetch_html(index_key)
+        if isinstance(html, str) and html != 'NO_DATA' and permit_parser.parse_permit(html, index_key):
+            permits += 1
+    return permits, time.perf_counter() - started
+
+
+def reference_runner(path, class_name, crawl_one):
+    def run(base_url, count, max_rps):
+        module = _load_module(path, f'_bench_{class_name or "module"}')
+        if class_name:
+            target = getattr(module, class_name).__new__(getattr(module, class_name))  # 不執行 __init__（會建立連線與 OCI client）
+            target.base_url = base_url
+            if not hasattr(target, 'session'):
+                import requests
+                target.session = requests.Session()
+        else:
+            target = module
+            if hasattr(module, 'save_html_to_oci'):
+                module.save_html_to_oci = lambda *args, **kwargs: None
+        started = time.perf_counter()
+        permits = 0
+        for seq in range(1, count + 1):
+            result = crawl_one(target, f"{YEAR}1{seq:05d}00", base_url)
+            if isinstance(result, dict):
+                permits += 1
+        return permits, time.perf_counter() - started
+    return run
+
+
+def implementations():
+    impls = [
+        ('optimized sync', optimized_runner('sync')),
+        ('optimized async', optimized_runner('async')),
+        ('optimized pipeline', optimized_runner('pipeline')),
+        ('permit_fetcher', fetcher_runner),
+    ]
+    impls += [(name, reference_runner(path, class_name, crawl_one))
+              for name, path, class_name, crawl_one in REFERENCE_CRAWLERS]
+    return impls
+
+
+def bench(count=50, latency=(0.0, 0.0), error_rate=0.0, session_requests=None, max_rps=50.0, only=None):
+    print(f"🧪 模擬網站: {count} 筆建照，延遲 {latency[0] * 1000:.0f}-{latency[1] * 1000:.0f}ms，"
+          f"錯誤 {error_rate:.0%}，session {'不失效' if session_requests is None else f'{session_requests} 次請求後失效'}，"
+          f"速率上限 {max_rps}/s")
+    print(f"   {'爬蟲':<28} {'建照':>6} {'秒':>8} {'建照/秒':>8} {'請求/筆':>8}")
+    cwd = os.getcwd()
+    for name, run in implementations():
+        if only and not any(o in name for o in only):
+            continue
+        site = MockPermitSite(frontier={YEAR: count}, latency=latency, error_rate=error_rate,
+                              session_requests=session_requests, seed=0, hang_seconds=1)
+        base_url = site.start()
+        try:
+            with tempfile.TemporaryDirectory(prefix='crawl-bench-') as workdir:
+                os.chdir(workdir)  # 日誌、序號狀態、重試佇列等本機檔案寫在暫存目錄，結束後刪除
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        permits, elapsed = run(base_url, count, max_rps)
+                finally:
+                    os.chdir(cwd)
+        except Exception as e:
+            print(f"   ⏭️ {name}: {type(e).__name__}: {e}")
+            continue
+        finally:
+            site.stop()
+        rate = permits / elapsed if elapsed else float('inf')
+        per_permit = site.stats['requests'] / permits if permits else float('inf')
+        print(f"   {name:<28} {permits:>6} {elapsed:>8.2f} {rate:>8.2f} {per_permit:>8.2f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if '-h' in args or '--help' in args:
+        print(__doc__)
+        sys.exit(0)
+    count = int(_pop_option(args, '--count', 50))
+    low, high = (float(ms) / 1000 for ms in _pop_option(args, '--latency', '20-80').split('-'))
+    error_rate = float(_pop_option(args, '--errors', 0))
+    session_requests = _pop_option(args, '--session-requests')
+    max_rps = float(_pop_option(args, '--max-rps', 50))
+    only = args[args.index('--only') + 1:] if '--only' in args else None
+    bench(count, (low, high), error_rate, int(session_requests) if session_requests else None, max_rps, only)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬取日誌 - 中斷後精確續爬
+取代「結果、失敗清單只在記憶體，收到 SIGINT 才 save_progress」的作法
+（kill -9、OOM、VM 被回收時會遺失最多一個批次的資料與整份失敗清單）：
+1. 每個 INDEX_KEY 抓取完成就追加一行 JSON（結果與解析後資料），上傳成功、範圍開始/結束也各記一行
+2. 每行寫入後立即交給作業系統（行程被砍不會遺失）；fsync 依筆數/時間批次進行（防斷電、VM 回收）
+3. 重新啟動時重播日誌：補上傳尚未上傳的資料、還原無資料清單、失敗的排入重試佇列，
+   並從第一個尚未抓取的序號續爬；已抓取的結果直接使用，不會重抓
+4. 沒有未完成範圍且資料都已上傳時清空日誌，檔案不會無限增長
+
+使用方式:
+    python crawl_journal.py show      # 顯示日誌狀態（未上傳筆數、未完成範圍）
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+DEFAULT_PATH = 'crawl-journal.jsonl'
+
+RESULT = 'result'
+UPLOADED = 'uploaded'
+RANGE = 'range'
+DONE = 'done'
+
+
+def _seq(index_key):
+    return int(index_key[4:9])
+
+
+class JournalState:
+    """重播日誌得到的狀態"""
+
+    def __init__(self):
+        self.results = {}  # index_key -> 結果（dict / NO_DATA / None），依寫入順序
+        self.pending = {}  # index_key -> 建照資料，尚未上傳
+        self.active = None  # 未完成的範圍 {'year', 'start', 'end', 'autoStop'}
+        self.range_keys = []  # 未完成範圍開始後抓取的 index_key
+
+    def apply(self, entry):
+        kind = entry.get('k')
+        if kind == RESULT:
+            key = entry['key']
+            result = entry.get('result')
+            self.results[key] = result
+            if isinstance(result, dict):
+                self.pending[key] = result
+            if self.active is not None:
+                self.range_keys.append(key)
+        elif kind == UPLOADED:
+            for key in entry.get('keys', []):
+                self.pending.pop(key, None)
+        elif kind == RANGE:
+            self.active = {k: entry[k] for k in ('year', 'start', 'end', 'autoStop')}
+            self.range_keys = []
+        elif kind == DONE:
+            self.active = None
+            self.range_keys = []
+
+    def resume_point(self):
+        """未完成範圍中第一個尚未抓取的序號，以及其後已抓取的結果 {index_key: 結果}
+
+        同步爬取依序記錄，續爬點即最後一筆的下一號；非同步爬取可能亂序完成，
+        續爬點為第一個空洞，之後已完成的序號由結果直接補上。
+        """
+        if self.active is None:
+            return None, {}
+        year = self.active['year']
+        fetched = {_seq(k): k for k in self.range_keys if int(k[:3]) == year}
+        seq = self.active['start']
+        while seq in fetched:
+            seq += 1
+        ahead = {fetched[s]: self.results[fetched[s]] for s in fetched if s > seq}
+        return seq, ahead
+
+
+class CrawlJournal:
+    """追加式日誌（執行緒安全）
+
+    Args:
+        path: 日誌檔
+        fsync_every: 每寫入幾筆結果 fsync 一次
+        fsync_interval: 距上次 fsync 超過此秒數時 fsync
+    """
+
+    def __init__(self, path=DEFAULT_PATH, fsync_every=20, fsync_interval=2.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self.state = self.replay(path)
+        self._file = open(path, 'a', encoding='utf-8')
+        if self._file.tell() and not self._ends_with_newline(path):
+            self._file.write('\n')  # 中斷時寫到一半的最後一行，避免與下一行接在一起
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    @staticmethod
+    def replay(path=DEFAULT_PATH):
+        """讀取日誌重建狀態；最後一行寫到一半（中斷時）會被略過"""
+        state = JournalState()
+        if not os.path.exists(path):
+            return state
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                state.apply(entry)
+        return state
+
+    def _append(self, entry, sync=False):
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+            self._file.flush()
+            self.state.apply(entry)
+            self._unsynced += 1
+            if sync or self._unsynced >= self.fsync_every or \
+                    time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    # ---- 記錄 ----
+
+    def result(self, index_key, result):
+        """記錄一個 INDEX_KEY 的抓取結果"""
+        self._append({'k': RESULT, 'key': index_key, 'result': result, 'at': time.time()})
+
+    def uploaded(self, permits):
+        """記錄已上傳的建照；沒有待上傳資料也沒有未完成範圍時清空日誌"""
+        keys = [p.get('indexKey') for p in permits if p.get('indexKey')]
+        self._append({'k': UPLOADED, 'keys': keys}, sync=True)
+        self.checkpoint()
+
+    def begin_range(self, year, start, end, auto_stop):
+        self._append({'k': RANGE, 'year': year, 'start': start, 'end': end, 'autoStop': auto_stop}, sync=True)
+
+    def end_range(self):
+        self._append({'k': DONE}, sync=True)
+        self.checkpoint()
+
+    def checkpoint(self):
+        """沒有需要保留的內容時清空日誌"""
+        with self._lock:
+            if self.state.pending or self.state.active is not None:
+                return
+            self._file.truncate(0)
+            self._sync()
+            self.state = JournalState()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "show":
+        state = CrawlJournal.replay()
+        print(f"📒 日誌: {DEFAULT_PATH}")
+        print(f"   抓取結果: {len(state.results)} 筆, 未上傳: {len(state.pending)} 筆")
+        if state.active:
+            seq, ahead = state.resume_point()
+            print(f"   未完成範圍: {state.active['year']}年 {state.active['start']:05d}-"
+                  f"{state.active['end'] if state.active['end'] else '最新'}，"
+                  f"續爬點 {seq:05d}（其後已抓取 {len(ahead)} 筆）")
+        else:
+            print("   沒有未完成的範圍")
+    else:
+        print(__doc__)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自適應請求節奏控制 (AIMD) - 所有爬蟲共用同一份請求預算
+取代各支爬蟲各自寫死的 request_delay / sleep（0.5、0.8、1.0、1.2 秒）：
+1. 依回應狀況調整每秒請求數：正常回應每次加法增加，超時、連線錯誤、回應過慢、
+   格式錯誤頁面比例過高時乘法減少（兩次減速之間有冷卻時間），上下限可設定
+2. 速率與下一個可發送時間點存在共用狀態檔（檔案鎖保護），同一台機器上的
+   所有爬蟲行程、worker、執行緒共用同一個預算，任一行程觀察到伺服器吃緊，全部一起降速
+3. 每次執行記錄吞吐量、回應時間、各結果數量與每一次降速事件，結束時輸出成 JSON
+
+使用方式:
+    python crawl_pacer.py status     # 顯示共用狀態檔目前的速率
+    python crawl_pacer.py reset      # 清除共用狀態（下次從初始速率開始）
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX 平台：只在行程內共用
+    fcntl = None
+
+DEFAULT_STATE_FILE = os.path.join(tempfile.gettempdir(), 'taichung-permit-pacer.json')
+
+# 請求結果
+OK = 'ok'
+NO_DATA = 'no_data'
+WRONG_FORMAT = 'wrong_format'  # 回應不是建照頁面
+TIMEOUT = 'timeout'
+ERROR = 'error'  # 連線錯誤或非 200 狀態碼
+OUTCOMES = (OK, NO_DATA, WRONG_FORMAT, TIMEOUT, ERROR)
+
+STATE_IDLE_RESET = 600  # 共用狀態超過 10 分鐘沒有更新，視為新的一輪，從初始速率開始
+
+
+class AIMDPacer:
+    """加法增加 / 乘法減少的請求節奏控制（執行緒安全，可跨行程共用）
+
+    Args:
+        max_rps: 每秒請求數上限
+        min_rps: 每秒請求數下限
+        start_rps: 初始速率（共用狀態不存在或已閒置時使用）
+        increase: 每次正常回應增加的每秒請求數
+        decrease: 減速時速率乘上的倍數
+        slow_latency: 回應時間超過此秒數視為伺服器吃緊
+        window: 計算格式錯誤比例的最近請求數
+        bad_ratio: 最近 window 個請求中格式錯誤比例超過此值時減速
+        cooldown: 兩次減速的最短間隔（秒），避免同一波錯誤連續砍半
+        state_file: 共用狀態檔；None 表示只在行程內共用
+    """
+
+    def __init__(self, max_rps=2.0, min_rps=0.2, start_rps=1.0, increase=0.05, decrease=0.5,
+                 slow_latency=5.0, window=20, bad_ratio=0.2, cooldown=5.0, state_file=DEFAULT_STATE_FILE):
+        self.max_rps = max_rps
+        self.min_rps = min_rps
+        self.start_rps = min(start_rps, max_rps)
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.bad_ratio = bad_ratio
+        self.cooldown = cooldown
+        self.state_file = state_file if fcntl is not None else None
+        self._lock = threading.Lock()  # 保護共用狀態
+        self._stats_lock = threading.Lock()  # 保護本次執行的統計
+        self._state = self._fresh_state()
+        self._recent = deque(maxlen=window)  # 最近請求是否為格式錯誤
+
+        # 本次執行的統計
+        self.started = time.time()
+        self.counts = {outcome: 0 for outcome in OUTCOMES}
+        self.latencies = []
+        self.waited = 0.0  # 因節奏控制而等待的總秒數
+        self.backoffs = []  # 降速事件
+        self.samples = []  # (經過秒數, 每秒請求數)，速率改變時記錄
+
+    def _fresh_state(self):
+        return {'rps': self.start_rps, 'nextSlot': 0.0, 'lastDecrease': 0.0, 'updatedAt': 0.0}
+
+    # ---- 共用狀態 ----
+
+    def _locked_state(self, update):
+        """在鎖內讀取狀態、執行 update(state)、寫回，回傳 update 的結果"""
+        with self._lock:
+            if self.state_file is None:
+                return update(self._state)
+            with open(self.state_file, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        state = json.loads(f.read() or '{}')
+                    except ValueError:
+                        state = {}
+                    if time.time() - state.get('updatedAt', 0) > STATE_IDLE_RESET:
+                        state = self._fresh_state()
+                    result = update(state)
+                    state['updatedAt'] = time.time()
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                    return result
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _rate(self, state):
+        return min(max(state.get('rps', self.start_rps), self.min_rps), self.max_rps)
+
+    @property
+    def rps(self):
+        return self._locked_state(self._rate)
+
+    # ---- 節奏控制 ----
+
+    def acquire(self):
+        """每次送出請求前呼叫：預約下一個可發送請求的時間點，必要時等待"""
+        def reserve(state):
+            now = time.time()
+            interval = 1.0 / self._rate(state)
+            slot = max(now, state.get('nextSlot', 0.0))
+            if slot - now > interval * 50:
+                slot = now  # 狀態檔時間異常（例如系統時鐘被調整）
+            state['nextSlot'] = slot + interval
+            return slot - now
+
+        wait = self._locked_state(reserve)
+        if wait > 0:
+            with self._stats_lock:
+                self.waited += wait
+            time.sleep(wait)
+
+    def record(self, outcome, latency=None):
+        """回報一次請求的結果與回應時間，據此調整速率"""
+        with self._stats_lock:
+            self.counts[outcome] += 1
+            if latency is not None:
+                self.latencies.append(latency)
+            self._recent.append(outcome == WRONG_FORMAT)
+            bad_ratio = sum(self._recent) / len(self._recent)
+            enough = len(self._recent) >= self._recent.maxlen / 2
+
+        if outcome in (TIMEOUT, ERROR):
+            reason = outcome
+        elif latency is not None and latency > self.slow_latency:
+            reason = 'slow'
+        elif enough and bad_ratio > self.bad_ratio:
+            reason = WRONG_FORMAT
+        elif outcome in (OK, NO_DATA):
+            reason = None
+        else:
+            return  # 個別的格式錯誤頁面（session 失效）不影響速率
+
+        def adjust(state):
+            now = time.time()
+            before = self._rate(state)
+            if reason is None:
+                after = min(before + self.increase, self.max_rps)
+            elif now - state.get('lastDecrease', 0.0) < self.cooldown:
+                return before, before
+            else:
+                after = max(before * self.decrease, self.min_rps)
+                state['lastDecrease'] = now
+            state['rps'] = after
+            return before, after
+
+        before, after = self._locked_state(adjust)
+        if after == before:
+            return
+        with self._stats_lock:
+            self.samples.append((round(time.time() - self.started, 1), round(after, 3)))
+            if after < before:
+                self._recent.clear()
+                self.backoffs.append({
+                    'at': datetime.now().isoformat(),
+                    'reason': reason,
+                    'latency': round(latency, 3) if latency is not None else None,
+                    'fromRps': round(before, 3),
+                    'toRps': round(after, 3),
+                })
+        if after < before:
+            print(f"🐢 降速 ({reason}): {before:.2f} → {after:.2f} 請求/秒")
+
+    # ---- 統計 ----
+
+    def summary(self):
+        elapsed = time.time() - self.started
+        with self._stats_lock:
+            counts = dict(self.counts)
+            latencies = sorted(self.latencies)
+            backoffs = list(self.backoffs)
+            samples = list(self.samples)
+        requests = sum(counts.values())
+        rates = [rps for _, rps in samples]
+        return {
+            'startedAt': datetime.fromtimestamp(self.started).isoformat(),
+            'elapsed': round(elapsed, 1),
+            'requests': requests,
+            'requestsPerSecond': round(requests / elapsed, 3) if elapsed > 0 else 0,
+            'outcomes': counts,
+            'latencyAvg': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'latencyP95': round(latencies[int(len(latencies) * 0.95)], 3) if latencies else None,
+            'waited': round(self.waited, 1),
+            'rps': {
+                'final': round(self.rps, 3),
+                'min': min(rates, default=None),
+                'max': max(rates, default=None),
+                'ceiling': self.max_rps,
+            },
+            'backoffs': backoffs,
+            'samples': samples,
+        }
+
+    def export(self, path):
+        """把本次執行的統計寫成 JSON"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+if __name__ == "__main__":
+    state_file = DEFAULT_STATE_FILE
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        if os.path.exists(state_file):
+            with open(state_file) as f:
+                print(json.dumps(json.loads(f.read() or '{}'), indent=2))
+        else:
+            print(f"ℹ️ 尚無共用狀態 ({state_file})")
+    elif len(sys.argv) > 1 and sys.argv[1] == "reset":
+        if os.path.exists(state_file):
+            os.unlink(state_file)
+        print(f"✅ 已清除共用狀態 ({state_file})")
+    else:
+        print(__doc__)
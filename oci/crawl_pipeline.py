@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分段爬取管線 - 抓取 → 解析 → 儲存
+取代 crawl_single_permit 在同一個執行緒依序做網路請求、Big5 解碼、解析、HTML 存檔的作法
+（解析或上傳時網路閒置，等待回應時 CPU 閒置）：
+1. 抓取：多個 I/O 執行緒只負責請求，原始位元組放進有上限的佇列
+2. 解析：行程池在所有核心上解碼並解析（不受 GIL 限制）
+3. 儲存：依序號順序記錄結果（自動停止規則不變）、寫日誌、存 HTML，批次上傳在背景執行緒進行
+4. 佇列上限即背壓：下游慢時上游等待而不是無限堆積記憶體；上限可設定。
+   儲存端等待較慢的序號時，已發出但尚未記錄的序號不超過解析佇列上限，抓取端暫停發出新序號，
+   等待依序記錄的重排緩衝區因此也有上限
+5. 定期取樣各段佇列深度與各段忙碌/等待時間，結束時輸出成 JSON，可看出瓶頸在哪一段
+
+使用方式:
+    python optimized-crawler-stable.py pipeline <年份> <起始序號> [結束序號|auto] [抓取執行緒] [解析行程] [每秒請求上限]
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import permit_parser
+from permit_fetcher import PermitFetcher, NO_DATA
+
+_END = object()  # 佇列結束標記
+
+
+def parse_page(raw, index_key):
+    """在解析行程中執行：解碼並解析，回傳 (建照資料或 None, 解碼後的 HTML)"""
+    html = PermitFetcher.decode_page(raw)
+    try:
+        return permit_parser.parse_permit(html, index_key), html
+    except Exception as e:
+        print(f"❌ 解析失敗 {index_key}: {e}")
+        return None, html
+
+
+def _warm_up(_):
+    return os.getpid()
+
+
+class StageStats:
+    """單一階段的忙碌 / 等待時間（執行緒安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.items = 0
+        self.busy = 0.0  # 實際工作的秒數
+        self.blocked = 0.0  # 等待下游佇列有空位的秒數（背壓）
+        self.starved = 0.0  # 等待上游送來工作的秒數
+
+    def add(self, **seconds):
+        with self._lock:
+            for name, value in seconds.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self):
+        with self._lock:
+            return {'items': self.items, 'busy': round(self.busy, 2), 'blocked': round(self.blocked, 2),
+                    'starved': round(self.starved, 2)}
+
+
+class CrawlPipeline:
+    """抓取 → 解析 → 儲存三段管線
+
+    Args:
+        crawler: OptimizedCrawler
+        fetchers: 抓取執行緒數（同時在途的請求數）
+        parsers: 解析行程數，預設為 CPU 核心數
+        raw_queue: 抓取 → 解析佇列上限（頁面數）
+        parsed_queue: 解析 → 儲存佇列上限（頁面數）
+        max_rps: 每秒請求上限（共用的節奏控制）
+        sample_interval: 佇列深度取樣間隔（秒）
+    """
+
+    def __init__(self, crawler, fetchers=8, parsers=None, raw_queue=32, parsed_queue=64, max_rps=4.0,
+                 sample_interval=1.0):
+        self.crawler = crawler
+        self.fetchers = fetchers
+        self.parsers = parsers or os.cpu_count() or 1
+        self.raw_queue = queue.Queue(maxsize=raw_queue)
+        self.parsed_queue = queue.Queue(maxsize=parsed_queue)
+        self.sample_interval = sample_interval
+        self.pacer = crawler.pacer
+        self.pacer.max_rps = max_rps
+        # 所有抓取執行緒共用一個 session 池，已暖機的 session 跨 INDEX_KEY 重用
+        self.fetcher = PermitFetcher(
+            crawler.base_url,
+            timeout=crawler.timeout,
+            request_delay=0,
+            pool_size=1,
+            pacer=self.pacer,
+            sessions=fetchers
+        )
+        self.stats = {'fetch': StageStats(), 'parse': StageStats(), 'store': StageStats()}
+        self.samples = []  # 佇列深度取樣
+        self.reorder = {}  # seq -> 已解析、等待依序記錄的結果（大小受 parsed_queue 上限限制）
+        self._window = threading.Condition()
+        self._stored_seq = 0  # 儲存端下一個要記錄的序號；發出的序號不超過此值 + parsed_queue 上限
+        self.uploading = False
+        self.started = time.time()
+
+    # ---- 各階段 ----
+
+    def _fetch_loop(self, year, next_seq, end_seq, stop):
+        permit_type = 1
+        stats = self.stats['fetch']
+        while not stop.is_set():
+            seq = next_seq()
+            if seq is None or (end_seq and seq > end_seq):
+                break
+            index_key = f"{year}{permit_type}{seq:05d}00"
+            started = time.monotonic()
+            if index_key in self.crawler.prefetched:
+                item = (seq, index_key, self.crawler.prefetched.pop(index_key), True)
+            else:
+                try:
+                    page = self.fetcher.fetch_page(index_key)
+                except Exception as e:
+                    print(f"❌ 錯誤 {index_key}: {e}")
+                    page = None
+                item = (seq, index_key, page, False)
+            fetched = time.monotonic()
+            self.raw_queue.put(item)
+            stats.add(items=1, busy=fetched - started, blocked=time.monotonic() - fetched)
+
+    def _parse_loop(self, pool):
+        stats = self.stats['parse']
+        while True:
+            waiting = time.monotonic()
+            item = self.raw_queue.get()
+            started = time.monotonic()
+            if item is _END:
+                break
+            seq, index_key, raw, logged = item
+            html = None
+            if isinstance(raw, bytes):
+                try:
+                    result, html = pool.submit(parse_page, raw, index_key).result()
+                except Exception as e:
+                    print(f"❌ 解析行程錯誤 {index_key}: {e}")
+                    result = None
+            else:
+                result = raw  # NO_DATA、失敗（None），或探測前緣時已取得的結果
+            parsed = time.monotonic()
+            self.parsed_queue.put((seq, index_key, result, html, logged))
+            stats.add(items=1, busy=parsed - started, blocked=time.monotonic() - parsed, starved=started - waiting)
+
+    def _next_result(self, seq):
+        """從解析佇列取出直到 seq 的結果可用；上游已結束時回傳 _END"""
+        stats = self.stats['store']
+        while seq not in self.reorder:
+            waiting = time.monotonic()
+            item = self.parsed_queue.get()
+            stats.add(starved=time.monotonic() - waiting)
+            if item is _END:
+                return _END
+            self.reorder[item[0]] = item
+        return self.reorder.pop(seq)
+
+    def _sample(self, stop):
+        while not stop.wait(self.sample_interval):
+            self.samples.append({
+                't': round(time.time() - self.started, 1),
+                'raw': self.raw_queue.qsize(),
+                'parsed': self.parsed_queue.qsize(),
+                'reorder': len(self.reorder),
+                'uploading': self.uploading,
+                'rps': round(self.pacer.rps, 3),
+            })
+
+    # ---- 執行 ----
+
+    def run(self, year, start_seq, end_seq=None, auto_stop=False):
+        """爬取指定年份範圍，參數語意與 OptimizedCrawler.crawl_year_range 相同"""
+        crawler = self.crawler
+        if end_seq:
+            print(f"🚀 開始管線爬取 {year} 年資料 ({start_seq:05d}-{end_seq:05d})")
+        else:
+            print(f"🚀 開始管線爬取 {year} 年資料 (從 {start_seq:05d} 開始，直到空白)")
+        print(f"🔧 參數: 抓取={self.fetchers}, 解析行程={self.parsers}, 佇列={self.raw_queue.maxsize}/"
+              f"{self.parsed_queue.maxsize}, 速率上限={self.pacer.max_rps}/s, 批次={crawler.batch_size}")
+        print("=" * 70)
+
+        # 先建立解析行程，再啟動執行緒（fork 時不帶著執行緒中的鎖）
+        parse_pool = ProcessPoolExecutor(max_workers=self.parsers)
+        list(parse_pool.map(_warm_up, range(self.parsers)))
+        upload_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload')
+
+        stop = threading.Event()
+        counter = {'seq': start_seq}
+        self._stored_seq = start_seq
+
+        def next_seq():
+            """發出下一個序號；領先儲存端達 parsed_queue 上限時等待，停止時回傳 None"""
+            with self._window:
+                limit = self.parsed_queue.maxsize  # 0 表示不限
+                while limit and counter['seq'] >= self._stored_seq + limit:
+                    if stop.is_set():
+                        return None
+                    self._window.wait(0.2)
+                seq = counter['seq']
+                counter['seq'] += 1
+                return seq
+
+        fetch_threads = [threading.Thread(target=self._fetch_loop, args=(year, next_seq, end_seq, stop),
+                                          name=f'fetch-{i}', daemon=True) for i in range(self.fetchers)]
+        parse_threads = [threading.Thread(target=self._parse_loop, args=(parse_pool,),
+                                          name=f'parse-{i}', daemon=True) for i in range(self.parsers)]
+        sampler_stop = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(sampler_stop,), name='sampler', daemon=True)
+
+        def close_stages():
+            # 抓取全部結束後通知解析，解析全部結束後通知儲存
+            for thread in fetch_threads:
+                thread.join()
+            for _ in parse_threads:
+                self.raw_queue.put(_END)
+            for thread in parse_threads:
+                thread.join()
+            self.parsed_queue.put(_END)
+
+        closer = threading.Thread(target=close_stages, name='closer', daemon=True)
+        for thread in fetch_threads + parse_threads + [sampler, closer]:
+            thread.start()
+
+        try:
+            self._store(year, start_seq, end_seq, auto_stop, stop, upload_pool)
+        finally:
+            stop.set()
+            # 停止後仍要清空解析佇列，上游才不會卡在已滿的佇列上
+            while closer.is_alive():
+                try:
+                    self.parsed_queue.get(timeout=0.2)
+                except queue.Empty:
+                    pass
+            sampler_stop.set()
+            upload_pool.shutdown(wait=True)
+            parse_pool.shutdown(wait=True)
+            self.uploading = False
+
+        # 上傳最後剩餘的資料（停止點之後才完成的序號不計入）
+        if crawler.results:
+            print(f"\n💾 上傳最終資料 ({len(crawler.results)} 筆)...")
+            if crawler.upload_batch_data(crawler.results):
+                crawler.results = []
+        crawler.publish()
+
+        crawler.print_final_stats(self.fetcher)
+        self.print_summary()
+        self.export()
+
+    def _store(self, year, start_seq, end_seq, auto_stop, stop, upload_pool):
+        """依序號順序記錄結果並套用自動停止規則；批次上傳交給背景執行緒"""
+        crawler = self.crawler
+        stats = self.stats['store']
+        counters = {'no_data': 0, 'failed': 0}
+        upload = None
+        seq = start_seq
+        while not (end_seq and seq > end_seq):
+            item = self._next_result(seq)
+            if item is _END:
+                break
+            started = time.monotonic()
+            _, index_key, result, html, logged = item
+            if not logged:
+                crawler.log_result(index_key, result)
+            if result and result != NO_DATA and html is not None:
+                crawler.save_html_background(index_key, html)
+            print(f"🔍 [{seq:05d}] {index_key}...", end=' ')
+            if crawler.record_result(year, seq, index_key, result, counters, auto_stop):
+                stop.set()
+                break
+            if len(crawler.results) >= crawler.batch_size and (upload is None or upload.done()):
+                self.uploading = True
+                upload = upload_pool.submit(self._upload)
+            seq += 1
+            with self._window:
+                self._stored_seq = seq
+                self._window.notify_all()
+            stats.add(items=1, busy=time.monotonic() - started)
+        stop.set()
+        if upload is not None:
+            upload.result()
+
+    def _upload(self):
+        try:
+            return self.crawler.flush_batch()
+        finally:
+            self.uploading = False
+
+    # ---- 統計 ----
+
+    def summary(self):
+        def depth(name):
+            values = [s[name] for s in self.samples]
+            return {'max': max(values, default=0),
+                    'avg': round(sum(values) / len(values), 2) if values else 0}
+
+        return {
+            'startedAt': datetime.fromtimestamp(self.started).isoformat(),
+            'elapsed': round(time.time() - self.started, 1),
+            'fetchers': self.fetchers,
+            'parsers': self.parsers,
+            'queueLimits': {'raw': self.raw_queue.maxsize, 'parsed': self.parsed_queue.maxsize},
+            'stages': {name: stats.summary() for name, stats in self.stats.items()},
+            'queueDepth': {name: depth(name) for name in ('raw', 'parsed', 'reorder')},
+            'samples': self.samples,
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print("   管線各段 (忙碌 / 等待下游 / 等待上游 秒):")
+        for name, stage in summary['stages'].items():
+            print(f"     {name}: {stage['items']} 筆, {stage['busy']} / {stage['blocked']} / {stage['starved']}")
+        depth = summary['queueDepth']
+        print(f"   佇列深度 (最大/平均): 抓取→解析 {depth['raw']['max']}/{depth['raw']['avg']}, "
+              f"解析→儲存 {depth['parsed']['max']}/{depth['parsed']['avg']}, "
+              f"等待排序 {depth['reorder']['max']}/{depth['reorder']['avg']}")
+
+    def export(self):
+        """把管線統計寫成 JSON（與節奏統計放在同一目錄）"""
+        started = datetime.fromtimestamp(self.started).strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.crawler.metrics_dir, f"pipeline-{started}-{os.getpid()}.json")
+        try:
+            os.makedirs(self.crawler.metrics_dir, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+            print(f"   管線統計: {path}")
+        except OSError as e:
+            print(f"⚠️ 無法輸出管線統計: {e}")
+        return path
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-每日自動爬蟲 V2 - 持續爬取直到遇到空白
+每日自動爬蟲 V2 - 先找出最新已發照序號，再爬取新的建照
 """
 
 import sys
@@ -41,7 +41,7 @@ def save_progress(progress):
         json.dump(progress, f, ensure_ascii=False, indent=2)
 
 def daily_crawl():
-    """每日爬蟲任務 - 持續爬取直到遇到空白"""
+    """每日爬蟲任務 - 以指數 + 二分搜尋找出最新序號，只爬取其間的新建照"""
     
     print(f"🕐 每日爬蟲 V2 開始: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
@@ -55,9 +55,9 @@ def daily_crawl():
     print(f"📊 當前進度: {year}年 序號{current_seq}")
     print(f"   連續空白: {consecutive_empty}次")
     
-    # 創建爬蟲實例
+    # 創建爬蟲實例（先補上傳上次中斷時日誌中尚未上傳的資料）
     crawler = OptimizedCrawler()
-    crawler.request_delay = 0.8
+    crawler.recover()
     
     # 記錄本次執行的統計
     crawled_count = 0
@@ -66,8 +66,13 @@ def daily_crawl():
     error_count = 0
     batch_data = []
     
-    # 持續爬取直到遇到空白
-    while True:
+    # 找出最新已發照序號（探測到的結果爬取時直接使用），每次最多爬50筆（避免執行太久）
+    frontier = crawler.find_frontier(year, current_seq - 1)
+    end_seq = min(frontier, current_seq + 49)
+    if frontier < current_seq:
+        print('✅ 沒有新的建照')
+    
+    while current_seq <= end_seq:
         index_key = f'{year}10{current_seq:04d}00'
         print(f'\n🔍 [{crawled_count + 1}] 爬取: {index_key}')
         
@@ -114,18 +119,12 @@ def daily_crawl():
             progress['currentSequence'] = current_seq + 1
             progress['lastCrawledAt'] = datetime.now().isoformat()
             
-            if consecutive_empty >= 3:
-                # 連續3個序號都無資料，停止爬取
-                print(f'\n🏁 連續{consecutive_empty}個序號無資料，停止爬取')
-                print(f'📌 最後有效序號: {current_seq - consecutive_empty}')
-                break
-            else:
-                # 繼續嘗試下一個序號
-                current_seq += 1
+            # 最新序號之前的空號，繼續下一個序號
+            current_seq += 1
                 
         else:
-            # 爬取失敗（可能是網路問題或格式錯誤）
-            print(f'❌ 爬取失敗')
+            # 爬取失敗（可能是網路問題或格式錯誤），已排入重試佇列
+            print(f'❌ 爬取失敗，已排入重試佇列')
             print(f'   返回值: {result}')
             print(f'   可能原因: 網路問題、網站暫時無法訪問、或序號格式錯誤')
             error_count += 1
@@ -140,16 +139,11 @@ def daily_crawl():
                 print('\n❌ 錯誤次數過多，停止爬取')
                 break
         
-        # 儲存進度
+        # 儲存進度（請求節奏由爬蟲共用的 pacer 控制，不再固定 sleep）
         save_progress(progress)
-        
-        # 延遲避免被封鎖
-        time.sleep(crawler.request_delay)
-        
-        # 如果已爬取超過50筆，先停止（避免執行太久）
-        if crawled_count >= 50:
-            print('\n⏸️ 已爬取50筆，暫停執行')
-            break
+    
+    if end_seq < frontier:
+        print(f'\n⏸️ 已爬取50筆，暫停執行（最新序號 {frontier}）')
     
     # 上傳剩餘的資料
     if batch_data:
@@ -160,6 +154,15 @@ def daily_crawl():
         else:
             print('❌ 上傳失敗!')
     
+    # 失敗的序號已排入重試佇列，這裡重試退避時間已到的
+    crawler.retry_due()
+    
+    # 用今日剩餘的重爬預算重爬分數最高的不完整資料（每次執行最多50筆）
+    crawler.recrawl_incomplete(50)
+    
+    # 壓實發佈到 permits.json（批次上傳只寫入 delta segment）
+    crawler.publish()
+    
     # 顯示統計
     print(f"\n📊 本次執行統計:")
     print(f"   總爬取: {crawled_count} 筆")
@@ -167,6 +170,7 @@ def daily_crawl():
     print(f"   空白: {empty_count} 筆")
     print(f"   錯誤: {error_count} 筆")
     print(f"   最新序號: {progress['currentSequence']}")
+    crawler.export_metrics()
     
     print(f"\n🕐 每日爬蟲 V2 結束: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
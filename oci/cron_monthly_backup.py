@@ -5,11 +5,12 @@
 
 import json
 import requests
-import subprocess
 import os
 from datetime import datetime
 from collections import defaultdict
 
+from object_storage import open_storage
+
 # 切換到正確的工作目錄
 os.chdir('/mnt/c/claude code/建照爬蟲/oci')
 
@@ -59,27 +60,13 @@ def monthly_backup():
         
         # 上傳到OCI backups目錄
         print(f"\n📤 上傳到OCI backups/monthly/...")
-        namespace = "nrsdi1rz5vl8"
-        bucket_name = "taichung-building-permits"
-        
-        cmd = [
-            "oci", "os", "object", "put",
-            "--namespace", namespace,
-            "--bucket-name", bucket_name,
-            "--name", f"backups/monthly/{backup_filename}",
-            "--file", backup_filename,
-            "--content-type", "application/json",
-            "--force"
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True)
-        if result.returncode == 0:
+        if open_storage().upload(backup_filename, f"backups/monthly/{backup_filename}", "application/json"):
             print(f"✅ 備份成功上傳到OCI")
             # 刪除本地檔案以節省空間
             os.remove(backup_filename)
             print(f"🗑️ 已刪除本地檔案")
         else:
-            print(f"❌ 上傳失敗: {result.stderr.decode()}")
+            print(f"❌ 上傳失敗")
             print(f"⚠️ 本地備份保留在: {backup_filename}")
         
         # 顯示統計
@@ -102,29 +89,15 @@ def clean_old_backups():
     """清理超過6個月的舊備份"""
     try:
         # 列出OCI上的月備份
-        namespace = "nrsdi1rz5vl8"
-        bucket_name = "taichung-building-permits"
-        
-        cmd = [
-            "oci", "os", "object", "list",
-            "--namespace", namespace,
-            "--bucket-name", bucket_name,
-            "--prefix", "backups/monthly/",
-            "--limit", "100"
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            import json
-            objects = json.loads(result.stdout)
-            
+        storage = open_storage()
+        names = storage.list_names("backups/monthly/")
+        if names:
             # 計算6個月前的日期
-            from datetime import datetime, timedelta
+            from datetime import timedelta
             six_months_ago = datetime.now() - timedelta(days=180)
             
             deleted_count = 0
-            for obj in objects.get('data', []):
-                obj_name = obj.get('name', '')
+            for obj_name in names:
                 # 解析檔名中的日期 (monthly_backup_YYYYMM.json)
                 if 'monthly_backup_' in obj_name:
                     try:
@@ -133,15 +106,7 @@ def clean_old_backups():
                         
                         if backup_date < six_months_ago:
                             # 刪除舊備份
-                            delete_cmd = [
-                                "oci", "os", "object", "delete",
-                                "--namespace", namespace,
-                                "--bucket-name", bucket_name,
-                                "--object-name", obj_name,
-                                "--force"
-                            ]
-                            delete_result = subprocess.run(delete_cmd, capture_output=True)
-                            if delete_result.returncode == 0:
+                            if storage.delete(obj_name):
                                 print(f"   🗑️ 已刪除舊備份: {obj_name}")
                                 deleted_count += 1
                     except:
@@ -11,6 +11,9 @@ from datetime import datetime
 import time
 import sys
 
+from object_storage import open_storage
+from permit_store import PermitStore
+
 def log(message):
     """記錄日誌"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -24,22 +27,16 @@ def main():
     namespace = "nrsdi1rz5vl8"
     bucket_name = "taichung-building-permits"
     
-    # 載入現有資料
+    # 載入現有資料（快照加上其他 worker 尚未壓實的 segment）
     log("載入現有資料...")
-    permits = []
-    try:
-        cmd = ["oci", "os", "object", "get", "--namespace", namespace,
-               "--bucket-name", bucket_name, "--name", "data/permits.json",
-               "--file", "/tmp/existing.json"]
-        subprocess.run(cmd, capture_output=True)
-        
-        with open('/tmp/existing.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            permits = data.get('permits', [])
-            log(f"載入 {len(permits)} 筆現有資料")
-    except Exception as e:
-        log(f"載入資料失敗: {e}")
+    storage = open_storage(namespace, bucket_name)
+    store = PermitStore(storage)
+    existing = store.load_current()
+    if not existing:
+        log("載入資料失敗")
         return
+    new_permits = []
+    log(f"載入 {len(existing)} 筆現有資料")
     
     # 取得當前年份（民國年）
     current_year = datetime.now().year - 1911
@@ -59,7 +56,7 @@ def main():
         index_key = f"{current_year}{permit_type}{seq:05d}00"
         
         # 檢查是否已存在
-        if any(p.get('indexKey') == index_key for p in permits):
+        if index_key in existing:
             continue
         
         # 爬取單筆
@@ -115,9 +112,9 @@ def main():
                                 permit_data['applicantName'] = m.group(1).strip()
                             
                             # 保存HTML
-                            save_html(index_key, html, namespace, bucket_name)
+                            save_html(storage, index_key, html)
                             
-                            permits.append(permit_data)
+                            new_permits.append(permit_data)
                             new_count += 1
                             log(f"✅ 新增: {permit_data['permitNumber']} - {permit_data.get('applicantName', 'N/A')}")
                         
@@ -126,70 +123,28 @@ def main():
         
         time.sleep(2)
     
-    # 儲存更新後的資料
+    # 儲存更新後的資料：只寫入本次新增的 segment 再壓實（條件式發佈，不會覆蓋其他 worker 的資料）
     if new_count > 0:
         log(f"儲存 {new_count} 筆新資料...")
-        
-        # 排序
-        sorted_permits = sorted(permits, key=lambda x: (
-            -x.get('permitYear', 0),
-            -x.get('sequenceNumber', 0)
-        ))
-        
-        data = {
-            "lastUpdate": datetime.now().isoformat(),
-            "totalCount": len(sorted_permits),
-            "yearCounts": {},
-            "permits": sorted_permits
-        }
-        
-        # 統計各年份
-        for permit in sorted_permits:
-            year = permit.get('permitYear', 0)
-            if year not in data['yearCounts']:
-                data['yearCounts'][year] = 0
-            data['yearCounts'][year] += 1
-        
-        # 寫入檔案
-        with open('/tmp/permits_updated.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        # 上傳到OCI
-        cmd = ["oci", "os", "object", "put", "--namespace", namespace,
-               "--bucket-name", bucket_name, "--name", "data/permits.json",
-               "--file", "/tmp/permits_updated.json", "--content-type", "application/json",
-               "--force"]
-        result = subprocess.run(cmd, capture_output=True)
-        
-        if result.returncode == 0:
-            log(f"✅ 資料更新完成！總計 {len(sorted_permits)} 筆")
-        else:
+        if not store.append_segment(new_permits):
             log("❌ 資料上傳失敗")
+        elif store.compact():
+            log(f"✅ 資料更新完成！新增 {new_count} 筆")
+        else:
+            log("⚠️ 已寫入 segment，壓實發佈失敗，留待下次壓實")
     else:
         log("沒有發現新資料")
     
     # 記錄執行日誌
-    save_log(new_count, namespace, bucket_name)
+    save_log(storage, new_count)
     
     log("每日更新爬蟲執行完成")
 
-def save_html(index_key, html_content, namespace, bucket_name):
+def save_html(storage, index_key, html_content):
     """保存HTML到OCI"""
-    try:
-        temp_file = f"/tmp/html_{index_key}.html"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        cmd = ["oci", "os", "object", "put", "--namespace", namespace,
-               "--bucket-name", bucket_name, "--name", f"html/{index_key}.html",
-               "--file", temp_file, "--content-type", "text/html; charset=utf-8",
-               "--force"]
-        subprocess.run(cmd, capture_output=True)
-        subprocess.run(["rm", temp_file], capture_output=True)
-    except:
-        pass
+    storage.put_bytes(f"html/{index_key}.html", html_content.encode('utf-8'), "text/html; charset=utf-8")
 
-def save_log(new_count, namespace, bucket_name):
+def save_log(storage, new_count):
     """保存執行日誌"""
     try:
         log_entry = {
@@ -200,15 +155,7 @@ def save_log(new_count, namespace, bucket_name):
         }
         
         # 載入現有日誌
-        logs = []
-        cmd = ["oci", "os", "object", "get", "--namespace", namespace,
-               "--bucket-name", bucket_name, "--name", "logs/daily-crawler.json",
-               "--file", "/tmp/logs.json"]
-        
-        result = subprocess.run(cmd, capture_output=True)
-        if result.returncode == 0:
-            with open('/tmp/logs.json', 'r') as f:
-                logs = json.load(f)
+        logs = storage.get_json("logs/daily-crawler.json", [])
         
         # 添加新日誌
         logs.append(log_entry)
@@ -218,14 +165,7 @@ def save_log(new_count, namespace, bucket_name):
             logs = logs[-30:]
         
         # 保存日誌
-        with open('/tmp/logs_updated.json', 'w') as f:
-            json.dump(logs, f, ensure_ascii=False, indent=2)
-        
-        cmd = ["oci", "os", "object", "put", "--namespace", namespace,
-               "--bucket-name", bucket_name, "--name", "logs/daily-crawler.json",
-               "--file", "/tmp/logs_updated.json", "--content-type", "application/json",
-               "--force"]
-        subprocess.run(cmd, capture_output=True)
+        storage.put_json("logs/daily-crawler.json", logs, indent=2)
     except:
         pass
 
@@ -44,33 +44,13 @@ class EnhancedCrawler(OptimizedCrawler):
         """更新寶佳篩選結果到OCI"""
         try:
             # 下載最新建照資料
-            subprocess.run([
-                'oci', 'os', 'object', 'get',
-                '--namespace', self.namespace,
-                '--bucket-name', self.bucket_name,
-                '--name', 'data/permits.json',
-                '--file', '/tmp/permits_for_filter.json'
-            ], capture_output=True)
-            
-            with open('/tmp/permits_for_filter.json', 'r') as f:
-                data = json.load(f)
+            data = self.storage.get_json('data/permits.json', {})
             
             # 即時篩選
             filter_result = self.baojia_filter.filter_permits_realtime(data.get('permits', []))
             
-            # 儲存篩選結果
-            with open('/tmp/baojia_realtime_results.json', 'w') as f:
-                json.dump(filter_result, f, ensure_ascii=False, indent=2)
-            
             # 上傳到OCI
-            subprocess.run([
-                'oci', 'os', 'object', 'put',
-                '--namespace', self.namespace,
-                '--bucket-name', self.bucket_name,
-                '--name', 'data/baojia_realtime_results.json',
-                '--file', '/tmp/baojia_realtime_results.json',
-                '--force'
-            ], capture_output=True)
+            self.storage.put_json('data/baojia_realtime_results.json', filter_result, indent=2)
             
             print(f"  📊 寶佳篩選結果已更新: {filter_result['totalCount']} 筆")
             
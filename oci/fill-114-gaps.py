@@ -4,46 +4,25 @@
 補爬114年缺失的序號
 """
 
-import sys
+import importlib.util
 import os
+import sys
+
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# 直接複製需要的類別
-import subprocess
-import time
-import json
-import re
-from datetime import datetime
-import signal
-import tempfile
-import json
-import subprocess
+# 載入穩定版爬蟲（檔名含連字號，以檔案路徑匯入）
+_spec = importlib.util.spec_from_file_location(
+    'optimized_crawler_stable', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'optimized-crawler-stable.py'))
+_crawler_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_crawler_module)
+OptimizedCrawler = _crawler_module.OptimizedCrawler
+
+from sequence_state import SequenceStateIndex, UNKNOWN, FAILED
 
 def get_missing_sequences():
-    """取得缺失的序號"""
-    # 下載最新資料
-    subprocess.run(['oci', 'os', 'object', 'get', 
-                   '--namespace', 'nrsdi1rz5vl8', 
-                   '--bucket-name', 'taichung-building-permits', 
-                   '--name', 'data/permits.json', 
-                   '--file', '/tmp/check_gaps.json'], capture_output=True)
-    
-    with open('/tmp/check_gaps.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    permits = data.get('permits', [])
-    
-    # 取得114年的所有序號
-    year_114 = [p for p in permits if p.get('permitYear') == 114]
-    existing_nums = set([p.get('sequenceNumber', 0) for p in year_114])
-    
-    # 找出缺失的序號（1-580範圍內）
-    missing = []
-    for i in range(1, 581):  # 只檢查到580，因為目前最大是580
-        if i not in existing_nums:
-            missing.append(i)
-    
-    return missing
+    """取得缺失的序號（查序號狀態索引，不再下載整份資料集；範圍到最新已知有資料的序號）"""
+    index = SequenceStateIndex()
+    return list(index.sequences(114, states=(UNKNOWN, FAILED)))
 
 def group_sequences(sequences):
     """將序號分組為連續區間"""
@@ -95,7 +74,6 @@ def main():
     
     # 開始補爬
     crawler = OptimizedCrawler()
-    crawler.request_delay = 0.5  # 加快速度
     
     print("🚀 開始補爬缺失序號...")
     
@@ -110,7 +88,7 @@ def main():
         for start, end in batch_ranges:
             try:
                 print(f"🔧 補爬 114年 {start:05d}-{end:05d}...")
-                crawler.crawl_year_range(114, start, end, False)
+                crawler.crawl_year_range(114, start, end, False, finish=False)
                 print(f"✅ 完成 {start:05d}-{end:05d}")
             except KeyboardInterrupt:
                 print("\n🛑 用戶中斷")
@@ -119,6 +97,8 @@ def main():
                 print(f"❌ 失敗: {e}")
                 continue
     
+    # 所有區間爬完才重試與壓實發佈一次
+    crawler.finish()
     print("\n🎉 補爬完成！")
     
     # 重新檢查
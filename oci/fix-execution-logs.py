@@ -4,10 +4,11 @@
 """
 
 import json
-import subprocess
 import re
 from datetime import datetime
 
+from object_storage import open_storage
+
 def main():
     print("🔧 修正執行記錄...")
     
@@ -49,21 +50,8 @@ def main():
             print(f"   113年資料: {year_113_count}")
             print(f"   最後ID: {last_id}")
             
-            # 儲存執行記錄
-            with open('/tmp/fixed-execution-log.json', 'w', encoding='utf-8') as f:
-                json.dump([execution_log], f, ensure_ascii=False, indent=2)
-            
             # 上傳到OCI
-            cmd = ["oci", "os", "object", "put",
-                   "--namespace", "nrsdi1rz5vl8",
-                   "--bucket-name", "taichung-building-permits",
-                   "--name", "logs/execution-history.json",
-                   "--file", "/tmp/fixed-execution-log.json",
-                   "--content-type", "application/json",
-                   "--force"]
-            
-            result = subprocess.run(cmd, capture_output=True)
-            if result.returncode == 0:
+            if open_storage().put_json("logs/execution-history.json", [execution_log], indent=2):
                 print("✅ 執行記錄已修正並上傳")
             else:
                 print("❌ 上傳失敗")
@@ -76,19 +64,7 @@ def main():
             "sequence": int(last_id[3:8]) if len(last_id) > 8 else 1800
         }
         
-        with open('/tmp/last-update-info.json', 'w', encoding='utf-8') as f:
-            json.dump(last_update_info, f, ensure_ascii=False, indent=2)
-        
-        cmd = ["oci", "os", "object", "put",
-               "--namespace", "nrsdi1rz5vl8",
-               "--bucket-name", "taichung-building-permits",
-               "--name", "logs/last-update-info.json",
-               "--file", "/tmp/last-update-info.json",
-               "--content-type", "application/json",
-               "--force"]
-        
-        result = subprocess.run(cmd, capture_output=True)
-        if result.returncode == 0:
+        if open_storage().put_json("logs/last-update-info.json", last_update_info, indent=2):
             print("✅ 最後更新資訊已儲存")
         else:
             print("❌ 儲存最後更新資訊失敗")
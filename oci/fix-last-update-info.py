@@ -4,9 +4,10 @@
 """
 
 import json
-import subprocess
 from datetime import datetime
 
+from object_storage import open_storage
+
 def main():
     print("🔧 修正最後更新資訊...")
     
@@ -25,21 +26,8 @@ def main():
     print(f"   下次開始: 11410109900")
     print(f"   當前年份: 114年")
     
-    # 儲存到檔案
-    with open('/tmp/last-update-info.json', 'w', encoding='utf-8') as f:
-        json.dump(last_update_info, f, ensure_ascii=False, indent=2)
-    
     # 上傳到OCI
-    cmd = ["oci", "os", "object", "put",
-           "--namespace", "nrsdi1rz5vl8",
-           "--bucket-name", "taichung-building-permits",
-           "--name", "logs/last-update-info.json",
-           "--file", "/tmp/last-update-info.json",
-           "--content-type", "application/json",
-           "--force"]
-    
-    result = subprocess.run(cmd, capture_output=True)
-    if result.returncode == 0:
+    if open_storage().put_json("logs/last-update-info.json", last_update_info, indent=2):
         print("✅ 最後更新資訊已修正")
         print("")
         print("🕒 明天凌晨3:00自動爬蟲將會:")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+最新已發照序號（前緣）搜尋 - 指數 + 二分搜尋
+取代「逐一序號往後爬，連續 3 / 20 個無資料才停止」的作法：
+1. 從上次已知的前緣開始，以 1、2、4、8... 的步幅往後探測，直到探到無資料區，再於區間內二分搜尋
+2. 一個探測點「有資料」的判斷容許零星空號：該點起連續 gap_tolerance 個序號都無資料才視為無資料區
+3. 每年的前緣記錄在本機快取檔，下次直接從已知前緣開始，探測次數約為 2·log2(新增筆數)
+4. 探測時取得的結果一併回傳，爬取時不必重抓
+
+使用方式:
+    python frontier_search.py show    # 顯示快取的各年度前緣
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+NO_DATA = "NO_DATA"
+
+DEFAULT_CACHE_FILE = 'frontier-cache.json'
+
+
+class FrontierCache:
+    """每年最後已知的已發照序號"""
+
+    def __init__(self, path=DEFAULT_CACHE_FILE):
+        self.path = path
+        self.data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                self.data = {}
+
+    def get(self, year):
+        entry = self.data.get(str(year))
+        return entry['sequence'] if entry else None
+
+    def set(self, year, sequence):
+        """只往前推進（已發照的序號不會消失）"""
+        if sequence <= (self.get(year) or 0):
+            return
+        self.data[str(year)] = {'sequence': sequence, 'updatedAt': datetime.now().isoformat()}
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+
+
+class FrontierSearch:
+    """以探測函式找出最後一個有資料的序號
+
+    Args:
+        probe: seq -> 結果（dict 為有資料、NO_DATA 為查無資料、None 為失敗）
+        gap_tolerance: 連續多少個序號無資料才視為超過前緣（容許中間零星空號）
+        max_seq: 序號上限
+    """
+
+    def __init__(self, probe, gap_tolerance=3, max_seq=99999):
+        self.probe = probe
+        self.gap_tolerance = gap_tolerance
+        self.max_seq = max_seq
+        self.results = {}  # seq -> 探測結果
+        self.probes = 0
+
+    def _result(self, seq):
+        if seq not in self.results:
+            self.probes += 1
+            self.results[seq] = self.probe(seq)
+        return self.results[seq]
+
+    def _first_data(self, seq, limit):
+        """從 seq 起（不含 limit）找第一個有資料的序號
+
+        連續 gap_tolerance 個無資料即停止；失敗的序號不算數，但最多多試 gap_tolerance 次。
+        """
+        empty = failed = 0
+        while seq < limit and empty < self.gap_tolerance:
+            result = self._result(seq)
+            if result is None:
+                failed += 1
+                if failed > self.gap_tolerance:
+                    print(f"⚠️ 前緣探測連續失敗，視 {seq:05d} 附近為無資料")
+                    break
+            elif result == NO_DATA:
+                empty += 1
+            else:
+                return seq
+            seq += 1
+        return None
+
+    def find(self, known=0):
+        """回傳最後一個有資料的序號；known 為已知有資料的序號（0 表示從頭）"""
+        low = known
+        high = self.max_seq + 1  # 已知 [high, high + gap_tolerance) 無資料，或超出上限
+
+        # 指數探測：找出第一個無資料的探測點
+        step = 1
+        while low + step <= self.max_seq:
+            point = low + step
+            found = self._first_data(point, self.max_seq + 1)
+            if found is None:
+                high = point
+                break
+            low = found
+            step *= 2
+
+        # 二分搜尋：low 有資料，high 起為無資料區
+        while high - low > 1:
+            mid = (low + high) // 2
+            found = self._first_data(mid, high)
+            if found is None:
+                high = mid
+            else:
+                low = found
+        return low
+
+    def found(self):
+        """探測時取得的有資料結果 {seq: 結果}"""
+        return {seq: r for seq, r in self.results.items() if r is not None and r != NO_DATA}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "show":
+        cache = FrontierCache()
+        if not cache.data:
+            print("ℹ️ 尚無前緣快取")
+        for year, entry in sorted(cache.data.items()):
+            print(f"   {year}年: {entry['sequence']:05d} (更新於 {entry['updatedAt']})")
+    else:
+        print(__doc__)
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML 存檔 segment - 原始頁面批次寫入壓縮 segment，依 INDEX_KEY 以一次 Range 請求讀取
+取代每頁一個 html/<INDEX_KEY>.html 物件、每頁一次背景上傳的作法
+（補爬時同時有上千個上傳在進行，bucket 累積數萬個幾 KB 的小物件，列出、備份、刪除都很慢）：
+1. 每頁以共用字典各自壓縮（page_codec，字典由寫入端的前幾十頁自動訓練並上傳）後追加到本機暫存 segment 檔，
+   同時追加一行 INDEX_KEY → (位移, 長度) 索引；segment 索引記錄所用的字典版本
+2. segment 超過大小上限或開啟太久時封存，在背景上傳 segment 與索引（同時上傳數有上限，
+   等待上傳的 segment 太多時寫入端等待，不會無限堆積）
+3. 物件：<prefix>segments/<id>.seg 為頁面資料，<prefix>index/<id>.json 為索引；先傳 segment 再傳索引，
+   看得到索引就一定讀得到頁面
+4. 讀取端把各 segment 索引合併成本機目錄檔（只下載新出現的索引），之後任一頁只需一次 Range 請求；
+   同一 INDEX_KEY 出現在多個 segment 時以較新的為準，找不到時退回舊的 html/<INDEX_KEY>.html
+5. 行程中斷時暫存檔留在本機，下次啟動時封存並補上傳；訓練字典前的樣本頁面也先未壓縮寫入暫存目錄，
+   中斷時以不含字典的格式封存；暫存檔名含寫入行程的 pid 與啟動時間，pid 重複使用時不會誤判為仍在寫入
+
+使用方式:
+    python html_archive.py get <INDEX_KEY> [檔案]    # 讀取存檔頁面
+    python html_archive.py status                   # 本機暫存與目錄狀態
+    python html_archive.py flush                    # 封存並上傳中斷遺留的暫存 segment
+    python html_archive.py migrate [--delete]       # 把舊的 html/ 小物件打包成 segment
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from object_storage import open_storage
+from page_codec import DictionaryStore, PageCodec, train_dictionary, MIN_SAMPLES
+
+DEFAULT_PREFIX = 'html-archive/'
+DEFAULT_SPOOL_DIR = 'html-archive-spool'
+DEFAULT_CATALOG = 'html-archive-catalog.json'
+LEGACY_PREFIX = 'html/'
+
+
+def segment_object(prefix, segment_id):
+    return f"{prefix}segments/{segment_id}.seg"
+
+
+def index_object(prefix, segment_id):
+    return f"{prefix}index/{segment_id}.json"
+
+
+def _process_start(pid):
+    """行程啟動時間（/proc/<pid>/stat 第 22 欄，開機後的 clock ticks）；無法取得時回傳 None"""
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            stat = f.read()
+        return int(stat.rsplit(b')', 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+# 本行程的識別：pid 加上啟動時間，pid 被重複使用時可與先前中斷的行程區分
+_OWNER = f"{os.getpid()}.{_process_start(os.getpid()) or int(time.time())}"
+
+
+def _owner_alive(segment_id):
+    """暫存 segment 的寫入行程是否還在執行（id 倒數第二段為 pid.啟動時間）"""
+    owner = segment_id.split('-')[-2] if segment_id.count('-') >= 2 else ''
+    pid, _, started = owner.partition('.')
+    try:
+        pid = int(pid)
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return owner == _OWNER  # 同一 pid 但啟動時間不同：先前中斷的行程
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    current = _process_start(pid)
+    return not started or current is None or str(current) == started
+
+
+class _Spool:
+    """寫入中的暫存 segment：<id>.seg 為資料，<id>.idx 第一行為壓縮格式，其後每行一筆 [INDEX_KEY, 位移, 長度]"""
+
+    def __init__(self, spool_dir, segment_id, codec):
+        self.segment_id = segment_id
+        self.data_path = os.path.join(spool_dir, f"{segment_id}.seg")
+        self.index_path = os.path.join(spool_dir, f"{segment_id}.idx")
+        self._data = open(self.data_path, 'ab')
+        self._index = open(self.index_path, 'a', encoding='utf-8')
+        if not self._index.tell():
+            self._index.write(json.dumps({'codec': codec.codec, 'dict': codec.dict_id}) + '\n')
+            self._index.flush()
+        self.size = self._data.tell()
+        self.pages = 0
+        self.opened = time.monotonic()
+
+    def write(self, index_key, record):
+        offset = self.size
+        self._data.write(record)
+        self._data.flush()  # 先寫資料再寫索引，索引不會指向不存在的資料
+        self._index.write(json.dumps([index_key, offset, len(record)]) + '\n')
+        self._index.flush()
+        self.size += len(record)
+        self.pages += 1
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+
+class HtmlArchiveWriter:
+    """把頁面批次寫入 segment 並在背景上傳（執行緒安全）
+
+    Args:
+        storage: 物件儲存 (object_storage)
+        prefix: 存檔物件的前綴
+        spool_dir: 本機暫存目錄
+        segment_bytes: segment 大小上限（壓縮後）
+        max_age: segment 開啟超過此秒數即封存
+        upload_workers: 同時上傳的 segment 數
+        max_pending: 已封存、等待上傳的 segment 上限，超過時寫入端等待
+        codec: 'auto' 使用目前版本的字典，沒有時以最先寫入的 sample_size 頁訓練
+            （樣本頁面同時暫存於 spool_dir）；或指定 PageCodec
+        sample_size: 自動訓練字典的樣本頁數
+    """
+
+    def __init__(self, storage, prefix=DEFAULT_PREFIX, spool_dir=DEFAULT_SPOOL_DIR,
+                 segment_bytes=8 * 1024 * 1024, max_age=600, upload_workers=2, max_pending=4,
+                 codec='auto', sample_size=50):
+        self.storage = storage
+        self.prefix = prefix
+        self.dictionaries = DictionaryStore(storage, prefix)
+        self.codec = self.dictionaries.current() if codec == 'auto' else codec
+        self.sample_size = sample_size
+        self._sample = []  # 訓練字典前暫存的頁面 (INDEX_KEY, HTML)
+        self._sample_file = None  # 同一批樣本的未壓縮暫存檔，中斷時由 recover 寫成 segment
+        self.spool_dir = spool_dir
+        self.segment_bytes = segment_bytes
+        self.max_age = max_age
+        os.makedirs(spool_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._uploader = ThreadPoolExecutor(max_workers=upload_workers)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = []
+        self._failed = []  # 上傳失敗的 segment，下次 flush 時重試
+        self._current = None
+        self._host = socket.gethostname().split('.')[0].replace('-', '') or 'host'
+        self._serial = 0
+        self.stats = {'pages': 0, 'rawBytes': 0, 'bytes': 0, 'uploaded': 0, 'failed': 0}
+        self.recover()
+
+    def _new_segment_id(self):
+        self._serial += 1
+        return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{self._host}-{_OWNER}-{self._serial:04d}"
+
+    # ---- 寫入 ----
+
+    def append(self, index_key, html):
+        """追加一頁；segment 滿了就封存並排入上傳"""
+        with self._lock:
+            if self.codec is None:
+                self._spool_sample(index_key, html)
+                if len(self._sample) < self.sample_size:
+                    return
+                pages, sample_path = self._train()
+            else:
+                pages, sample_path = [(index_key, html)], None
+        self._write_pages(pages, sample_path)
+
+    def _spool_sample(self, index_key, html):
+        """樣本頁面先以未壓縮 JSON 行追加到 <id>.sample（呼叫端持有 self._lock）"""
+        if self._sample_file is None:
+            path = os.path.join(self.spool_dir, f"{self._new_segment_id()}.sample")
+            self._sample_file = open(path, 'a', encoding='utf-8')
+        self._sample_file.write(json.dumps([index_key, html], ensure_ascii=False) + '\n')
+        self._sample_file.flush()
+        self._sample.append((index_key, html))
+
+    def _write_pages(self, pages, sample_path=None):
+        for key, page in pages:
+            self._write(key, page)
+        if sample_path is not None:
+            os.unlink(sample_path)  # 樣本已寫入 segment
+
+    def _train(self):
+        """以暫存的樣本頁面訓練並上傳字典（呼叫端持有 self._lock），回傳 (樣本頁面, 樣本暫存檔)"""
+        pages, self._sample = self._sample, []
+        sample_path = None
+        if self._sample_file is not None:
+            sample_path = self._sample_file.name
+            self._sample_file.close()
+            self._sample_file = None
+        self.codec = PageCodec()
+        if len(pages) >= MIN_SAMPLES:
+            trained = train_dictionary([html for _, html in pages])
+            try:
+                if self.dictionaries.publish(trained, samples=len(pages)):
+                    self.codec = trained
+            except Exception as e:
+                print(f"⚠️ 字典上傳失敗，本次不使用字典: {e}")
+        return pages, sample_path
+
+    def _write(self, index_key, html):
+        record = self.codec.compress(html)
+        with self._lock:
+            if self._current is None:
+                self._current = _Spool(self.spool_dir, self._new_segment_id(), self.codec)
+            self._current.write(index_key, record)
+            self.stats['pages'] += 1
+            self.stats['rawBytes'] += len(html.encode('utf-8'))
+            self.stats['bytes'] += len(record)
+            sealed = None
+            if self._current.size >= self.segment_bytes or \
+                    time.monotonic() - self._current.opened >= self.max_age:
+                sealed, self._current = self._current, None
+        if sealed is not None:
+            self._seal(sealed)
+            self._submit(sealed.segment_id)
+
+    def _seal(self, spool):
+        """關閉暫存檔，把逐行索引轉成上傳用的索引檔 <id>.json"""
+        spool.close()
+        self._write_index(spool.segment_id)
+
+    def _write_index(self, segment_id):
+        pages = {}
+        header = {'codec': PageCodec().codec, 'dict': None}
+        index_path = os.path.join(self.spool_dir, f"{segment_id}.idx")
+        data_size = os.path.getsize(os.path.join(self.spool_dir, f"{segment_id}.seg"))
+        with open(index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # 中斷時寫到一半的最後一行
+                if isinstance(entry, dict):
+                    header = entry
+                    continue
+                index_key, offset, length = entry
+                if offset + length <= data_size:
+                    pages[index_key] = [offset, length]  # 同一 segment 內重複時以後寫入的為準
+        sealed_path = os.path.join(self.spool_dir, f"{segment_id}.json")
+        with open(sealed_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'segment': segment_id, 'codec': header['codec'], 'dict': header['dict'],
+                       'created': datetime.now().isoformat(), 'pages': pages},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(sealed_path + '.tmp', sealed_path)
+        os.unlink(index_path)
+
+    def _submit(self, segment_id):
+        self._slots.acquire()
+        future = self._uploader.submit(self._upload, segment_id)
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._pending = [f for f in self._pending if not f.done()] + [future]
+
+    def _upload(self, segment_id):
+        """上傳已封存的 segment 與索引，成功後刪除本機檔案"""
+        data_path = os.path.join(self.spool_dir, f"{segment_id}.seg")
+        sealed_path = os.path.join(self.spool_dir, f"{segment_id}.json")
+        try:
+            with open(sealed_path, 'rb') as f:
+                index = f.read()
+            if not json.loads(index)['pages']:
+                os.unlink(data_path)
+                os.unlink(sealed_path)
+                return True
+            if not self.storage.upload(data_path, segment_object(self.prefix, segment_id),
+                                       'application/octet-stream') or \
+                    not self.storage.put_bytes(index_object(self.prefix, segment_id), index):
+                raise OSError("物件儲存寫入失敗")
+        except Exception as e:
+            print(f"⚠️ HTML 存檔 segment {segment_id} 上傳失敗，保留在 {self.spool_dir}: {e}")
+            with self._lock:
+                self.stats['failed'] += 1
+                self._failed.append(segment_id)
+            return False
+        os.unlink(data_path)
+        os.unlink(sealed_path)
+        with self._lock:
+            self.stats['uploaded'] += 1
+        return True
+
+    # ---- 封存、補上傳 ----
+
+    def recover(self):
+        """封存並上傳已結束行程遺留的暫存 segment 與樣本頁面，回傳排入上傳的數量"""
+        count = 0
+        file_names = sorted(os.listdir(self.spool_dir))
+        samples = {os.path.splitext(n)[0] for n in file_names if n.endswith('.sample')}
+        for file_name in file_names:
+            segment_id, ext = os.path.splitext(file_name)
+            if ext not in ('.idx', '.json', '.sample') or _owner_alive(segment_id):
+                continue
+            if ext == '.sample':
+                self._recover_sample(segment_id)
+            elif segment_id in samples:
+                continue  # 樣本寫成 segment 途中中斷，由樣本檔重建
+            elif ext == '.idx':
+                if not os.path.exists(os.path.join(self.spool_dir, f"{segment_id}.seg")):
+                    os.unlink(os.path.join(self.spool_dir, file_name))
+                    continue
+                self._write_index(segment_id)
+            self._submit(segment_id)
+            count += 1
+        return count
+
+    def _recover_sample(self, segment_id):
+        """把中斷行程訓練字典前的樣本頁面以不含字典的格式寫成 segment 並封存"""
+        for ext in ('.seg', '.idx', '.json'):
+            path = os.path.join(self.spool_dir, segment_id + ext)
+            if os.path.exists(path):
+                os.unlink(path)
+        codec = PageCodec()
+        spool = _Spool(self.spool_dir, segment_id, codec)
+        sample_path = os.path.join(self.spool_dir, f"{segment_id}.sample")
+        with open(sample_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    index_key, html = json.loads(line)
+                except ValueError:
+                    continue  # 中斷時寫到一半的最後一行
+                spool.write(index_key, codec.compress(html))
+        self._seal(spool)
+        os.unlink(sample_path)
+
+    def flush(self):
+        """封存目前的 segment、重試先前失敗的上傳並等待完成；本機沒有遺留時回傳 True"""
+        with self._lock:
+            pages, sample_path = self._train() if self.codec is None and self._sample else ([], None)
+        self._write_pages(pages, sample_path)
+        with self._lock:
+            sealed, self._current = self._current, None
+            retry, self._failed = self._failed, []
+        if sealed is not None:
+            self._seal(sealed)
+            self._submit(sealed.segment_id)
+        for segment_id in retry:
+            self._submit(segment_id)
+        with self._lock:
+            pending = list(self._pending)
+        results = [future.result() for future in pending]
+        return all(results)
+
+    def close(self):
+        ok = self.flush()
+        self._uploader.shutdown(wait=True)
+        return ok
+
+    def summary(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['ratio'] = stats['bytes'] / stats['rawBytes'] if stats['rawBytes'] else 0.0
+        stats['dict'] = self.codec.dict_id if self.codec is not None else None
+        return stats
+
+
+class HtmlArchive:
+    """依 INDEX_KEY 讀取存檔頁面
+
+    Args:
+        storage: 物件儲存
+        prefix: 存檔物件的前綴
+        catalog_file: 本機目錄檔（合併後的索引），None 表示只保留在記憶體
+        refresh_interval: 查不到時，距上次更新目錄超過此秒數才重新列出索引
+    """
+
+    def __init__(self, storage, prefix=DEFAULT_PREFIX, catalog_file=DEFAULT_CATALOG, refresh_interval=60):
+        self.storage = storage
+        self.prefix = prefix
+        self.catalog_file = catalog_file
+        self.refresh_interval = refresh_interval
+        self.dictionaries = DictionaryStore(storage, prefix)
+        self._lock = threading.Lock()
+        self._refreshed = 0.0
+        self.catalog = self._load_catalog()
+
+    def _load_catalog(self):
+        if self.catalog_file and os.path.exists(self.catalog_file):
+            try:
+                with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {'segments': {}, 'pages': {}}
+
+    def _save_catalog(self):
+        if not self.catalog_file:
+            return
+        with open(self.catalog_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.catalog, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(self.catalog_file + '.tmp', self.catalog_file)
+
+    def refresh(self):
+        """下載新出現的 segment 索引併入目錄，回傳新增的 segment 數"""
+        with self._lock:
+            self._refreshed = time.monotonic()
+            index_prefix = f"{self.prefix}index/"
+            known = self.catalog['segments']
+            names = [n for n in self.storage.list_names(index_prefix)
+                     if n[len(index_prefix):-len('.json')] not in known]
+            if not names:
+                return 0
+            pages = self.catalog['pages']
+            for name, raw in sorted(self.storage.get_many(names).items()):
+                if raw is None:
+                    continue
+                index = json.loads(raw.decode('utf-8'))
+                segment_id = index['segment']
+                known[segment_id] = {'codec': index.get('codec', PageCodec().codec), 'dict': index.get('dict'),
+                                     'pages': len(index['pages'])}
+                for index_key, (offset, length) in index['pages'].items():
+                    current = pages.get(index_key)
+                    if current is None or current[0] <= segment_id:
+                        pages[index_key] = [segment_id, offset, length]
+            self._save_catalog()
+            return len(names)
+
+    def locate(self, index_key):
+        """(segment id, 位移, 長度)；目錄中沒有時視需要更新目錄，仍找不到回傳 None"""
+        location = self.catalog['pages'].get(index_key)
+        if location is None and time.monotonic() - self._refreshed >= self.refresh_interval:
+            self.refresh()
+            location = self.catalog['pages'].get(index_key)
+        return location
+
+    def read(self, index_key):
+        """讀取頁面（str），沒有存檔回傳 None"""
+        location = self.locate(index_key)
+        if location is not None:
+            segment_id, offset, length = location
+            raw = self.storage.get_range(segment_object(self.prefix, segment_id), offset, length)
+            if raw is not None:
+                return self.dictionaries.load(self.catalog['segments'][segment_id].get('dict')).decompress(raw)
+        legacy = self.storage.get_bytes(f"{LEGACY_PREFIX}{index_key}.html")
+        return None if legacy is None else legacy.decode('utf-8')
+
+    def keys(self):
+        return sorted(self.catalog['pages'])
+
+
+def migrate_legacy(storage, delete=False, batch=200):
+    """把舊的 html/<INDEX_KEY>.html 物件打包成 segment；delete 時在上傳成功後刪除舊物件"""
+    names = [n for n in storage.list_names(LEGACY_PREFIX) if n.endswith('.html')]
+    print(f"📦 舊 HTML 物件: {len(names)} 個")
+    writer = HtmlArchiveWriter(storage)
+    for start in range(0, len(names), batch):
+        chunk = names[start:start + batch]
+        for name, raw in storage.get_many(chunk).items():
+            if raw is not None:
+                writer.append(name[len(LEGACY_PREFIX):-len('.html')], raw.decode('utf-8', errors='replace'))
+        print(f"   {min(start + batch, len(names))}/{len(names)}")
+    if not writer.close():
+        print("❌ 部分 segment 上傳失敗，舊物件保留")
+        return False
+    if delete:
+        for name in names:
+            storage.delete(name)
+        print(f"🗑️ 已刪除 {len(names)} 個舊物件")
+    stats = writer.summary()
+    print(f"✅ 打包 {stats['pages']} 頁成 {stats['uploaded']} 個 segment（壓縮後 {stats['ratio']:.0%}）")
+    return True
+
+
+if __name__ == "__main__":
+    storage = open_storage()
+    if len(sys.argv) > 2 and sys.argv[1] == "get":
+        html = HtmlArchive(storage).read(sys.argv[2])
+        if html is None:
+            print(f"❌ 沒有 {sys.argv[2]} 的存檔")
+            sys.exit(1)
+        if len(sys.argv) > 3:
+            with open(sys.argv[3], 'w', encoding='utf-8') as f:
+                f.write(html)
+            print(f"✅ {sys.argv[3]}")
+        else:
+            print(html)
+    elif len(sys.argv) > 1 and sys.argv[1] == "status":
+        spool = sorted(os.listdir(DEFAULT_SPOOL_DIR)) if os.path.isdir(DEFAULT_SPOOL_DIR) else []
+        print(f"📂 本機暫存: 寫入中 {sum(n.endswith(('.idx', '.sample')) for n in spool)} 個, "
+              f"待上傳 {sum(n.endswith('.json') for n in spool)} 個 ({DEFAULT_SPOOL_DIR})")
+        archive = HtmlArchive(storage)
+        added = archive.refresh()
+        print(f"📚 目錄: {len(archive.catalog['segments'])} 個 segment（新增 {added}），"
+              f"{len(archive.catalog['pages'])} 頁")
+    elif len(sys.argv) > 1 and sys.argv[1] == "flush":
+        writer = HtmlArchiveWriter(storage)
+        print("✅ 暫存已全部上傳" if writer.close() else "❌ 部分 segment 上傳失敗")
+    elif len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        migrate_legacy(storage, delete='--delete' in sys.argv)
+    else:
+        print(__doc__)
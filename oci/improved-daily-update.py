@@ -15,6 +15,8 @@ import sys
 import tempfile
 import os
 
+from object_storage import open_storage
+
 def log(message):
     """記錄日誌"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -22,19 +24,9 @@ def log(message):
 
 def get_last_update_info():
     """取得最後更新資訊"""
-    try:
-        cmd = ["oci", "os", "object", "get", 
-               "--namespace", "nrsdi1rz5vl8",
-               "--bucket-name", "taichung-building-permits",
-               "--name", "logs/last-update-info.json",
-               "--file", "/tmp/last-update-info.json"]
-        result = subprocess.run(cmd, capture_output=True)
-        
-        if result.returncode == 0:
-            with open('/tmp/last-update-info.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except:
-        pass
+    info = open_storage().get_json("logs/last-update-info.json")
+    if info is not None:
+        return info
     
     # 預設值
     current_year = datetime.now().year - 1911
@@ -47,74 +39,22 @@ def get_last_update_info():
 
 def save_update_info(info):
     """儲存更新資訊"""
-    try:
-        with open('/tmp/update-info.json', 'w', encoding='utf-8') as f:
-            json.dump(info, f, ensure_ascii=False, indent=2)
-        
-        cmd = ["oci", "os", "object", "put",
-               "--namespace", "nrsdi1rz5vl8",
-               "--bucket-name", "taichung-building-permits",
-               "--name", "logs/last-update-info.json",
-               "--file", "/tmp/update-info.json",
-               "--content-type", "application/json",
-               "--force"]
-        subprocess.run(cmd, capture_output=True)
+    if open_storage().put_json("logs/last-update-info.json", info, indent=2):
         log(f"✅ 已更新最後成功ID: {info['last_successful_id']}")
-    except Exception as e:
-        log(f"❌ 儲存更新資訊失敗: {e}")
+    else:
+        log("❌ 儲存更新資訊失敗")
 
 def download_permits():
     """下載現有的permits.json"""
-    try:
-        cmd = ["oci", "os", "object", "get",
-               "--namespace", "nrsdi1rz5vl8",
-               "--bucket-name", "taichung-building-permits",
-               "--name", "permits.json",
-               "--file", "/tmp/permits.json"]
-        result = subprocess.run(cmd, capture_output=True)
-        
-        if result.returncode == 0:
-            with open('/tmp/permits.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except:
-        pass
-    return []
+    return open_storage().get_json("permits.json", [])
 
 def upload_permits(permits):
     """上傳permits.json到OCI"""
-    try:
-        with open('/tmp/permits.json', 'w', encoding='utf-8') as f:
-            json.dump(permits, f, ensure_ascii=False, indent=2)
-        
-        cmd = ["oci", "os", "object", "put",
-               "--namespace", "nrsdi1rz5vl8",
-               "--bucket-name", "taichung-building-permits",
-               "--name", "permits.json",
-               "--file", "/tmp/permits.json",
-               "--content-type", "application/json",
-               "--force"]
-        subprocess.run(cmd, capture_output=True)
-        return True
-    except:
-        return False
+    return open_storage().put_json("permits.json", permits, indent=2)
 
 def save_html_to_oci(index_key, html_content):
     """儲存HTML到OCI"""
-    with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', suffix='.html', delete=False) as f:
-        f.write(html_content)
-        temp_file = f.name
-    
-    try:
-        cmd = ["oci", "os", "object", "put",
-               "--namespace", "nrsdi1rz5vl8",
-               "--bucket-name", "taichung-building-permits",
-               "--name", f"html/{index_key}.html",
-               "--file", temp_file,
-               "--content-type", "text/html; charset=utf-8",
-               "--force"]
-        subprocess.run(cmd, capture_output=True)
-    finally:
-        os.unlink(temp_file)
+    open_storage().put_bytes(f"html/{index_key}.html", html_content.encode('utf-8'), "text/html; charset=utf-8")
 
 def crawl_permit(index_key):
     """爬取單一建照資料"""
@@ -184,19 +124,8 @@ def save_execution_log(start_time, end_time, new_count, last_id):
     """儲存執行記錄"""
     try:
         # 下載現有記錄
-        existing_logs = []
-        try:
-            cmd = ["oci", "os", "object", "get",
-                   "--namespace", "nrsdi1rz5vl8",
-                   "--bucket-name", "taichung-building-permits",
-                   "--name", "logs/execution-history.json",
-                   "--file", "/tmp/exec-history.json"]
-            result = subprocess.run(cmd, capture_output=True)
-            if result.returncode == 0:
-                with open('/tmp/exec-history.json', 'r', encoding='utf-8') as f:
-                    existing_logs = json.load(f)
-        except:
-            pass
+        storage = open_storage()
+        existing_logs = storage.get_json("logs/execution-history.json", [])
         
         # 新增記錄
         new_log = {
@@ -214,17 +143,7 @@ def save_execution_log(start_time, end_time, new_count, last_id):
         existing_logs = existing_logs[-50:]
         
         # 上傳記錄
-        with open('/tmp/exec-history.json', 'w', encoding='utf-8') as f:
-            json.dump(existing_logs, f, ensure_ascii=False, indent=2)
-        
-        cmd = ["oci", "os", "object", "put",
-               "--namespace", "nrsdi1rz5vl8",
-               "--bucket-name", "taichung-building-permits",
-               "--name", "logs/execution-history.json",
-               "--file", "/tmp/exec-history.json",
-               "--content-type", "application/json",
-               "--force"]
-        subprocess.run(cmd, capture_output=True)
+        storage.put_json("logs/execution-history.json", existing_logs, indent=2)
         
         log(f"✅ 執行記錄已儲存")
     except Exception as e:
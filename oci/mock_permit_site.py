@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+建照查詢網站本機模擬 - 離線效能測試用
+取代只能對正式網站 (mcgbm.taichung.gov.tw) 測試的作法
+（test_crawler.py 還需要 MySQL 與正式網站，無法重複、無法控制延遲與錯誤）：
+1. 依 INDEX_KEY 回傳存檔頁面 (<目錄>/<INDEX_KEY>.html)，沒有存檔時以範本頁面產生
+2. 重現網站行為：沒有 session cookie 的第一次請求回傳格式錯誤頁面並發 JSESSIONID，
+   超過前緣的序號回傳「查無任何資訊」，頁面以 Big5 編碼
+3. session 可設定服務幾次請求後失效（模擬 session 過期，需重新暖機）
+4. 可設定回應延遲、HTTP 500 比例、不回應（逾時）比例，並統計各類回應次數
+
+使用方式:
+    python mock_permit_site.py [port] [--pages 目錄] [--frontier 年份:序號 ...]
+                               [--latency 最小ms-最大ms] [--errors 比例] [--timeouts 比例]
+    python crawl_benchmark.py                 # 對模擬網站測量各爬蟲的吞吐量
+"""
+
+import http.server
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+import permit_parser
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TEMPLATE = os.path.join(HERE, 'debug-output.html')
+QUERY_PATH = '/bupic/pages/queryInfoAction.do'
+
+# 範本頁面中屬於該筆建照的字串
+TEMPLATE_INDEX_KEY = '11410100000'
+TEMPLATE_PERMIT_NUMBER = '114中都建字第01000號'
+
+
+class MockPermitSite:
+    """模擬建照查詢網站（ThreadingHTTPServer，在背景執行緒服務）
+
+    Args:
+        port: 監聽埠，0 表示自動選擇
+        pages_dir: 存檔頁面目錄，檔名為 <INDEX_KEY>.html
+        template: 沒有存檔時用來產生頁面的範本
+        frontier: {年份: 最後已發照序號}，超過者回傳查無資料；未列出的年度一律有資料
+        latency: 每次回應前的延遲範圍（秒）(最小, 最大)
+        error_rate: 回傳 HTTP 500 的比例
+        timeout_rate: 不回應直到 hang_seconds 後斷線的比例
+        session_requests: 每個 session 服務幾次請求後失效，None 表示不失效
+        seed: 亂數種子（延遲與錯誤注入可重現）
+    """
+
+    def __init__(self, port=0, pages_dir=None, template=DEFAULT_TEMPLATE, frontier=None,
+                 latency=(0.0, 0.0), error_rate=0.0, timeout_rate=0.0, hang_seconds=30,
+                 session_requests=None, seed=None):
+        self.port = port
+        self.pages_dir = pages_dir
+        self.frontier = dict(frontier or {})
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.session_requests = session_requests
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sessions = {}  # JSESSIONID -> 已服務請求數
+        self._ids = itertools.count(1)
+        self._server = None
+        self.stats = {'requests': 0, 'handshakes': 0, 'pages': 0, 'noData': 0,
+                      'errors': 0, 'timeouts': 0}
+
+        template_html = permit_parser.read_page(template).replace('charset=UTF-8', 'charset=big5')
+        head = template_html.split('<body>')[0]
+        self._template = template_html
+        self._wrong_format = self._encode(head + '<body>\n<div class="tit_01">查詢逾時，請重新查詢</div>\n</body></html>')
+        self._no_data = self._encode(head + '<body>\n<div class="tit_01">查無任何資訊</div>\n</body></html>')
+
+    @staticmethod
+    def _encode(html):
+        return html.encode('big5', errors='xmlcharrefreplace')
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}{QUERY_PATH}"
+
+    # ---- 頁面 ----
+
+    def issued(self, index_key):
+        year, seq = int(index_key[:3]), int(index_key[4:9])
+        return seq <= self.frontier.get(year, float('inf'))
+
+    def page(self, index_key):
+        """INDEX_KEY 的頁面（Big5 位元組）"""
+        if self.pages_dir:
+            path = os.path.join(self.pages_dir, f"{index_key}.html")
+            if os.path.exists(path):
+                return self._encode(permit_parser.read_page(path))
+        if not self.issued(index_key):
+            return None
+        year, seq = int(index_key[:3]), int(index_key[4:9])
+        html = self._template.replace(TEMPLATE_INDEX_KEY, index_key).replace(
+            TEMPLATE_PERMIT_NUMBER, f"{year}中都建字第{seq:05d}號")
+        return self._encode(html)
+
+    # ---- session ----
+
+    def _session(self, cookie):
+        """檢查 cookie 中的 session；無效時建立新 session，回傳 (session id, 是否為新 session)"""
+        sid = None
+        for part in (cookie or '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == 'JSESSIONID':
+                sid = value
+        with self._lock:
+            served = self._sessions.get(sid)
+            if served is not None and (self.session_requests is None or served < self.session_requests):
+                self._sessions[sid] = served + 1
+                return sid, False
+            sid = f"MOCK{next(self._ids):08d}"
+            self._sessions[sid] = 0
+            self.stats['handshakes'] += 1
+            return sid, True
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _inject(self):
+        """依設定比例決定這次請求是否注入錯誤：'error'、'timeout' 或 None"""
+        with self._lock:
+            draw = self._random.random()
+            delay = self._random.uniform(*self.latency) if self.latency[1] > 0 else 0
+        if delay:
+            time.sleep(delay)
+        if draw < self.error_rate:
+            return 'error'
+        if draw < self.error_rate + self.timeout_rate:
+            return 'timeout'
+        return None
+
+    # ---- 伺服器 ----
+
+    def _handler(self):
+        site = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                index_key = (parse_qs(url.query).get('INDEX_KEY') or [''])[0]
+                if url.path != QUERY_PATH or len(index_key) != 11 or not index_key.isdigit():
+                    return self._send(404, b'not found')
+
+                site._count('requests')  # 注入的錯誤與逾時也計入請求數
+                injected = site._inject()
+                if injected == 'error':
+                    site._count('errors')
+                    return self._send(500, b'internal server error')
+                if injected == 'timeout':
+                    site._count('timeouts')
+                    time.sleep(site.hang_seconds)
+                    self.close_connection = True
+                    return
+
+                sid, new_session = site._session(self.headers.get('Cookie'))
+                if new_session:
+                    # 網站第一次訪問只建立 session，回傳的不是建照頁面
+                    return self._send(200, site._wrong_format, cookie=sid)
+                body = site.page(index_key)
+                if body is None:
+                    site._count('noData')
+                    return self._send(200, site._no_data)
+                site._count('pages')
+                return self._send(200, body)
+
+            def _send(self, status, body, cookie=None):
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=big5')
+                self.send_header('Content-Length', str(len(body)))
+                if cookie:
+                    self.send_header('Set-Cookie', f'JSESSIONID={cookie}; Path=/bupic')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """在背景執行緒啟動，回傳查詢網址"""
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _pop_option(args, name, default=None, count=1):
+    if name not in args:
+        return default
+    pos = args.index(name)
+    values = args[pos + 1:pos + 1 + count]
+    del args[pos:pos + 1 + count]
+    return values[0] if count == 1 else values
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if '-h' in args or '--help' in args:
+        print(__doc__)
+        sys.exit(0)
+    pages_dir = _pop_option(args, '--pages')
+    latency = _pop_option(args, '--latency', '0-0')
+    error_rate = float(_pop_option(args, '--errors', 0))
+    timeout_rate = float(_pop_option(args, '--timeouts', 0))
+    frontier = {}
+    while '--frontier' in args:
+        year, seq = _pop_option(args, '--frontier').split(':')
+        frontier[int(year)] = int(seq)
+    low, high = (float(ms) / 1000 for ms in latency.split('-'))
+
+    site = MockPermitSite(int(args[0]) if args else 8080, pages_dir=pages_dir, frontier=frontier,
+                          latency=(low, high), error_rate=error_rate, timeout_rate=timeout_rate)
+    print(f"🧪 模擬建照網站: {site.start()}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"   {site.stats}")
+    except KeyboardInterrupt:
+        site.stop()
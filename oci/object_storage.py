@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+物件儲存存取 - 所有腳本共用的單一入口
+取代各腳本各自以 subprocess 呼叫 oci CLI 的作法
+（每次呼叫都要啟動一個 Python 直譯器並重新認證，常常超過一秒）：
+1. OCISDKStorage 使用 OCI SDK，同一行程共用一個長期存在的 client 與 HTTP 連線池
+2. get_many / put_many 以執行緒平行傳輸多個物件
+3. download / upload 以串流方式傳輸，大檔不必整個載入記憶體
+4. 條件式請求：put_bytes / delete 可指定 if_match（ETag 相同才寫入）或 if_none_match='*'（不存在才寫入），
+   條件不成立時拋出 PreconditionFailed；get_with_etag 同時取得內容與 ETag，put_bytes 成功時回傳新的 ETag
+5. get_range 以 Range 請求只取物件的一段（HTML 存檔 segment 中的單頁）
+6. LocalStorage 以本機目錄模擬 bucket（測試、離線效能測試用），介面與行為相同
+7. 沒有安裝 OCI SDK 時退回 OCICliStorage（oci CLI）
+
+open_storage() 依環境變數 PERMIT_STORAGE 選擇後端：
+    local:<目錄>   本機目錄
+    cli            oci CLI
+    （未設定）      OCI SDK，未安裝時退回 oci CLI
+
+使用方式:
+    python object_storage.py ls [prefix]            # 列出物件
+    python object_storage.py get <物件> [檔案]       # 下載
+    python object_storage.py put <檔案> <物件>       # 上傳
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import oci
+except ImportError:  # 沒有安裝 SDK 時退回 oci CLI
+    oci = None
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX 平台：LocalStorage 只適合單一行程
+    fcntl = None
+
+NAMESPACE = "nrsdi1rz5vl8"
+BUCKET_NAME = "taichung-building-permits"
+CHUNK_SIZE = 1024 * 1024
+
+
+class PreconditionFailed(Exception):
+    """條件式請求的條件不成立（ETag 已改變，或物件已存在）"""
+
+
+class ObjectStorage:
+    """各後端共用的便利方法；後端需實作 get_with_etag / put_bytes / head / list_names / delete /
+    open_stream / upload"""
+
+    def get_bytes(self, name):
+        """下載物件，不存在或失敗回傳 None"""
+        return self.get_with_etag(name)[0]
+
+    def get_range(self, name, offset, length):
+        """取得物件中 [offset, offset + length) 的位元組；後端不支援 Range 時下載整個物件再切"""
+        raw = self.get_bytes(name)
+        return None if raw is None else raw[offset:offset + length]
+
+    def get_json(self, name, default=None):
+        raw = self.get_bytes(name)
+        if raw is None:
+            return default
+        return json.loads(raw.decode("utf-8"))
+
+    def put_json(self, name, data, indent=None, **conditions):
+        body = json.dumps(data, ensure_ascii=False, indent=indent,
+                          separators=None if indent else (",", ":")).encode("utf-8")
+        return self.put_bytes(name, body, "application/json", **conditions)
+
+    def download(self, name, path):
+        """串流下載到檔案，成功回傳 True"""
+        stream = self.open_stream(name)
+        if stream is None:
+            return False
+        try:
+            with open(path + ".tmp", "wb") as f:
+                for chunk in stream:
+                    f.write(chunk)
+            os.replace(path + ".tmp", path)
+            return True
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+
+    def get_many(self, names, workers=8):
+        """平行下載，回傳 {名稱: 內容（失敗為 None）}"""
+        names = list(names)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(names)))) as pool:
+            return dict(zip(names, pool.map(self.get_bytes, names)))
+
+    def put_many(self, objects, content_type="application/json", workers=8):
+        """平行上傳 {名稱: 內容}，回傳 {名稱: 是否成功}"""
+        items = list(objects.items())
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items)))) as pool:
+            results = pool.map(lambda item: self.put_bytes(item[0], item[1], content_type), items)
+            return dict(zip((name for name, _ in items), results))
+
+
+class OCISDKStorage(ObjectStorage):
+    """OCI SDK 後端：Instance Principal 認證失敗時使用 ~/.oci/config
+
+    Args:
+        pool_size: HTTP 連線池大小（平行傳輸的上限）
+    """
+
+    def __init__(self, namespace=NAMESPACE, bucket_name=BUCKET_NAME, config_file=None, profile=None,
+                 pool_size=16):
+        if oci is None:
+            raise ImportError("需要安裝 OCI SDK (pip install oci)")
+        self.namespace = namespace
+        self.bucket_name = bucket_name
+        if config_file or profile or os.path.exists(os.path.expanduser(oci.config.DEFAULT_LOCATION)):
+            config = oci.config.from_file(config_file or oci.config.DEFAULT_LOCATION,
+                                          profile or oci.config.DEFAULT_PROFILE)
+            self.client = oci.object_storage.ObjectStorageClient(config)
+        else:
+            signer = oci.auth.signers.InstancePrincipalsSecurityTokenSigner()
+            self.client = oci.object_storage.ObjectStorageClient(config={}, signer=signer)
+        # SDK 預設的連線池只有 10 條，平行傳輸時放大
+        from requests.adapters import HTTPAdapter
+        self.client.base_client.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def _call(self, method, *args, **kwargs):
+        """呼叫 SDK；不存在或失敗回傳 None（與 CLI 後端相同），412 拋出 PreconditionFailed"""
+        try:
+            return method(self.namespace, self.bucket_name, *args, **kwargs)
+        except oci.exceptions.ServiceError as e:
+            if e.status == 412:
+                raise PreconditionFailed(f"{args[0] if args else ''}: {e.message}") from e
+            if e.status != 404:
+                print(f"⚠️ 物件儲存 {method.__name__} {args[0] if args else ''} 失敗: {e.status} {e.message}")
+            return None
+        except oci.exceptions.RequestException as e:
+            print(f"⚠️ 物件儲存 {method.__name__} {args[0] if args else ''} 連線失敗: {e}")
+            return None
+
+    def get_with_etag(self, name):
+        """下載物件，回傳 (內容, ETag)；不存在回傳 (None, None)"""
+        response = self._call(self.client.get_object, name)
+        if response is None:
+            return None, None
+        return response.data.content, response.headers.get("etag")
+
+    def get_range(self, name, offset, length):
+        response = self._call(self.client.get_object, name, range=f"bytes={offset}-{offset + length - 1}")
+        return None if response is None else response.data.content
+
+    def open_stream(self, name):
+        response = self._call(self.client.get_object, name)
+        if response is None:
+            return None
+        return response.data.raw.stream(CHUNK_SIZE, decode_content=False)
+
+    def put_bytes(self, name, data, content_type="application/json", if_match=None, if_none_match=None):
+        kwargs = {"content_type": content_type}
+        if if_match:
+            kwargs["if_match"] = if_match
+        if if_none_match:
+            kwargs["if_none_match"] = if_none_match
+        response = self._call(self.client.put_object, name, data, **kwargs)
+        return None if response is None else response.headers.get("etag") or True
+
+    def upload(self, path, name, content_type="application/octet-stream"):
+        """串流上傳檔案"""
+        with open(path, "rb") as f:
+            return self._call(self.client.put_object, name, f, content_type=content_type) is not None
+
+    def head(self, name):
+        """取得物件標頭 (etag, content-length, last-modified ...)，不存在回傳 None"""
+        response = self._call(self.client.head_object, name)
+        if response is None:
+            return None
+        return {k.lower(): v for k, v in response.headers.items()}
+
+    def list_names(self, prefix):
+        try:
+            response = oci.pagination.list_call_get_all_results(
+                self.client.list_objects, self.namespace, self.bucket_name, prefix=prefix)
+        except (oci.exceptions.ServiceError, oci.exceptions.RequestException) as e:
+            print(f"⚠️ 物件儲存 list {prefix} 失敗: {e}")
+            return []
+        return sorted(obj.name for obj in response.data.objects)
+
+    def delete(self, name, if_match=None):
+        kwargs = {"if_match": if_match} if if_match else {}
+        return self._call(self.client.delete_object, name, **kwargs) is not None
+
+
+class OCICliStorage(ObjectStorage):
+    """以 oci CLI 存取物件儲存（沒有安裝 SDK 時使用）"""
+
+    def __init__(self, namespace=NAMESPACE, bucket_name=BUCKET_NAME, oci_bin="oci"):
+        self.namespace = namespace
+        self.bucket_name = bucket_name
+        self.oci_bin = oci_bin
+
+    def _run(self, *args, timeout=120):
+        cmd = [self.oci_bin, "os", "object", *args,
+               "--namespace", self.namespace,
+               "--bucket-name", self.bucket_name]
+        try:
+            return subprocess.run(cmd, capture_output=True, timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:  # 找不到 oci CLI 或逾時，視同呼叫失敗
+            return subprocess.CompletedProcess(cmd, 1, b"", str(e).encode("utf-8"))
+
+    def get_with_etag(self, name):
+        """先取 ETag 再下載：期間物件被改寫時，條件式寫入會因 ETag 較舊而失敗（不會誤以為內容是最新的）"""
+        info = self.head(name)
+        if info is None:
+            return None, None
+        fd, temp_file = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            if not self.download(name, temp_file):
+                return None, None
+            with open(temp_file, "rb") as f:
+                raw = f.read()
+            return raw, info.get("etag")
+        finally:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+
+    def download(self, name, path):
+        result = self._run("get", "--name", name, "--file", path)
+        return result.returncode == 0
+
+    def get_range(self, name, offset, length):
+        fd, temp_file = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            result = self._run("get", "--name", name, "--file", temp_file,
+                               "--range", f"bytes={offset}-{offset + length - 1}")
+            if result.returncode != 0:
+                return None
+            with open(temp_file, "rb") as f:
+                return f.read()
+        finally:
+            os.unlink(temp_file)
+
+    def open_stream(self, name):
+        raw = self.get_bytes(name)
+        return None if raw is None else iter([raw])
+
+    def put_bytes(self, name, data, content_type="application/json", if_match=None, if_none_match=None):
+        fd, temp_file = tempfile.mkstemp(suffix=".json")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            return self._put(temp_file, name, content_type, if_match, if_none_match)
+        finally:
+            os.unlink(temp_file)
+
+    def upload(self, path, name, content_type="application/octet-stream"):
+        return self._put(path, name, content_type)
+
+    def _put(self, path, name, content_type, if_match=None, if_none_match=None):
+        args = ["put", "--name", name, "--file", path, "--content-type", content_type, "--force"]
+        if if_match:
+            args += ["--if-match", if_match]
+        if if_none_match:
+            args += ["--if-none-match", if_none_match]
+        result = self._run(*args)
+        if result.returncode != 0 and b"PreconditionFailed" in result.stderr:
+            raise PreconditionFailed(name)
+        if result.returncode != 0:
+            return False
+        try:
+            return json.loads(result.stdout).get("etag") or True
+        except ValueError:
+            return True
+
+    def head(self, name):
+        result = self._run("head", "--name", name, timeout=30)
+        if result.returncode != 0 or not result.stdout.strip():
+            return None
+        return {k.lower(): v for k, v in json.loads(result.stdout).items()}
+
+    def list_names(self, prefix):
+        result = self._run("list", "--prefix", prefix, "--all")
+        if result.returncode != 0 or not result.stdout.strip():
+            return []
+        data = json.loads(result.stdout)
+        return sorted(obj["name"] for obj in data.get("data", []))
+
+    def delete(self, name, if_match=None):
+        args = ["delete", "--name", name, "--force"]
+        if if_match:
+            args += ["--if-match", if_match]
+        result = self._run(*args)
+        if result.returncode != 0 and b"PreconditionFailed" in result.stderr:
+            raise PreconditionFailed(name)
+        return result.returncode == 0
+
+
+class LocalStorage(ObjectStorage):
+    """以本機目錄模擬 bucket：物件名稱即相對路徑，ETag 為內容的 MD5"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        path = os.path.abspath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"物件名稱超出 bucket 範圍: {name}")
+        return path
+
+    @staticmethod
+    def _etag(raw):
+        return hashlib.md5(raw).hexdigest()
+
+    @contextmanager
+    def _exclusive(self):
+        """行程內與跨行程的寫入鎖（條件式寫入需要讀取、比對、寫入不被打斷）"""
+        with self._lock, open(os.path.join(self.root, ".lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _check(self, name, if_match, if_none_match):
+        path = self._path(name)
+        exists = os.path.exists(path)
+        if if_none_match == "*" and exists:
+            raise PreconditionFailed(f"{name}: 物件已存在")
+        if if_match:
+            if not exists:
+                raise PreconditionFailed(f"{name}: 物件不存在")
+            with open(path, "rb") as f:
+                if self._etag(f.read()) != if_match:
+                    raise PreconditionFailed(f"{name}: ETag 已改變")
+
+    def get_with_etag(self, name):
+        try:
+            with open(self._path(name), "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None, None
+        return raw, self._etag(raw)
+
+    def open_stream(self, name):
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        f = open(path, "rb")
+        return _FileStream(f)
+
+    def get_range(self, name, offset, length):
+        try:
+            with open(self._path(name), "rb") as f:
+                f.seek(offset)
+                return f.read(length)
+        except FileNotFoundError:
+            return None
+
+    def put_bytes(self, name, data, content_type="application/json", if_match=None, if_none_match=None):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._exclusive():
+            self._check(name, if_match, if_none_match)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        return self._etag(data)
+
+    def upload(self, path, name, content_type="application/octet-stream"):
+        dest = self._path(name)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with self._exclusive():
+            shutil.copyfile(path, dest + ".tmp")
+            os.replace(dest + ".tmp", dest)
+        return True
+
+    def head(self, name):
+        raw, etag = self.get_with_etag(name)
+        if raw is None:
+            return None
+        modified = datetime.fromtimestamp(os.path.getmtime(self._path(name)), timezone.utc)
+        return {"etag": etag, "content-length": str(len(raw)),
+                "last-modified": modified.strftime("%a, %d %b %Y %H:%M:%S GMT")}
+
+    def list_names(self, prefix):
+        names = []
+        for directory, _, files in os.walk(self.root):
+            for file_name in files:
+                if file_name == ".lock" or file_name.endswith(".tmp"):
+                    continue
+                name = os.path.relpath(os.path.join(directory, file_name), self.root).replace(os.sep, "/")
+                if name.startswith(prefix):
+                    names.append(name)
+        return sorted(names)
+
+    def delete(self, name, if_match=None):
+        with self._exclusive():
+            self._check(name, if_match, None)
+            try:
+                os.unlink(self._path(name))
+            except FileNotFoundError:
+                return False
+        return True
+
+
+class _FileStream:
+    """以固定大小區塊讀取檔案的可迭代物件"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def __iter__(self):
+        return iter(lambda: self.f.read(CHUNK_SIZE), b"")
+
+    def close(self):
+        self.f.close()
+
+
+def _default_oci_bin():
+    return shutil.which("oci") or os.path.expanduser("~/bin/oci")
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def open_storage(namespace=NAMESPACE, bucket_name=BUCKET_NAME, backend=None):
+    """取得共用的儲存後端（同一行程同一 bucket 只建立一次 client）
+
+    Args:
+        backend: 'local:<目錄>'、'cli' 或 'sdk'，預設讀取環境變數 PERMIT_STORAGE
+    """
+    backend = backend or os.environ.get("PERMIT_STORAGE", "")
+    key = (namespace, bucket_name, backend)
+    with _shared_lock:
+        if key not in _shared:
+            if backend.startswith("local:"):
+                _shared[key] = LocalStorage(backend[len("local:"):])
+            elif backend == "cli" or (oci is None and backend != "sdk"):
+                _shared[key] = OCICliStorage(namespace, bucket_name, _default_oci_bin())
+            else:
+                _shared[key] = OCISDKStorage(namespace, bucket_name)
+        return _shared[key]
+
+
+if __name__ == "__main__":
+    storage = open_storage()
+    if len(sys.argv) > 1 and sys.argv[1] == "ls":
+        for name in storage.list_names(sys.argv[2] if len(sys.argv) > 2 else ""):
+            print(name)
+    elif len(sys.argv) > 2 and sys.argv[1] == "get":
+        target = sys.argv[3] if len(sys.argv) > 3 else os.path.basename(sys.argv[2])
+        print("✅" if storage.download(sys.argv[2], target) else "❌", target)
+    elif len(sys.argv) > 3 and sys.argv[1] == "put":
+        print("✅" if storage.upload(sys.argv[2], sys.argv[3]) else "❌", sys.argv[3])
+    else:
+        print(__doc__)
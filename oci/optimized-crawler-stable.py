@@ -10,7 +10,6 @@
 5. 進度保存 - 中斷可恢復
 """
 
-import subprocess
 import time
 import json
 import re
@@ -19,13 +18,26 @@ import signal
 import sys
 from datetime import datetime
 
+from permit_fetcher import PermitFetcher, NO_DATA
+from crawl_pacer import AIMDPacer
+from frontier_search import FrontierCache, FrontierSearch
+from sequence_state import SequenceStateIndex
+from crawl_journal import CrawlJournal
+from retry_queue import RetryQueue
+from recrawl_scheduler import RecrawlScheduler
+import permit_parser
+from permit_store import PermitStore
+from object_storage import open_storage
+from html_archive import HtmlArchiveWriter
+from baojia_realtime_filter import BaojiaRealtimeFilter
+import baojia_tags
+
 class OptimizedCrawler:
     def __init__(self):
         self.base_url = "https://mcgbm.taichung.gov.tw/bupic/pages/queryInfoAction.do"
         self.namespace = "nrsdi1rz5vl8"
         self.bucket_name = "taichung-building-permits"
         self.results = []
-        self.failed_keys = []
         self.skipped_keys = []
         self.stats = {
             'total_attempted': 0,
@@ -36,10 +48,50 @@ class OptimizedCrawler:
         }
         
         # 優化參數
-        self.request_delay = 0.8  # 減少延遲
+        self.request_delay = 0.8  # 兩段式暖機兩次請求之間的間隔（請求節奏由 self.pacer 控制）
         self.timeout = 20  # 減少超時時間
         self.batch_size = 30  # 增加批次大小
-        self.retry_limit = 2  # 重試次數
+        self.max_consecutive_no_data = 20  # 連續20個無資料就停止
+        self.max_consecutive_failed = 5  # 連續5個失敗就停止
+        self.frontier_gap_tolerance = 3  # 找最新序號時，連續3個無資料才視為超過前緣
+        
+        # 各年度最後已知的已發照序號；找前緣時探測到的結果留給爬取直接使用
+        self.frontier_cache = FrontierCache()
+        self.prefetched = {}  # index_key -> 結果
+        
+        # 各年度每個序號的爬取狀態，每筆結果即時更新，補爬區間由此產生
+        self.sequence_state = SequenceStateIndex()
+        
+        # 每筆抓取結果、上傳、範圍開始/結束都先寫入本機日誌，中斷（含 kill -9）後可精確續爬
+        self.journal = CrawlJournal()
+        
+        # 失敗的 INDEX_KEY 排入延遲重試佇列（指數退避），爬取主迴圈不原地重試
+        self.retry_queue = RetryQueue()
+        
+        # 欄位不完整的資料依分數排程重爬，每日請求數有上限
+        self.recrawl_scheduler = RecrawlScheduler()
+        
+        # 自適應請求節奏：依回應時間、超時與格式錯誤比例調整速率，同機所有爬蟲行程共用預算
+        self.pacer = AIMDPacer()
+        self.metrics_dir = 'crawl-metrics'  # 每次執行的吞吐量與降速事件
+        
+        # 共用的keep-alive連線（取代每筆兩次wget子行程）
+        self.fetcher = PermitFetcher(self.base_url, timeout=self.timeout, request_delay=self.request_delay,
+                                     pacer=self.pacer)
+        
+        # 物件儲存（OCI SDK 長期連線，PERMIT_STORAGE=local:<目錄> 時為本機目錄）
+        self.storage = open_storage(self.namespace, self.bucket_name)
+        
+        # 原始頁面寫入壓縮 segment，封存後在背景上傳（取代每頁一個 html/ 物件）
+        self.html_archive = HtmlArchiveWriter(self.storage)
+        
+        # 寫入時標記寶佳機構（公司與公司清單版本），讀取端不必再比對
+        self.baojia_filter = BaojiaRealtimeFilter(storage=self.storage)
+        
+        # 增量儲存：批次只寫 delta segment，定期壓實成快照
+        self.store = PermitStore(self.storage, tagger=self.baojia_filter)
+        self.compact_every = 10  # 每10個segment壓實一次
+        self.segments_since_compact = 0
         
         # 設定信號處理
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -51,79 +103,38 @@ class OptimizedCrawler:
         self.print_final_stats()
         sys.exit(0)
 
-    def crawl_single_permit(self, index_key, retry_count=0):
-        """爬取單一建照資料 - 優化版"""
-        cookie_file = None
-        temp_file = None
+    def crawl_single_permit(self, index_key, fetcher=None):
+        """爬取單一建照資料 - 行程內連線池版
         
+        fetcher: 指定抓取器（非同步引擎共用的 session 池），預設使用本身的抓取器
+        """
+        if index_key in self.prefetched:
+            return self.prefetched.pop(index_key)
+        result = self.fetch_permit(index_key, fetcher)
+        self.log_result(index_key, result)
+        return result
+
+    def log_result(self, index_key, result):
+        """抓取結果寫入爬取日誌與序號狀態索引；失敗的排入重試佇列，取得結果的移出"""
+        self.journal.result(index_key, result)
+        self.sequence_state.record_result(index_key, result)
+        if result is None:
+            self.retry_queue.fail(index_key)
+        else:
+            self.retry_queue.succeed(index_key)
+
+    def fetch_permit(self, index_key, fetcher=None):
+        """抓取並解析單一建照：回傳建照資料、NO_DATA，或 None（失敗）"""
         try:
-            # 使用唯一的cookie檔案避免衝突
-            cookie_file = f"/tmp/cookie_{index_key}_{int(time.time())}.txt"
-            
-            # 第一次訪問 - 建立session
-            cmd1 = [
-                "wget", "-q", "--timeout=" + str(self.timeout),
-                "--save-cookies=" + cookie_file, "--keep-session-cookies",
-                "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                "-O", "/dev/null",  # 直接丟棄第一次回應
-                f"{self.base_url}?INDEX_KEY={index_key}"
-            ]
-            
-            result1 = subprocess.run(cmd1, capture_output=True, timeout=self.timeout)
+            if fetcher is None:
+                # 呼叫端常在建立後才調整暖機間隔/超時，每次同步給抓取器
+                fetcher = self.fetcher
+                fetcher.request_delay = self.request_delay
+                fetcher.timeout = self.timeout
+            html = fetcher.fetch_html(index_key)
             
-            if result1.returncode != 0:
-                self.cleanup_files(cookie_file)
-                return None
-            
-            # 短暫延遲
-            time.sleep(self.request_delay)
-            
-            # 第二次訪問 - 取得資料
-            temp_file = f"/tmp/page_{index_key}_{int(time.time())}.html"
-            cmd2 = [
-                "wget", "-q", "--timeout=" + str(self.timeout),
-                "--load-cookies=" + cookie_file,
-                "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                "-O", temp_file,
-                f"{self.base_url}?INDEX_KEY={index_key}"
-            ]
-            
-            result2 = subprocess.run(cmd2, capture_output=True, timeout=self.timeout)
-            
-            # 清理cookie檔案
-            self.cleanup_files(cookie_file)
-            
-            if result2.returncode != 0:
-                self.cleanup_files(temp_file)
-                return None
-            
-            # 讀取並檢查內容
-            try:
-                with open(temp_file, 'rb') as f:
-                    content = f.read()
-                self.cleanup_files(temp_file)
-            except:
-                return None
-            
-            # 快速檢查內容大小
-            if len(content) < 1000:
-                return None
-            
-            # 解碼
-            try:
-                html = content.decode('big5')
-            except:
-                try:
-                    html = content.decode('utf-8', errors='ignore')
-                except:
-                    return None
-            
-            # 快速檢查是否有資料
-            if "查無任何資訊" in html:
-                return "NO_DATA"  # 特殊標記表示此序號無資料
-            
-            if "建造執照號碼" not in html:
-                return None
+            if html is None or html == NO_DATA:
+                return html
             
             # 解析資料
             permit_data = self.parse_permit_data(html, index_key)
@@ -133,21 +144,8 @@ class OptimizedCrawler:
                 self.save_html_background(index_key, html)
                 return permit_data
                 
-        except subprocess.TimeoutExpired:
-            print(f"⏰ 超時 {index_key}")
-            # 只清理已定義的檔案
-            if cookie_file:
-                self.cleanup_files(cookie_file)
-            if temp_file:
-                self.cleanup_files(temp_file)
-            return None
         except Exception as e:
             print(f"❌ 錯誤 {index_key}: {e}")
-            # 只清理已定義的檔案
-            if cookie_file:
-                self.cleanup_files(cookie_file)
-            if temp_file:
-                self.cleanup_files(temp_file)
             return None
         
         return None
@@ -162,242 +160,67 @@ class OptimizedCrawler:
                 pass
 
     def save_html_background(self, index_key, html_content):
-        """背景保存HTML"""
+        """保存HTML到存檔 segment（寫入本機暫存檔，封存後背景上傳，不阻塞爬取）"""
         try:
-            temp_file = f"/tmp/html_{index_key}_{int(time.time())}.html"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            
-            # 背景上傳命令
-            cmd = f"""
-            nohup oci os object put \\
-                --namespace {self.namespace} \\
-                --bucket-name {self.bucket_name} \\
-                --name html/{index_key}.html \\
-                --file {temp_file} \\
-                --content-type 'text/html; charset=utf-8' \\
-                --force && rm {temp_file} &
-            """
-            
-            subprocess.Popen(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            
+            self.html_archive.append(index_key, html_content)
         except Exception as e:
             print(f"⚠️ HTML保存失敗 {index_key}: {e}")
 
     def parse_permit_data(self, html_content, index_key):
-        """解析建照資料"""
+        """解析建照資料（共用的 permit_parser，整頁只走訪一次）"""
         try:
-            permit_data = {
-                'indexKey': index_key,
-                'permitYear': int(index_key[:3]),
-                'permitType': int(index_key[3]),
-                'sequenceNumber': int(index_key[4:9]),
-                'versionNumber': int(index_key[9:11]),
-                'crawledAt': datetime.now().isoformat()
-            }
-            
-            # 建照號碼 (必要欄位)
-            m = re.search(r'<span class="conlist w20 tc">([1-9]\d{0,2}中[都市建]?建字第\d+號)</span>', html_content)
-            if m:
-                permit_data['permitNumber'] = m.group(1).strip()
-            else:
-                return None
-            
-            # 起造人
-            patterns = [
-                r'起造人.*?姓名.*?<span class="conlist w30">([^<]+)</span>',
-                r'起造人.*?<span class="conlist w30">([^<]+)</span>'
-            ]
-            for pattern in patterns:
-                m = re.search(pattern, html_content, re.DOTALL)
-                if m:
-                    permit_data['applicantName'] = m.group(1).strip()
-                    break
-            
-            # 地號
-            m = re.search(r'地號.*?<span class="conlist w30">([^<]+)</span>', html_content, re.DOTALL)
-            if m:
-                land_text = m.group(1).strip()
-                permit_data['siteAddress'] = land_text
-                
-                # 提取行政區
-                district_match = re.search(r'臺中市([^區]+區)', land_text)
-                if district_match:
-                    permit_data['district'] = district_match.group(1)
-            
-            # 層棟戶數
-            m = re.search(r'層棟戶數.*?<span class="conlist w50">([^<]+)</span>', html_content, re.DOTALL)
-            if m:
-                floor_info = m.group(1).strip()
-                permit_data['floorInfo'] = floor_info
-                
-                # 解析數值 - 更完整的解析
-                # 地上層數
-                floor_match = re.search(r'地上(\d+)層', floor_info)
-                if floor_match:
-                    permit_data['floorsAbove'] = int(floor_match.group(1))
-                    permit_data['floors'] = int(floor_match.group(1))  # 保留舊欄位相容性
-                
-                # 地下層數
-                basement_match = re.search(r'地下(\d+)層', floor_info)
-                if basement_match:
-                    permit_data['floorsBelow'] = int(basement_match.group(1))
-                
-                # 幢數
-                block_match = re.search(r'(\d+)幢', floor_info)
-                if block_match:
-                    permit_data['blockCount'] = int(block_match.group(1))
-                
-                # 棟數
-                building_match = re.search(r'(\d+)棟', floor_info)
-                if building_match:
-                    permit_data['buildingCount'] = int(building_match.group(1))
-                    permit_data['buildings'] = int(building_match.group(1))  # 相容舊欄位名稱
-                
-                # 戶數
-                unit_match = re.search(r'(\d+)戶', floor_info)
-                if unit_match:
-                    permit_data['unitCount'] = int(unit_match.group(1))
-                    permit_data['units'] = int(unit_match.group(1))  # 相容舊欄位名稱
-            
-            # 總樓地板面積
-            m = re.search(r'總樓地板面積.*?<span class="conlist w50">([0-9.,]+)', html_content, re.DOTALL)
-            if m:
-                try:
-                    area_str = m.group(1).replace(',', '')
-                    permit_data['totalFloorArea'] = float(area_str)
-                except:
-                    pass
-            
-            # 發照日期
-            m = re.search(r'發照日期.*?<span class="conlist w30">(\d+年\d+月\d+日)</span>', html_content, re.DOTALL)
-            if m:
-                date_text = m.group(1).strip()
-                date_m = re.search(r'(\d+)年(\d+)月(\d+)日', date_text)
-                if date_m:
-                    year = int(date_m.group(1))  # 民國年
-                    month = int(date_m.group(2))
-                    day = int(date_m.group(3))
-                    # 保留兩種格式
-                    permit_data['issueDate'] = f"{year + 1911:04d}-{month:02d}-{day:02d}"  # 西元年格式
-                    permit_data['issueDateROC'] = f"{year:03d}/{month:02d}/{day:02d}"  # 民國年格式 114/03/03
-            
-            return permit_data
-            
+            return permit_parser.parse_permit(html_content, index_key)
         except Exception as e:
             print(f"❌ 解析失敗 {index_key}: {e}")
             return None
 
     def upload_batch_data(self, new_permits):
-        """批次上傳資料 - 累加模式"""
+        """批次上傳資料 - 只追加一個 delta segment，不再下載/重傳完整 permits.json"""
         try:
-            # 先下載現有資料
-            existing_permits = []
-            existing_data = {}
-            
-            print("   📥 載入現有資料...", end=' ')
-            cmd = [
-                "/home/laija/bin/oci", "os", "object", "get",
-                "--namespace", self.namespace,
-                "--bucket-name", self.bucket_name,
-                "--name", "data/permits.json",
-                "--file", "/tmp/existing_permits.json"
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True)
-            
-            if result.returncode == 0:
-                try:
-                    with open('/tmp/existing_permits.json', 'r', encoding='utf-8') as f:
-                        existing_data = json.load(f)
-                        existing_permits = existing_data.get('permits', [])
-                    print(f"✅ ({len(existing_permits)} 筆)")
-                except:
-                    print("⚠️ (讀取失敗)")
-            else:
-                print("⚠️ (無現有資料)")
-            
-            # 建立已存在資料的字典（用於更新）
-            existing_dict = {p.get('indexKey'): p for p in existing_permits}
-            
-            # 更新或新增資料
-            added_count = 0
-            updated_count = 0
-            
-            for permit in new_permits:
-                index_key = permit.get('indexKey')
-                if index_key in existing_dict:
-                    # 檢查現有資料是否完整
-                    old_permit = existing_dict[index_key]
-                    # 如果新資料有更多欄位，則更新
-                    if len(permit) > len(old_permit) or permit.get('crawledAt', '') > old_permit.get('crawledAt', ''):
-                        existing_dict[index_key] = permit
-                        updated_count += 1
-                else:
-                    # 全新資料
-                    existing_dict[index_key] = permit
-                    added_count += 1
-            
-            # 轉回列表
-            existing_permits = list(existing_dict.values())
-            
-            print(f"   ➕ 新增 {added_count} 筆資料, 🔄 更新 {updated_count} 筆資料")
-            
-            # 排序所有資料
-            sorted_permits = sorted(existing_permits, key=lambda x: (
-                -x.get('permitYear', 0),
-                -x.get('sequenceNumber', 0)
-            ))
-            
-            # 統計各年份數量
-            year_counts = {}
-            for permit in sorted_permits:
-                year = permit.get('permitYear', 0)
-                if year not in year_counts:
-                    year_counts[year] = 0
-                year_counts[year] += 1
-            
-            data = {
-                "lastUpdate": datetime.now().isoformat(),
-                "totalCount": len(sorted_permits),
-                "yearCounts": year_counts,
-                "permits": sorted_permits,
-                "crawlStats": self.stats
-            }
-            
-            # 寫入臨時檔案
-            temp_file = f"/tmp/permits_batch_{int(time.time())}.json"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            # 上傳到三個位置（包含網頁使用的all_permits.json）
-            success = True
-            for dest_path in ["permits.json", "data/permits.json", "all_permits.json"]:
-                cmd = [
-                    "/home/laija/bin/oci", "os", "object", "put",
-                    "--namespace", self.namespace,
-                    "--bucket-name", self.bucket_name,
-                    "--name", dest_path,
-                    "--file", temp_file,
-                    "--content-type", "application/json",
-                    "--force"
-                ]
-                result = subprocess.run(cmd, capture_output=True, timeout=60)
-                if result.returncode != 0:
-                    success = False
-            
-            os.unlink(temp_file)
+            self.tag_permits(new_permits)
+            success = self.store.append_segment(new_permits, crawl_stats=self.stats)
+            if success:
+                self.journal.uploaded(new_permits)
+                self.sequence_state.save()
+                self.segments_since_compact += 1
+                # 累積一定數量的 segment 才壓實發佈一次
+                if self.segments_since_compact >= self.compact_every:
+                    self.publish()
             return success
             
         except Exception as e:
             print(f"❌ 批次上傳失敗: {e}")
             return False
 
+    def tag_permits(self, permits):
+        """寫入前加上寶佳標記；失敗時照常上傳，壓實時會補上標記"""
+        try:
+            self.baojia_filter.refresh_companies()
+            baojia_tags.stamp_permits(permits, self.baojia_filter)
+        except Exception as e:
+            print(f"⚠️ 寶佳標記失敗，留待壓實時補上: {e}")
+
+    def publish(self, retag=False):
+        """把待合併的 segment 壓實成網頁使用的 permits.json"""
+        self.sequence_state.save()
+        self.html_archive.flush()
+        try:
+            self.baojia_filter.refresh_companies()
+            success = self.store.compact(retag=retag)
+            if success:
+                self.segments_since_compact = 0
+            return success
+        except Exception as e:
+            print(f"❌ 壓實發佈失敗: {e}")
+            return False
+
     def save_progress(self):
         """保存進度"""
         if self.results:
             print(f"💾 保存進度：{len(self.results)} 筆資料")
-            self.upload_batch_data(self.results)
+            if self.upload_batch_data(self.results):
+                self.results = []
+        self.publish()
 
     def print_stats(self):
         """打印即時統計"""
@@ -406,7 +229,7 @@ class OptimizedCrawler:
         
         print(f"📊 [{elapsed:.0f}s] 成功:{self.stats['successful']} 失敗:{self.stats['failed']} 跳過:{self.stats['skipped']} 速度:{rate:.2f}/s")
 
-    def print_final_stats(self):
+    def print_final_stats(self, fetcher=None):
         """打印最終統計"""
         elapsed = time.time() - self.stats['start_time']
         rate = self.stats['successful'] / elapsed if elapsed > 0 else 0
@@ -419,32 +242,192 @@ class OptimizedCrawler:
         print(f"   總耗時: {elapsed:.1f} 秒")
         print(f"   平均速度: {rate:.2f} 筆/秒")
         
+        pool_stats = (fetcher or self.fetcher).pool.summary()
+        print(f"   連線重用: 單次請求 {pool_stats['single']} 筆, 兩段式暖機 {pool_stats['handshakes']} 次 "
+              f"(失效重暖 {pool_stats['rewarms']}, 無資料確認 {pool_stats['no_data_checks']})")
+        
+        pacer_stats = self.pacer.summary()
+        print(f"   請求節奏: {pacer_stats['requests']} 次請求, 實測 {pacer_stats['requestsPerSecond']:.2f} 請求/秒, "
+              f"目前 {pacer_stats['rps']['final']:.2f} 請求/秒, 降速 {len(pacer_stats['backoffs'])} 次")
+        retry_stats = self.retry_queue.summary()
+        print(f"   重試佇列: 待重試 {retry_stats['waiting']} 筆 (已到期 {retry_stats['due']}), "
+              f"無法完成 {retry_stats['dead']} 筆")
+        archive_stats = self.html_archive.summary()
+        print(f"   HTML存檔: {archive_stats['pages']} 頁, 壓縮後 {archive_stats['ratio']:.0%}, "
+              f"已上傳 {archive_stats['uploaded']} 個 segment (失敗 {archive_stats['failed']})")
+        self.export_metrics()
+        
         if self.stats['successful'] > 0:
             estimated_time = (5440 - self.stats['successful']) / rate / 3600  # 預估剩餘時間
             print(f"   預估完成時間: {estimated_time:.1f} 小時")
 
-    def crawl_year_range(self, year, start_seq, end_seq=None, auto_stop=False):
+    def export_metrics(self):
+        """輸出本次執行的請求節奏統計（吞吐量、回應時間、降速事件）"""
+        started = datetime.fromtimestamp(self.pacer.started).strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.metrics_dir, f"pacer-{started}-{os.getpid()}.json")
+        try:
+            self.pacer.export(path)
+            print(f"   節奏統計: {path}")
+        except OSError as e:
+            print(f"⚠️ 無法輸出節奏統計: {e}")
+        return path
+
+    def find_frontier(self, year, known=0):
+        """以指數 + 二分搜尋找出該年度最後一個已發照的序號
+        
+        Args:
+            known: 已知有資料的序號，與快取的前緣取較大者作為起點
+        """
+        permit_type = 1
+        cached = self.frontier_cache.get(year) or 0
+        search = FrontierSearch(
+            lambda seq: self.crawl_single_permit(f"{year}{permit_type}{seq:05d}00"),
+            gap_tolerance=self.frontier_gap_tolerance
+        )
+        frontier = search.find(max(known, cached))
+        for seq, result in search.results.items():
+            if result is not None and seq <= frontier:
+                self.prefetched[f"{year}{permit_type}{seq:05d}00"] = result
+        self.frontier_cache.set(year, frontier)
+        print(f"🧭 {year} 年最新序號: {frontier:05d} (探測 {search.probes} 次)")
+        return frontier
+
+    def fill_gaps(self, years=None, retry_after=3600):
+        """依序號狀態索引補爬：未爬取、失敗、欄位空白的序號合併成連續區間依序爬取
+        
+        各區間只批次上傳 segment，全部爬完才重試、壓實發佈一次（數百個單一序號的缺口不會各自重寫整份快照）
+        
+        Args:
+            years: 年份清單，預設為索引中的所有年度
+            retry_after: 最近此秒數內嘗試過的序號略過（剛失敗的不立即重試）
+        """
+        years = years or sorted(self.sequence_state.years)
+        plan = [(year, self.sequence_state.ranges(year, retry_after=retry_after)) for year in years]
+        
+        print("📋 補爬計畫:")
+        for year, gaps in plan:
+            total = sum(end - start + 1 for start, end in gaps)
+            print(f"   {year}年: {len(gaps)} 個區間，共 {total} 筆 (至 {self.sequence_state.last_issued(year):05d})")
+        print("=" * 70)
+        
+        for year, gaps in plan:
+            for idx, (start, end) in enumerate(gaps):
+                try:
+                    print(f"\n[{idx+1}/{len(gaps)}] 補爬 {year}年 {start:05d}-{end:05d}...")
+                    self.crawl_year_range(year, start, end, False, finish=False)
+                except KeyboardInterrupt:
+                    print("\n🛑 用戶中斷")
+                    return
+                except Exception as e:
+                    print(f"❌ 補爬失敗: {e}")
+                    if self.results:
+                        self.flush_batch()
+                    continue
+        
+        self.finish()
+
+    def seed_sequence_state(self):
+        """由目前發佈的資料集建立序號狀態索引（首次使用）"""
+        permits = self.store.load_snapshot().get('permits', [])
+        added = self.sequence_state.seed(permits)
+        self.sequence_state.save()
+        print(f"✅ 由 {len(permits)} 筆建照填入 {added} 個序號狀態")
+        return added
+
+    def recover(self, year=None, start_seq=None):
+        """重播爬取日誌（開始爬取前呼叫）
+        
+        補上傳日誌中尚未上傳的資料、還原無資料清單並把失敗的排入重試佇列；日誌中未完成的範圍與本次相同
+        (year, start_seq) 時，其後已抓取的結果放入 prefetched，不重抓。
+        
+        Returns:
+            續爬的序號，不是同一範圍時為 None
+        """
+        state = self.journal.state
+        active = state.active
+        resume, ahead = None, {}
+        if active and active['year'] == year and active['start'] == start_seq:
+            resume, ahead = state.resume_point()
+            self.prefetched.update(ahead)
+        
+        for index_key, result in state.results.items():
+            if index_key in ahead:
+                continue
+            if result == NO_DATA:
+                if index_key not in self.skipped_keys:
+                    self.skipped_keys.append(index_key)
+            elif result is None and index_key not in self.retry_queue:
+                self.retry_queue.fail(index_key)
+        
+        pending = [permit for key, permit in state.pending.items() if key not in ahead]
+        if pending:
+            print(f"📒 日誌中有 {len(pending)} 筆尚未上傳，補上傳...")
+            if not self.upload_batch_data(pending):
+                print("❌ 補上傳失敗，保留在日誌中")
+        
+        if resume is not None:
+            print(f"📒 由日誌續爬 {year}年: 從 {resume:05d} 開始 (之後已抓取 {len(ahead)} 筆不重抓)")
+        return resume
+
+    def open_range(self, year, start_seq, end_seq, auto_stop):
+        """開始一個爬取範圍：由日誌續爬、解析結束序號、記錄範圍開始
+        
+        Returns:
+            (實際開始序號, 結束序號)，沒有需要爬取的序號時為 None
+        """
+        resume = self.recover(year, start_seq)
+        first_seq = start_seq if resume is None else resume
+        if resume is None:
+            # 在找前緣之前記錄，探測取得的結果續爬時也不重抓
+            self.journal.begin_range(year, start_seq, end_seq, auto_stop)
+        end_seq = self.resolve_end_seq(year, first_seq, end_seq, auto_stop)
+        if end_seq is not None and end_seq < first_seq:
+            print(f"✅ {year} 年沒有 {first_seq:05d} 之後的新建照")
+            self.journal.end_range()
+            return None
+        return first_seq, end_seq
+
+    def resume(self):
+        """繼續日誌中未完成的範圍"""
+        active = self.journal.state.active
+        if active is None:
+            self.recover()
+            print("✅ 沒有未完成的爬取範圍")
+            return False
+        self.crawl_year_range(active['year'], active['start'], active['end'], active['autoStop'])
+        return True
+
+    def resolve_end_seq(self, year, start_seq, end_seq, auto_stop):
+        """爬到空白為止的範圍先找出前緣，改為明確的結束序號"""
+        if end_seq is None and auto_stop:
+            return self.find_frontier(year, start_seq - 1)
+        return end_seq
+
+    def crawl_year_range(self, year, start_seq, end_seq=None, auto_stop=False, finish=True):
         """爬取指定年份範圍
         
         Args:
             year: 年份
             start_seq: 開始序號
-            end_seq: 結束序號 (如果為None且auto_stop=True，則爬到空白為止)
-            auto_stop: 是否自動停止（連續遇到多個空白後停止）
+            end_seq: 結束序號 (如果為None且auto_stop=True，則先搜尋最新序號，爬到該序號為止)
+            auto_stop: 是否自動停止（連續遇到多個空白或失敗後停止）
+            finish: 範圍爬完後重試到期的失敗序號、壓實發佈並輸出統計；連續爬多個範圍時由呼叫端最後做一次
         """
+        opened = self.open_range(year, start_seq, end_seq, auto_stop)
+        if opened is None:
+            return
+        start_seq, end_seq = opened
+        
         if end_seq:
             print(f"🚀 開始爬取 {year} 年資料 ({start_seq:05d}-{end_seq:05d})")
         else:
             print(f"🚀 開始爬取 {year} 年資料 (從 {start_seq:05d} 開始，直到空白)")
         
-        print(f"🔧 參數: 延遲={self.request_delay}s, 超時={self.timeout}s, 批次={self.batch_size}")
+        print(f"🔧 參數: 速率={self.pacer.rps:.2f}/s (上限 {self.pacer.max_rps}/s), 超時={self.timeout}s, 批次={self.batch_size}")
         print("=" * 70)
         
         permit_type = 1
-        consecutive_no_data = 0  # 連續無資料計數
-        max_consecutive_no_data = 20  # 連續20個無資料就停止
-        consecutive_failed = 0  # 連續失敗計數
-        max_consecutive_failed = 5  # 連續5個失敗就停止
+        counters = {'no_data': 0, 'failed': 0}  # 連續無資料 / 連續失敗計數
         seq = start_seq
         
         while True:
@@ -453,110 +436,210 @@ class OptimizedCrawler:
                 break
                 
             index_key = f"{year}{permit_type}{seq:05d}00"
-            self.stats['total_attempted'] += 1
             
             print(f"🔍 [{seq:05d}] {index_key}...", end=' ', flush=True)
             
             result = self.crawl_single_permit(index_key)
             
-            if result == "NO_DATA":
-                # 序號無資料，跳過
-                self.skipped_keys.append(index_key)
-                self.stats['skipped'] += 1
-                consecutive_no_data += 1
-                consecutive_failed = 0  # 無資料不算失敗，重置失敗計數
-                print(f"⏭️ 無資料 (連續 {consecutive_no_data})")
-                
-                # 如果啟用自動停止且連續無資料超過閾值，停止爬取
-                if auto_stop and consecutive_no_data >= max_consecutive_no_data:
-                    print(f"\n🛑 連續 {max_consecutive_no_data} 筆無資料，停止 {year} 年爬取")
-                    print(f"   最後有效序號約為: {seq - max_consecutive_no_data:05d}")
-                    break
-            elif result:
-                # 成功爬取
-                self.results.append(result)
-                self.stats['successful'] += 1
-                consecutive_no_data = 0  # 重置連續無資料計數
-                consecutive_failed = 0  # 重置連續失敗計數
-                print(f"✅ {result['permitNumber']}")
-            else:
-                # 爬取失敗
-                self.failed_keys.append(index_key)
-                self.stats['failed'] += 1
-                consecutive_no_data = 0  # 失敗也重置計數（可能是網路問題）
-                consecutive_failed += 1  # 增加連續失敗計數
-                print(f"❌ 失敗 (連續 {consecutive_failed})")
-                
-                # 如果連續失敗超過閾值，停止爬取
-                if auto_stop and consecutive_failed >= max_consecutive_failed:
-                    print(f"\n🛑 連續 {max_consecutive_failed} 次失敗，停止 {year} 年爬取")
-                    print(f"   最後成功序號約為: {seq - max_consecutive_failed:05d}")
-                    break
-            
-            # 每10筆顯示統計
-            if self.stats['total_attempted'] % 10 == 0:
-                self.print_stats()
+            if self.record_result(year, seq, index_key, result, counters, auto_stop):
+                break
             
             # 批次上傳
             if len(self.results) >= self.batch_size:
-                print(f"\n💾 批次上傳 ({len(self.results)} 筆)...", end=' ')
-                if self.upload_batch_data(self.results):
-                    print("✅")
-                    self.results = []  # 清空已上傳的資料
-                else:
-                    print("❌")
+                self.flush_batch()
             
             seq += 1
         
         # 上傳最後剩餘的資料
         if self.results:
             print(f"\n💾 上傳最終資料 ({len(self.results)} 筆)...")
-            self.upload_batch_data(self.results)
+            if self.upload_batch_data(self.results):
+                self.results = []
+        self.journal.end_range()
         
+        if finish:
+            self.finish()
+    
+    def finish(self):
+        """範圍爬完後才重試已到期的失敗序號，再壓實發佈並輸出統計"""
+        self.retry_due()
+        self.publish()
         self.print_final_stats()
 
+    def record_result(self, year, seq, index_key, result, counters, auto_stop):
+        """記錄單一序號的結果，依序號順序呼叫
+        
+        Returns:
+            bool: 是否達到自動停止條件
+        """
+        self.stats['total_attempted'] += 1
+        stop = False
+        
+        if result == "NO_DATA":
+            # 序號無資料，跳過
+            self.skipped_keys.append(index_key)
+            self.stats['skipped'] += 1
+            counters['no_data'] += 1
+            counters['failed'] = 0  # 無資料不算失敗，重置失敗計數
+            print(f"⏭️ 無資料 (連續 {counters['no_data']})")
+            
+            # 如果啟用自動停止且連續無資料超過閾值，停止爬取
+            if auto_stop and counters['no_data'] >= self.max_consecutive_no_data:
+                print(f"\n🛑 連續 {self.max_consecutive_no_data} 筆無資料，停止 {year} 年爬取")
+                print(f"   最後有效序號約為: {seq - self.max_consecutive_no_data:05d}")
+                stop = True
+        elif result:
+            # 成功爬取
+            self.results.append(result)
+            self.stats['successful'] += 1
+            counters['no_data'] = 0  # 重置連續無資料計數
+            counters['failed'] = 0  # 重置連續失敗計數
+            print(f"✅ {result['permitNumber']}")
+        else:
+            # 爬取失敗（已由 log_result 排入重試佇列）
+            self.stats['failed'] += 1
+            counters['no_data'] = 0  # 失敗也重置計數（可能是網路問題）
+            counters['failed'] += 1  # 增加連續失敗計數
+            print(f"❌ 失敗 (連續 {counters['failed']})，稍後重試")
+            
+            # 如果連續失敗超過閾值，停止爬取
+            if auto_stop and counters['failed'] >= self.max_consecutive_failed:
+                print(f"\n🛑 連續 {self.max_consecutive_failed} 次失敗，停止 {year} 年爬取")
+                print(f"   最後成功序號約為: {seq - self.max_consecutive_failed:05d}")
+                stop = True
+        
+        # 每10筆顯示統計
+        if self.stats['total_attempted'] % 10 == 0:
+            self.print_stats()
+        
+        return stop
+
+    def retry_due(self, limit=50):
+        """重試佇列中已到期的 INDEX_KEY；結果照常記錄、上傳，再次失敗時依退避排定下次重試
+        
+        Returns:
+            重試的筆數
+        """
+        keys = self.retry_queue.due(limit=limit)
+        if not keys:
+            return 0
+        print(f"\n🔁 重試 {len(keys)} 筆已到期的失敗序號")
+        counters = {'no_data': 0, 'failed': 0}
+        for index_key in keys:
+            year, seq = int(index_key[:3]), int(index_key[4:9])
+            print(f"🔍 [{seq:05d}] {index_key}...", end=' ', flush=True)
+            result = self.crawl_single_permit(index_key)
+            self.record_result(year, seq, index_key, result, counters, False)
+        if self.results:
+            self.flush_batch()
+        return len(keys)
+
+    def recrawl_incomplete(self, limit=None, dry_run=False):
+        """在今日剩餘預算內重爬分數最高的不完整資料
+        
+        重爬結果只補上或更新有值的欄位，重爬時空白的欄位保留原本的值（較新的 crawledAt 會讓合併採用重爬結果，
+        不能讓內容較少的重爬結果蓋掉原本的資料）；重爬後仍缺漏的欄位記入排程器，之後降低優先
+        
+        Args:
+            limit: 本次最多重爬筆數，預設為今日剩餘預算
+            dry_run: 只列出排程，不爬取
+        
+        Returns:
+            重爬的筆數
+        """
+        scheduler = self.recrawl_scheduler
+        budget = scheduler.remaining()
+        if limit is not None:
+            budget = min(budget, limit)
+        if budget <= 0 and not dry_run:
+            print("📅 今日重爬預算已用完")
+            return 0
+        
+        permits = self.store.load_snapshot().get('permits', [])
+        plan = scheduler.plan(permits, self.sequence_state, self.retry_queue, limit=budget or limit)
+        print(f"\n🩹 重爬不完整資料: {len(plan)} 筆 (今日剩餘預算 {scheduler.remaining()}/{scheduler.daily_budget})")
+        if dry_run:
+            for score, permit, missing in plan:
+                print(f"   {score:7.1f}  {permit['indexKey']}  缺 {', '.join(missing)}")
+            return 0
+        
+        counters = {'no_data': 0, 'failed': 0}
+        for _, permit, missing in plan:
+            index_key = permit['indexKey']
+            print(f"🔍 [{permit['sequenceNumber']:05d}] {index_key} (缺 {', '.join(missing)})...", end=' ', flush=True)
+            result = self.crawl_single_permit(index_key)
+            scheduler.spend()
+            if isinstance(result, dict):
+                scheduler.record_refetch(index_key, result)
+                result = self.combine_refetch(permit, result)
+            self.record_result(permit['permitYear'], permit['sequenceNumber'], index_key, result, counters, False)
+            if len(self.results) >= self.batch_size:
+                self.flush_batch()
+        if self.results:
+            self.flush_batch()
+        return len(plan)
+
+    @staticmethod
+    def combine_refetch(stored, refetched):
+        """以原本的資料為底，套上重爬結果中有值的欄位（起造人改變時寶佳標記由上傳前重新標記）"""
+        combined = {k: v for k, v in stored.items() if k not in baojia_tags.DERIVED_FIELDS}
+        combined.update((k, v) for k, v in refetched.items() if (v.strip() if isinstance(v, str) else v))
+        return combined
+
+    def flush_batch(self):
+        """上傳已累積的批次資料，成功後清空"""
+        batch = list(self.results)
+        print(f"\n💾 批次上傳 ({len(batch)} 筆)...", end=' ')
+        if self.upload_batch_data(batch):
+            print("✅")
+            # 只移除已上傳的部分（非同步模式下上傳期間可能有新資料加入）
+            del self.results[:len(batch)]
+            return True
+        print("❌")
+        return False
+
+    def crawl_year_range_async(self, year, start_seq, end_seq=None, auto_stop=False,
+                               concurrency=8, max_rps=4.0):
+        """以非同步引擎爬取指定年份範圍（多個序號同時進行）"""
+        from async_crawler import AsyncCrawlEngine
+        
+        opened = self.open_range(year, start_seq, end_seq, auto_stop)
+        if opened is None:
+            return
+        start_seq, end_seq = opened
+        engine = AsyncCrawlEngine(self, concurrency=concurrency, max_rps=max_rps)
+        engine.run(year, start_seq, end_seq, auto_stop)
+        self.journal.end_range()
+
+    def crawl_year_range_pipeline(self, year, start_seq, end_seq=None, auto_stop=False,
+                                  fetchers=8, parsers=None, max_rps=4.0):
+        """以抓取 → 解析 → 儲存分段管線爬取指定年份範圍（解析在行程池進行）"""
+        from crawl_pipeline import CrawlPipeline
+        
+        opened = self.open_range(year, start_seq, end_seq, auto_stop)
+        if opened is None:
+            return
+        start_seq, end_seq = opened
+        pipeline = CrawlPipeline(self, fetchers=fetchers, parsers=parsers, max_rps=max_rps)
+        pipeline.run(year, start_seq, end_seq, auto_stop)
+        self.journal.end_range()
+
     def backup_existing_data(self):
         """備份現有資料"""
         try:
             print("📦 備份現有資料...")
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             
-            # 下載現有資料
-            cmd = [
-                "/home/laija/bin/oci", "os", "object", "get",
-                "--namespace", self.namespace,
-                "--bucket-name", self.bucket_name,
-                "--name", "data/permits.json",
-                "--file", f"/tmp/permits_backup_{timestamp}.json"
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True)
-            
-            if result.returncode == 0:
-                # 上傳備份
-                backup_cmd = [
-                    "/home/laija/bin/oci", "os", "object", "put",
-                    "--namespace", self.namespace,
-                    "--bucket-name", self.bucket_name,
-                    "--name", f"backups/permits_backup_{timestamp}.json",
-                    "--file", f"/tmp/permits_backup_{timestamp}.json",
-                    "--content-type", "application/json",
-                    "--force"
-                ]
-                
-                backup_result = subprocess.run(backup_cmd, capture_output=True)
-                
-                if backup_result.returncode == 0:
-                    print(f"✅ 備份成功: backups/permits_backup_{timestamp}.json")
-                    # 清理臨時檔案
-                    os.unlink(f"/tmp/permits_backup_{timestamp}.json")
-                    return True
-                else:
-                    print(f"❌ 備份上傳失敗")
-                    return False
-            else:
+            raw = self.storage.get_bytes("data/permits.json")
+            if raw is None:
                 print(f"⚠️ 沒有現有資料需要備份")
                 return True
+            
+            if self.storage.put_bytes(f"backups/permits_backup_{timestamp}.json", raw):
+                print(f"✅ 備份成功: backups/permits_backup_{timestamp}.json")
+                return True
+            print(f"❌ 備份上傳失敗")
+            return False
                 
         except Exception as e:
             print(f"❌ 備份失敗: {e}")
@@ -582,7 +665,7 @@ def main():
         if len(item) == 4:
             year, start, end, auto_stop = item
             if auto_stop:
-                print(f"   {year}年: 從 {start:05d} 開始，直到連續空白")
+                print(f"   {year}年: 從 {start:05d} 開始，直到最新序號")
             else:
                 count = end - start + 1
                 print(f"   {year}年: {start:05d}-{end:05d} ({count:,} 筆)")
@@ -613,75 +696,96 @@ def main():
 if __name__ == "__main__":
     # 檢查是否為補爬模式
     import sys
-    if len(sys.argv) > 1 and sys.argv[1] == "fill-gaps-114":
-        # 補爬114年所有缺失序號
+    if len(sys.argv) > 3 and sys.argv[1] == "async":
+        # 非同步模式: async <年份> <起始序號> [結束序號] [並行數] [每秒請求上限]
         crawler = OptimizedCrawler()
-        crawler.request_delay = 0.5  # 加快速度
-        
-        print("🔧 補爬114年缺失序號")
-        print("=" * 70)
+        year = int(sys.argv[2])
+        start_seq = int(sys.argv[3])
+        end_seq = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] != "auto" else None
+        concurrency = int(sys.argv[5]) if len(sys.argv) > 5 else 8
+        max_rps = float(sys.argv[6]) if len(sys.argv) > 6 else 4.0
         
-        # 114年的所有缺失區間
-        gaps_114 = []
-        # 101-344的規律性缺失（每5個缺4個）
-        for base in range(100, 345, 5):
-            gaps_114.append((114, base+1, base+4))
+        crawler.crawl_year_range_async(year, start_seq, end_seq, auto_stop=end_seq is None,
+                                       concurrency=concurrency, max_rps=max_rps)
         
-        # 361-390的大缺口
-        gaps_114.append((114, 361, 390))
+    elif len(sys.argv) > 3 and sys.argv[1] == "pipeline":
+        # 分段管線模式: pipeline <年份> <起始序號> [結束序號|auto] [抓取執行緒] [解析行程] [每秒請求上限]
+        crawler = OptimizedCrawler()
+        year = int(sys.argv[2])
+        start_seq = int(sys.argv[3])
+        end_seq = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] != "auto" else None
+        fetchers = int(sys.argv[5]) if len(sys.argv) > 5 else 8
+        parsers = int(sys.argv[6]) if len(sys.argv) > 6 else None
+        max_rps = float(sys.argv[7]) if len(sys.argv) > 7 else 4.0
         
-        print(f"📋 總計 {len(gaps_114)} 組缺失區間")
+        crawler.crawl_year_range_pipeline(year, start_seq, end_seq, auto_stop=end_seq is None,
+                                          fetchers=fetchers, parsers=parsers, max_rps=max_rps)
         
-        for idx, (year, start, end) in enumerate(gaps_114):
-            try:
-                print(f"\n[{idx+1}/{len(gaps_114)}] 補爬 {year}年 {start:05d}-{end:05d}...")
-                crawler.crawl_year_range(year, start, end, False)
-            except KeyboardInterrupt:
-                print("\n🛑 用戶中斷")
-                break
-            except Exception as e:
-                print(f"❌ 失敗: {e}")
-                continue
+    elif len(sys.argv) > 1 and sys.argv[1] == "fill-gaps-114":
+        # 補爬114年所有缺失序號（區間由序號狀態索引產生）
+        crawler = OptimizedCrawler()
         
+        print("🔧 補爬114年缺失序號")
+        print("=" * 70)
+        crawler.fill_gaps([114])
         print("\n🎉 114年補爬完成！")
         
     elif len(sys.argv) > 1 and sys.argv[1] == "fill-gaps":
+        # 補爬: fill-gaps [年份...]，預設為所有已記錄的年度
         crawler = OptimizedCrawler()
         
         print("🔧 補爬漏掉的資料")
         print("=" * 70)
-        
-        # 需要補爬的區間
-        gaps = [
-            (114, 1, 99),      # 114年 1-99
-            (114, 346, 360),   # 114年 346-360  
-            (114, 391, 400),   # 114年 391-400
-        ]
-        
-        print("📋 補爬計畫:")
-        total_to_fill = 0
-        for year, start, end in gaps:
-            count = end - start + 1
-            total_to_fill += count
-            print(f"   {year}年: {start:05d}-{end:05d} ({count} 筆)")
-        
-        print(f"📊 總計需補爬: {total_to_fill} 筆")
-        print("=" * 70)
-        
-        # 依序補爬各區間
-        for year, start_seq, end_seq in gaps:
-            try:
-                print(f"\n🔍 補爬 {year}年 {start_seq:05d}-{end_seq:05d}...")
-                crawler.crawl_year_range(year, start_seq, end_seq, False)
-                print(f"✅ 區間 {start_seq:05d}-{end_seq:05d} 完成")
-            except KeyboardInterrupt:
-                print(f"\n🛑 用戶中斷")
-                break
-            except Exception as e:
-                print(f"❌ 補爬失敗: {e}")
-                crawler.save_progress()
-                continue
-        
+        crawler.fill_gaps([int(y) for y in sys.argv[2:]] or None)
         print("\n🎉 補爬任務完成！")
+    elif len(sys.argv) > 1 and sys.argv[1] == "resume":
+        # 中斷後由爬取日誌精確續爬
+        crawler = OptimizedCrawler()
+        crawler.resume()
+    elif len(sys.argv) > 1 and sys.argv[1] == "work":
+        # 工作佇列 worker: work [worker名稱] [佇列檔]，可在多個行程/機器同時執行
+        from work_queue import WorkQueue, QueueWorker, open_backend, DEFAULT_PATH
+        crawler = OptimizedCrawler()
+        queue = WorkQueue(open_backend(sys.argv[3] if len(sys.argv) > 3 else DEFAULT_PATH))
+        QueueWorker(crawler, queue, sys.argv[2] if len(sys.argv) > 2 else None).run()
+    elif len(sys.argv) > 1 and sys.argv[1] == "retry":
+        # 重試佇列中已到期的失敗序號: retry [最多筆數]
+        crawler = OptimizedCrawler()
+        crawler.recover()
+        crawler.retry_due(int(sys.argv[2]) if len(sys.argv) > 2 else 200)
+        crawler.publish()
+        crawler.print_final_stats()
+    elif len(sys.argv) > 1 and sys.argv[1] in ("recrawl", "recrawl-plan"):
+        # 重爬不完整資料: recrawl [最多筆數]；recrawl-plan [筆數] 只列出排程
+        crawler = OptimizedCrawler()
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        if sys.argv[1] == "recrawl-plan":
+            crawler.recrawl_incomplete(limit if limit is not None else 50, dry_run=True)
+        else:
+            crawler.recover()
+            crawler.recrawl_incomplete(limit)
+            crawler.publish()
+            crawler.print_final_stats()
+    elif len(sys.argv) > 1 and sys.argv[1] == "seed-state":
+        # 由現有資料集建立序號狀態索引
+        crawler = OptimizedCrawler()
+        crawler.seed_sequence_state()
+    elif len(sys.argv) > 1 and sys.argv[1] == "compact":
+        # 只把待合併的 segment 壓實成 permits.json
+        crawler = OptimizedCrawler()
+        print("🗜️ 壓實待合併資料")
+        if crawler.publish():
+            print("✅ 壓實完成")
+        else:
+            print("❌ 壓實失敗")
+    elif len(sys.argv) > 1 and sys.argv[1] == "retag":
+        # 公司清單換版後，只重新比對標記版本過期的建照並重新發佈
+        crawler = OptimizedCrawler()
+        print("🏷️ 更新寶佳標記")
+        crawler.baojia_filter.refresh_companies(force=True)
+        if crawler.publish(retag=True):
+            print("✅ 寶佳標記更新完成")
+        else:
+            print("❌ 寶佳標記更新失敗")
     else:
         main()
\ No newline at end of file
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存檔頁面共用字典壓縮 - 以樣本頁面訓練字典，每頁以同一字典壓縮
+取代每頁各自 zlib 壓縮的作法（建照頁面幾乎都是相同的版面、表格與 script，
+每頁只有幾百位元組不同，各自壓縮仍要 3KB 以上，而且大部分是重複的版面）：
+1. 由樣本頁面建立字典：安裝 zstandard 時以 zstd 訓練字典，否則取多數頁面共同出現的片段作為 zlib 預設字典 (zdict)
+2. 字典以內容雜湊命名，上傳後不再修改 (<prefix>dicts/<id>.dict)；<prefix>dicts/current.json 指向寫入端使用的版本，
+   重新訓練只是新增一個版本，舊 segment 照樣以其記錄的字典版本解壓
+3. 讀取端依 segment 記錄的字典版本下載並快取在本機，解壓對讀取端、重新解析透明
+4. 每頁仍各自壓縮，單頁可以獨立解壓（segment 的範圍讀取不受影響）
+
+使用方式:
+    python page_codec.py train [樣本數] [zstd|zlib]   # 以已存檔頁面訓練新版本字典並設為目前版本
+    python page_codec.py show                          # 目前版本與本機快取的版本
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import zlib
+from collections import Counter
+from datetime import datetime
+
+from object_storage import PreconditionFailed
+
+try:
+    import zstandard
+except ImportError:  # 沒有安裝 zstandard 時以 zlib 預設字典壓縮
+    zstandard = None
+
+PLAIN = 'zlib'
+ZLIB_DICT = 'zlib-dict'
+ZSTD_DICT = 'zstd-dict'
+DEFAULT_DICT_CODEC = ZSTD_DICT if zstandard is not None else ZLIB_DICT
+DEFAULT_CACHE_DIR = 'html-archive-dicts'
+ZLIB_WINDOW = 32 * 1024  # zlib 只用得到字典最後 32KB
+ZSTD_DICT_SIZE = 64 * 1024
+ZSTD_LEVEL = 10
+MIN_SAMPLES = 5
+
+_PIECE = re.compile(rb'[^>\n]*[>\n]|[^>\n]+$')
+
+
+class PageCodec:
+    """單頁壓縮 / 解壓（執行緒安全）
+
+    Args:
+        codec: PLAIN、ZLIB_DICT 或 ZSTD_DICT
+        data: 字典內容（PLAIN 為 None）
+        dict_id: 字典版本，預設由格式與內容雜湊產生
+    """
+
+    def __init__(self, codec=PLAIN, data=None, dict_id=None):
+        if codec == ZSTD_DICT and zstandard is None:
+            raise ImportError("需要安裝 zstandard (pip install zstandard)")
+        if codec not in (PLAIN, ZLIB_DICT, ZSTD_DICT):
+            raise ValueError(f"不支援的壓縮格式: {codec}")
+        self.codec = codec
+        self.data = data
+        self.dict_id = dict_id or (f"{codec}-{hashlib.sha1(data).hexdigest()[:12]}" if data else None)
+        self._zstd_dict = zstandard.ZstdCompressionDict(data) if codec == ZSTD_DICT else None
+        self._local = threading.local()  # zstd 壓縮器不能跨執行緒共用
+
+    def compress(self, html):
+        raw = html.encode('utf-8')
+        if self.codec == ZSTD_DICT:
+            if not hasattr(self._local, 'compressor'):
+                self._local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=self._zstd_dict)
+            return self._local.compressor.compress(raw)
+        if self.codec == ZLIB_DICT:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY, self.data)
+            return compressor.compress(raw) + compressor.flush()
+        return zlib.compress(raw, 6)
+
+    def decompress(self, raw):
+        if self.codec == ZSTD_DICT:
+            if not hasattr(self._local, 'decompressor'):
+                self._local.decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dict)
+            return self._local.decompressor.decompress(raw).decode('utf-8')
+        if self.codec == ZLIB_DICT:
+            decompressor = zlib.decompressobj(zdict=self.data)
+            return (decompressor.decompress(raw) + decompressor.flush()).decode('utf-8')
+        return zlib.decompress(raw).decode('utf-8')
+
+
+def _common_content(samples, size):
+    """樣本中半數以上頁面都出現的片段（以 > 與換行切開），依第一頁的順序串接，保留最後 size 位元組"""
+    freq = Counter()
+    for raw in samples:
+        freq.update(set(_PIECE.findall(raw)))
+    threshold = len(samples) / 2
+    common = b''.join(piece for piece in _PIECE.findall(samples[0]) if freq[piece] >= threshold)
+    return common[-size:]
+
+
+def train_dictionary(pages, codec=None):
+    """由樣本頁面（str）建立字典"""
+    codec = codec or DEFAULT_DICT_CODEC
+    samples = [page.encode('utf-8') for page in pages]
+    if codec == ZSTD_DICT:
+        try:
+            data = zstandard.train_dictionary(ZSTD_DICT_SIZE, samples).as_bytes()
+        except zstandard.ZstdError:  # 樣本太少無法訓練時，以共同片段作為原始內容字典
+            data = _common_content(samples, ZSTD_DICT_SIZE)
+        return PageCodec(ZSTD_DICT, data)
+    return PageCodec(ZLIB_DICT, _common_content(samples, ZLIB_WINDOW))
+
+
+class DictionaryStore:
+    """字典版本的上傳與讀取（本機快取，字典內容不會改變）
+
+    Args:
+        storage: 物件儲存
+        prefix: 存檔物件的前綴（字典在 <prefix>dicts/）
+        cache_dir: 本機快取目錄
+    """
+
+    def __init__(self, storage, prefix, cache_dir=DEFAULT_CACHE_DIR):
+        self.storage = storage
+        self.prefix = prefix
+        self.cache_dir = cache_dir
+        self._codecs = {None: PageCodec()}
+        self._lock = threading.Lock()
+
+    def _object(self, dict_id):
+        return f"{self.prefix}dicts/{dict_id}.dict"
+
+    def load(self, dict_id):
+        """取得字典版本的 PageCodec；dict_id 為 None 表示不使用字典"""
+        with self._lock:
+            if dict_id in self._codecs:
+                return self._codecs[dict_id]
+            path = os.path.join(self.cache_dir, f"{dict_id}.dict")
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    data = f.read()
+            else:
+                data = self.storage.get_bytes(self._object(dict_id))
+                if data is None:
+                    raise KeyError(f"找不到字典 {dict_id}")
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(data)
+                os.replace(path + '.tmp', path)
+            codec = PageCodec(dict_id.rsplit('-', 1)[0], data, dict_id)
+            self._codecs[dict_id] = codec
+            return codec
+
+    def current(self):
+        """寫入端目前使用的字典；沒有設定或本機無法使用該格式時回傳 None"""
+        pointer = self.storage.get_json(f"{self.prefix}dicts/current.json")
+        if not pointer:
+            return None
+        try:
+            return self.load(pointer['id'])
+        except (ImportError, KeyError) as e:
+            print(f"⚠️ 無法使用目前的字典 {pointer['id']}: {e}")
+            return None
+
+    def publish(self, codec, samples=0, make_current=False):
+        """上傳字典；make_current 時設為目前版本，否則只在還沒有目前版本時設定。上傳成功回傳 True"""
+        if not self.storage.put_bytes(self._object(codec.dict_id), codec.data, 'application/octet-stream'):
+            return False
+        with self._lock:
+            self._codecs[codec.dict_id] = codec
+        pointer = {'id': codec.dict_id, 'codec': codec.codec, 'size': len(codec.data),
+                   'samples': samples, 'created': datetime.now().isoformat()}
+        try:
+            self.storage.put_json(f"{self.prefix}dicts/current.json", pointer,
+                                  **({} if make_current else {'if_none_match': '*'}))
+        except PreconditionFailed:
+            pass  # 其他寫入端已先設定目前版本；本版本仍可由記錄它的 segment 使用
+        return True
+
+
+if __name__ == "__main__":
+    from object_storage import open_storage
+    from html_archive import DEFAULT_PREFIX, HtmlArchive
+    import random
+
+    storage = open_storage()
+    dictionaries = DictionaryStore(storage, DEFAULT_PREFIX)
+    if len(sys.argv) > 1 and sys.argv[1] == "train":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+        codec = {'zstd': ZSTD_DICT, 'zlib': ZLIB_DICT}.get(sys.argv[3] if len(sys.argv) > 3 else '', None)
+        archive = HtmlArchive(storage)
+        archive.refresh()
+        keys = archive.keys()
+        pages = [p for p in (archive.read(k) for k in random.sample(keys, min(count, len(keys)))) if p]
+        if len(pages) < MIN_SAMPLES:
+            print(f"❌ 存檔頁面不足 ({len(pages)} 頁)")
+            sys.exit(1)
+        trained = train_dictionary(pages, codec)
+        raw = sum(len(p.encode('utf-8')) for p in pages)
+        packed = sum(len(trained.compress(p)) for p in pages)
+        if dictionaries.publish(trained, samples=len(pages), make_current=True):
+            print(f"✅ 字典 {trained.dict_id} ({len(trained.data):,} bytes, {len(pages)} 頁樣本)，"
+                  f"平均每頁 {raw / len(pages) / 1024:.1f}KB → {packed / len(pages) / 1024:.2f}KB")
+        else:
+            print("❌ 字典上傳失敗")
+    elif len(sys.argv) > 1 and sys.argv[1] == "show":
+        pointer = storage.get_json(f"{DEFAULT_PREFIX}dicts/current.json")
+        print(f"📖 目前版本: {json.dumps(pointer, ensure_ascii=False) if pointer else '（未設定）'}")
+        if os.path.isdir(DEFAULT_CACHE_DIR):
+            for name in sorted(os.listdir(DEFAULT_CACHE_DIR)):
+                print(f"   {name} ({os.path.getsize(os.path.join(DEFAULT_CACHE_DIR, name)):,} bytes)")
+    else:
+        print(__doc__)
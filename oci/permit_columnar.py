@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+建照資料欄式快照 (Arrow IPC)
+與 permits.json 並存，由同一份資料產生：
+1. 每個欄位只存一次，不再重複 key；相容用的別名欄位 (floors/buildings/units) 不落地，載入時再補回
+2. 重複度高的字串（起造人、行政區、日期）以 dictionary 編碼
+3. 未壓縮的 IPC 檔可 memory-map，只讀取需要的欄位
+
+使用方式:
+    python permit_columnar.py export data/permits.json data/permits.arrow
+    python permit_columnar.py bench data/permits.json data/permits.arrow
+"""
+
+import json
+import sys
+import time
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# 欄位名稱 -> 型別代碼；其餘欄位收進 extra (JSON 字串)
+FIELDS = [
+    ('indexKey', 'str'),
+    ('permitNumber', 'str'),
+    ('permitYear', 'int16'),
+    ('permitType', 'int8'),
+    ('sequenceNumber', 'int32'),
+    ('versionNumber', 'int8'),
+    ('applicantName', 'dict'),
+    ('siteAddress', 'str'),
+    ('district', 'dict'),
+    ('floorInfo', 'dict'),
+    ('floorsAbove', 'int16'),
+    ('floorsBelow', 'int16'),
+    ('blockCount', 'int16'),
+    ('buildingCount', 'int16'),
+    ('unitCount', 'int32'),
+    ('totalFloorArea', 'float64'),
+    ('issueDate', 'dict'),
+    ('issueDateROC', 'dict'),
+    ('crawledAt', 'str'),
+]
+EXTRA_COLUMN = 'extra'
+
+# 相容舊欄位名稱: 別名 -> 正式欄位
+ALIASES = {
+    'floors': 'floorsAbove',
+    'buildings': 'buildingCount',
+    'units': 'unitCount',
+}
+
+ARROW_NAME = "data/permits.arrow"
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("需要 pyarrow 才能使用欄式快照: pip install pyarrow")
+
+
+def _arrow_type(code):
+    if code == 'str':
+        return pa.string()
+    if code == 'dict':
+        return pa.dictionary(pa.int32(), pa.string())
+    return getattr(pa, code)()
+
+
+def schema():
+    _require_pyarrow()
+    fields = [pa.field(name, _arrow_type(code)) for name, code in FIELDS]
+    fields.append(pa.field(EXTRA_COLUMN, pa.string()))
+    return pa.schema(fields)
+
+
+def permits_to_table(permits):
+    """把 permit dict 清單轉成 Arrow Table"""
+    _require_pyarrow()
+    known = {name for name, _ in FIELDS} | set(ALIASES)
+    columns = {name: [] for name, _ in FIELDS}
+    extra = []
+
+    for permit in permits:
+        for name, _ in FIELDS:
+            value = permit.get(name)
+            if value is None:
+                # 舊資料可能只有別名欄位
+                for alias, canonical in ALIASES.items():
+                    if canonical == name and permit.get(alias) is not None:
+                        value = permit[alias]
+                        break
+            columns[name].append(value)
+        rest = {k: v for k, v in permit.items() if k not in known}
+        extra.append(json.dumps(rest, ensure_ascii=False) if rest else None)
+
+    arrays = []
+    for name, code in FIELDS:
+        values = columns[name]
+        if code == 'dict':
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, _arrow_type(code)))
+    arrays.append(pa.array(extra, pa.string()))
+    return pa.Table.from_arrays(arrays, schema=schema())
+
+
+def to_ipc_bytes(permits):
+    """序列化成 Arrow IPC 檔案格式（供上傳物件儲存）"""
+    table = permits_to_table(permits)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def write_snapshot(permits, path):
+    with open(path, 'wb') as f:
+        f.write(to_ipc_bytes(permits))
+
+
+def load_table(path, columns=None):
+    """memory-map 讀取快照，只投影需要的欄位（未選取的欄位不會被讀入記憶體）"""
+    _require_pyarrow()
+    source = pa.memory_map(path, 'r')
+    table = pa.ipc.open_file(source).read_all()
+    if columns:
+        wanted = []
+        for name in columns:
+            name = ALIASES.get(name, name)
+            if name in table.column_names and name not in wanted:
+                wanted.append(name)
+        table = table.select(wanted)
+    return table
+
+
+def load_permits(path, columns=None, with_aliases=True):
+    """載入成與 permits.json 相同結構的 dict 清單"""
+    table = load_table(path, columns)
+    permits = []
+    for row in table.to_pylist():
+        extra = row.pop(EXTRA_COLUMN, None)
+        permit = {k: v for k, v in row.items() if v is not None}
+        if extra:
+            permit.update(json.loads(extra))
+        if with_aliases:
+            for alias, canonical in ALIASES.items():
+                if canonical in permit and (not columns or alias in columns or canonical in columns):
+                    permit[alias] = permit[canonical]
+        permits.append(permit)
+    return permits
+
+
+def _load_json_permits(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['permits'] if isinstance(data, dict) else data
+
+
+def bench(json_path, arrow_path, columns=('permitYear', 'applicantName', 'totalFloorArea')):
+    """比較 JSON 與欄式快照的載入時間"""
+    import os
+    import tracemalloc
+
+    def measure(func):
+        # Arrow 緩衝區不經過 Python 配置器，另外加上 pyarrow 的配置量
+        arrow_before = pa.total_allocated_bytes()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, elapsed, peak + pa.total_allocated_bytes() - arrow_before
+
+    permits, t_json, m_json = measure(lambda: _load_json_permits(json_path))
+    table, t_arrow, m_arrow = measure(lambda: load_table(arrow_path, list(columns)))
+
+    print(f"📦 檔案大小: JSON {os.path.getsize(json_path) / 1024:.0f} KB, "
+          f"Arrow {os.path.getsize(arrow_path) / 1024:.0f} KB")
+    print(f"⏱️ JSON 全量載入: {t_json * 1000:.1f} ms, 峰值記憶體 {m_json / 1024 / 1024:.1f} MB ({len(permits)} 筆)")
+    print(f"⏱️ Arrow 投影 {len(columns)} 欄: {t_arrow * 1000:.1f} ms, 峰值記憶體 {m_arrow / 1024 / 1024:.1f} MB ({table.num_rows} 筆)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "export":
+        permits = _load_json_permits(sys.argv[2])
+        write_snapshot(permits, sys.argv[3])
+        print(f"✅ 已匯出 {len(permits)} 筆到 {sys.argv[3]}")
+    elif len(sys.argv) == 4 and sys.argv[1] == "bench":
+        bench(sys.argv[2], sys.argv[3])
+    else:
+        print(__doc__)
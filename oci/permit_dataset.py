@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+建照資料集記憶體快取 - API 行程共用
+取代每個 HTTP 請求都呼叫 oci CLI 下載 permits.json 的作法：
+1. 資料只在 ETag/Last-Modified 改變時才重新下載
+2. 背景執行緒定期重新驗證，請求一律由記憶體回應
+3. 新版本解析完成後才整個替換（原子交換），讀取端不會看到半套資料
+4. 物件儲存故障時繼續提供舊資料 (stale-while-revalidate)
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+
+from object_storage import open_storage
+from permit_store import SNAPSHOT_NAME
+
+
+class DatasetSnapshot:
+    """某一版本的資料集，載入後不再修改"""
+
+    def __init__(self, data, etag=None, last_modified=None):
+        self.data = data
+        self.permits = data.get('permits', [])
+        self.etag = etag
+        self.last_modified = last_modified
+        self.loaded_at = datetime.now().isoformat()
+
+    @property
+    def last_updated(self):
+        return self.data.get('lastUpdated') or self.data.get('lastUpdate', '')
+
+
+class PermitDataset:
+    def __init__(self, storage=None, object_name=SNAPSHOT_NAME, refresh_interval=60):
+        self.storage = storage or open_storage()
+        self.object_name = object_name
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._load_lock = threading.Lock()
+        self._listeners = []
+        self._thread = None
+        self.last_error = None
+        self.last_checked = None
+
+    def on_change(self, callback):
+        """註冊資料版本更新時的回呼 callback(snapshot)"""
+        self._listeners.append(callback)
+
+    def get(self):
+        """取得目前的資料集；第一次呼叫時同步載入"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self.refresh()
+                snapshot = self._snapshot
+            if snapshot is None:
+                raise RuntimeError(f'無法載入建照資料: {self.last_error}')
+        return snapshot
+
+    def refresh(self):
+        """重新驗證並在版本改變時載入新資料
+
+        Returns:
+            bool: 是否換上新版本
+        """
+        self.last_checked = datetime.now().isoformat()
+        current = self._snapshot
+        try:
+            meta = self.storage.head(self.object_name) or {}
+            etag = meta.get('etag')
+            last_modified = meta.get('last-modified')
+
+            if current is not None and etag and etag == current.etag:
+                self.last_error = None
+                return False
+
+            raw = self.storage.get_bytes(self.object_name)
+            if raw is None:
+                raise RuntimeError(f'下載 {self.object_name} 失敗')
+            snapshot = DatasetSnapshot(json.loads(raw.decode('utf-8')), etag, last_modified)
+        except Exception as e:
+            # 保留舊資料繼續服務
+            self.last_error = str(e)
+            print(f"⚠️ 資料集更新失敗，沿用快取: {e}")
+            return False
+
+        self._snapshot = snapshot  # 原子交換
+        self.last_error = None
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"⚠️ 資料集更新回呼失敗: {e}")
+        return True
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            self.refresh()
+
+    def start(self):
+        """啟動背景重新驗證執行緒"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name='dataset-refresh', daemon=True)
+            self._thread.start()
+        return self
+
+    def status(self):
+        snapshot = self._snapshot
+        return {
+            'loaded': snapshot is not None,
+            'etag': snapshot.etag if snapshot else None,
+            'loadedAt': snapshot.loaded_at if snapshot else None,
+            'lastChecked': self.last_checked,
+            'lastError': self.last_error,
+            'permitCount': len(snapshot.permits) if snapshot else 0,
+        }
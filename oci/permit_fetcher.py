@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+建照頁面抓取器 - 行程內 HTTP 連線池版本
+取代每筆建照兩次 wget 子行程 + cookie/暫存檔的作法：
+1. requests.Session 保持 keep-alive 連線，TCP/TLS 只握手一次
+2. cookie 留在記憶體，不再寫入 /tmp
+3. 「第一次建立session、第二次取得資料」的兩段式流程只在 session 尚未暖機時執行；
+   已暖機的 session 跨 INDEX_KEY 重用，每筆只需一次請求，頁面格式錯誤時才重新暖機
+4. 每次請求前向節奏控制 (crawl_pacer.AIMDPacer) 取得發送時間，並回報結果與回應時間
+5. 頁面種類（有資料 / 查無資料 / 格式錯誤）直接比對原始位元組判斷，不必先解碼；
+   fetch_page 回傳原始位元組，解碼與解析可交給其他行程 (crawl_pipeline)
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import crawl_pacer
+
+BASE_URL = "https://mcgbm.taichung.gov.tw/bupic/pages/queryInfoAction.do"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+NO_DATA = "NO_DATA"  # 特殊標記表示此序號無資料
+
+
+WRONG_FORMAT = "WRONG_FORMAT"  # 內部使用：回應不是建照頁面（session 未暖機或已失效）
+
+# 頁面標記的位元組形式（網站為 Big5，解碼失敗時退回 UTF-8，兩種都比對）
+NO_DATA_MARKERS = tuple("查無任何資訊".encode(enc) for enc in ('big5', 'utf-8'))
+PERMIT_MARKERS = tuple("建造執照號碼".encode(enc) for enc in ('big5', 'utf-8'))
+
+
+class WarmSession:
+    """一個 cookie jar 與其暖機狀態"""
+
+    def __init__(self, pool_size=4):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Connection': 'keep-alive',
+        })
+        self.warm = False
+        self.served = 0  # 暖機後以單次請求取得的頁數
+
+    def close(self):
+        self.session.close()
+
+
+class SessionPool:
+    """可跨執行緒共用的 session 池，優先借出已暖機的 session（同一時間只借給一個請求）"""
+
+    def __init__(self, size=1, pool_size=4):
+        self._idle = [WarmSession(pool_size) for _ in range(size)]
+        self._all = list(self._idle)
+        self._cond = threading.Condition()
+        self.stats = {'single': 0, 'handshakes': 0, 'rewarms': 0, 'no_data_checks': 0}
+
+    def checkout(self):
+        with self._cond:
+            while not self._idle:
+                self._cond.wait()
+            # 已暖機的排在後面，pop() 優先取用
+            return self._idle.pop()
+
+    def checkin(self, entry):
+        with self._cond:
+            if entry.warm:
+                self._idle.append(entry)
+            else:
+                self._idle.insert(0, entry)
+            self._cond.notify()
+
+    def count(self, name):
+        with self._cond:
+            self.stats[name] += 1
+
+    def summary(self):
+        with self._cond:
+            stats = dict(self.stats)
+        stats['warmSessions'] = sum(1 for e in self._all if e.warm)
+        stats['maxServed'] = max((e.served for e in self._all), default=0)
+        return stats
+
+    def close(self):
+        for entry in self._all:
+            entry.close()
+
+
+class PermitFetcher:
+    def __init__(self, base_url=BASE_URL, timeout=20, request_delay=0.8, pool_size=4, pacer=None,
+                 sessions=1, verify_no_data=True):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.request_delay = request_delay  # 兩段式流程兩次請求之間的間隔
+        self.pacer = pacer  # 共用的請求節奏控制 (acquire / record)，None 表示不限速
+        # 暖機 session 回報查無資料時，以完整兩段式流程再確認一次，避免誤觸自動停止
+        self.verify_no_data = verify_no_data
+        self.pool = SessionPool(sessions, pool_size)
+
+    @staticmethod
+    def decode_page(content):
+        """Big5 解碼，失敗時退回 UTF-8"""
+        try:
+            return content.decode('big5')
+        except UnicodeDecodeError:
+            return content.decode('utf-8', errors='ignore')
+
+    def _classify(self, content):
+        """判斷回應內容：原始頁面位元組、NO_DATA、WRONG_FORMAT，或 None（請求失敗）"""
+        if content is None:
+            return None
+
+        # 快速檢查內容大小
+        if len(content) < 1000:
+            return WRONG_FORMAT
+
+        # 快速檢查是否有資料
+        if any(marker in content for marker in NO_DATA_MARKERS):
+            return NO_DATA
+
+        if not any(marker in content for marker in PERMIT_MARKERS):
+            return WRONG_FORMAT
+
+        return content
+
+    def _record(self, outcome, started):
+        if self.pacer:
+            self.pacer.record(outcome, time.monotonic() - started)
+
+    def _request(self, session, index_key, probe=False):
+        """單次 GET 並判斷內容，結果回報給節奏控制
+
+        probe: 兩段式流程的第一次請求，只用來建立 session，回傳原始位元組（失敗為 None）
+        """
+        if self.pacer:
+            self.pacer.acquire()
+        started = time.monotonic()
+        try:
+            response = session.get(
+                self.base_url,
+                params={'INDEX_KEY': index_key},
+                timeout=self.timeout
+            )
+        except requests.Timeout:
+            self._record(crawl_pacer.TIMEOUT, started)
+            raise
+        except requests.RequestException:
+            self._record(crawl_pacer.ERROR, started)
+            raise
+        if response.status_code != 200:
+            self._record(crawl_pacer.ERROR, started)
+            return None
+        if probe:
+            self._record(crawl_pacer.OK, started)
+            return response.content
+
+        result = self._classify(response.content)
+        if result == NO_DATA:
+            self._record(crawl_pacer.NO_DATA, started)
+        elif result == WRONG_FORMAT:
+            self._record(crawl_pacer.WRONG_FORMAT, started)
+        else:
+            self._record(crawl_pacer.OK, started)
+        return result
+
+    def _handshake(self, entry, index_key):
+        """兩段式流程：乾淨的 cookie，第一次訪問建立 session，第二次取得資料"""
+        self.pool.count('handshakes')
+        entry.session.cookies.clear()
+        entry.warm = False
+
+        # 第一次訪問 - 建立session
+        if self._request(entry.session, index_key, probe=True) is None:
+            return None
+
+        # 短暫延遲
+        if self.request_delay > 0:
+            time.sleep(self.request_delay)
+
+        # 第二次訪問 - 取得資料
+        result = self._request(entry.session, index_key)
+        if result is not None and result != WRONG_FORMAT:
+            entry.warm = True
+            entry.served = 0
+        return result
+
+    def _fetch(self, entry, index_key):
+        if entry.warm:
+            result = self._request(entry.session, index_key)
+            if result is None:
+                return None
+            if result == NO_DATA and self.verify_no_data:
+                self.pool.count('no_data_checks')
+                return self._handshake(entry, index_key)
+            if result != WRONG_FORMAT:
+                entry.served += 1
+                self.pool.count('single')
+                return result
+            # 格式錯誤：session 已失效，重新暖機
+            self.pool.count('rewarms')
+        return self._handshake(entry, index_key)
+
+    def fetch_html(self, index_key):
+        """取得建照頁面
+
+        Returns:
+            str: 有效的建照頁面 HTML
+            NO_DATA: 此序號查無資料
+            None: 連線失敗或頁面格式錯誤
+        """
+        page = self.fetch_page(index_key)
+        if isinstance(page, bytes):
+            return self.decode_page(page)
+        return page
+
+    def fetch_page(self, index_key):
+        """取得建照頁面的原始位元組（未解碼），其餘回傳值同 fetch_html"""
+        entry = self.pool.checkout()
+        try:
+            result = self._fetch(entry, index_key)
+        except requests.Timeout:
+            print(f"⏰ 超時 {index_key}")
+            return None
+        except requests.RequestException as e:
+            print(f"❌ 錯誤 {index_key}: {e}")
+            return None
+        finally:
+            self.pool.checkin(entry)
+
+        if result == WRONG_FORMAT:
+            return None
+        return result
+
+    def close(self):
+        self.pool.close()
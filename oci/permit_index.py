@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+建照資料倒排索引與查詢引擎
+取代 /api/permits/search 每次線性掃描全部建照的作法：
+1. 文字欄位 (建照號碼、起造人、地址、行政區) 以字元 unigram/bigram 建立倒排索引，
+   中文不需斷詞即可做子字串查詢：先取 n-gram posting 交集，再驗證候選
+2. 數值欄位 (樓層、戶數、總樓地板面積) 與發照日期以排序陣列做範圍查詢
+3. 行政區、年份、寶佳與否可做 facet 統計
+4. 資料集更新時只對新增/變更/刪除的建照增量更新
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+TEXT_FIELDS = ['permitNumber', 'applicantName', 'siteAddress', 'district']
+
+# 查詢參數名稱 -> (資料欄位（含舊別名作為備援）, 型別)
+RANGE_FIELDS = {
+    'floors': (('floorsAbove', 'floors'), float),
+    'units': (('unitCount', 'units'), float),
+    'area': (('totalFloorArea',), float),
+    'issueDate': (('issueDate',), str),
+    'year': (('permitYear',), float),
+}
+
+FACET_FIELDS = ['district', 'permitYear']
+
+
+def ngrams(text):
+    """字元 unigram + bigram"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _range_value(permit, name):
+    """取出範圍欄位的值並統一型別，無法轉換時視為缺值"""
+    fields, kind = RANGE_FIELDS[name]
+    for field in fields:
+        value = permit.get(field)
+        if value is not None and value != '':
+            try:
+                return kind(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class PermitIndex:
+    def __init__(self, is_baojia=None):
+        self.is_baojia = is_baojia  # 判斷建照是否為寶佳機構的函式 (permit -> bool)
+        self.docs = {}  # indexKey -> permit
+        self.texts = {}  # indexKey -> 小寫的可搜尋文字
+        self.postings = {}  # n-gram -> set(indexKey)
+        self.ranges = {name: [] for name in RANGE_FIELDS}  # name -> 排序的 (value, indexKey)
+        self.facets = {name: {} for name in FACET_FIELDS}  # field -> value -> set(indexKey)
+        self.baojia_keys = set()
+        self.order = []  # 預設排序（年份、序號由新到舊）的 indexKey
+        self._order_dirty = False
+        self._lock = threading.RLock()  # 背景更新與查詢可能在不同執行緒
+
+    # ---- 建立與增量更新 ----
+
+    def build(self, permits):
+        """依資料集內容增量更新，只處理有差異的建照
+
+        Returns:
+            (新增數, 更新數, 刪除數)
+        """
+        with self._lock:
+            return self._build(permits)
+
+    def _build(self, permits):
+        incoming = {}
+        for permit in permits:
+            index_key = permit.get('indexKey')
+            if index_key:
+                incoming[index_key] = permit
+
+        removed = [k for k in self.docs if k not in incoming]
+        for index_key in removed:
+            self._remove(index_key)
+
+        added = updated = 0
+        for index_key, permit in incoming.items():
+            old = self.docs.get(index_key)
+            if old is None:
+                self._add(index_key, permit)
+                added += 1
+            elif old is not permit and old != permit:
+                self._remove(index_key)
+                self._add(index_key, permit)
+                updated += 1
+            else:
+                self.docs[index_key] = permit
+
+        if added or updated or removed:
+            self._order_dirty = True
+        return added, updated, len(removed)
+
+    def _add(self, index_key, permit):
+        self.docs[index_key] = permit
+        text = ' '.join(str(permit.get(f) or '') for f in TEXT_FIELDS).lower()
+        self.texts[index_key] = text
+        for gram in ngrams(text):
+            self.postings.setdefault(gram, set()).add(index_key)
+        for name in RANGE_FIELDS:
+            value = _range_value(permit, name)
+            if value is not None:
+                insort(self.ranges[name], (value, index_key))
+        for field in FACET_FIELDS:
+            value = permit.get(field)
+            if value is not None:
+                self.facets[field].setdefault(value, set()).add(index_key)
+        if self.is_baojia and self.is_baojia(permit):
+            self.baojia_keys.add(index_key)
+
+    def _remove(self, index_key):
+        permit = self.docs.pop(index_key)
+        text = self.texts.pop(index_key)
+        for gram in ngrams(text):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(index_key)
+                if not keys:
+                    del self.postings[gram]
+        for name in RANGE_FIELDS:
+            value = _range_value(permit, name)
+            if value is not None:
+                entries = self.ranges[name]
+                pos = bisect_left(entries, (value, index_key))
+                if pos < len(entries) and entries[pos] == (value, index_key):
+                    del entries[pos]
+        for field in FACET_FIELDS:
+            value = permit.get(field)
+            keys = self.facets[field].get(value)
+            if keys is not None:
+                keys.discard(index_key)
+                if not keys:
+                    del self.facets[field][value]
+        self.baojia_keys.discard(index_key)
+
+    def retag_baojia(self):
+        """公司清單變更後重新計算寶佳標記"""
+        if not self.is_baojia:
+            return
+        with self._lock:
+            self.baojia_keys = {
+                k for k, p in self.docs.items() if self.is_baojia(p)
+            }
+
+    def update_baojia(self, flags):
+        """只更新寶佳標記改變的建照 {indexKey: bool}"""
+        with self._lock:
+            for index_key, is_baojia in flags.items():
+                if index_key not in self.docs:
+                    continue
+                if is_baojia:
+                    self.baojia_keys.add(index_key)
+                else:
+                    self.baojia_keys.discard(index_key)
+
+    def _sort_key(self, index_key):
+        permit = self.docs[index_key]
+        return (-permit.get('permitYear', 0), -permit.get('sequenceNumber', 0))
+
+    def _sorted_keys(self):
+        if self._order_dirty:
+            self.order = sorted(self.docs, key=self._sort_key)
+            self._order_dirty = False
+        return self.order
+
+    # ---- 查詢 ----
+
+    def match_text(self, term):
+        """子字串查詢，回傳 indexKey 集合"""
+        term = term.lower().strip()
+        if not term:
+            return None
+        grams = [term] if len(term) == 1 else [term[i:i + 2] for i in range(len(term) - 1)]
+        posting_lists = []
+        for gram in grams:
+            keys = self.postings.get(gram)
+            if not keys:
+                return set()
+            posting_lists.append(keys)
+        posting_lists.sort(key=len)
+        candidates = set(posting_lists[0])
+        for keys in posting_lists[1:]:
+            candidates &= keys
+            if not candidates:
+                return candidates
+        if len(term) <= 2:
+            return candidates
+        return {k for k in candidates if term in self.texts[k]}
+
+    def match_range(self, name, low=None, high=None):
+        kind = RANGE_FIELDS[name][1]
+        low = None if low is None else kind(low)
+        high = None if high is None else kind(high)
+        entries = self.ranges[name]
+        start = 0 if low is None else bisect_left(entries, (low,))
+        if high is None:
+            end = len(entries)
+        else:
+            # (high, '\uffff') 排在所有 value == high 的項目之後
+            end = bisect_right(entries, (high, '\uffff'))
+        return {k for _, k in entries[start:end]}
+
+    def search(self, term='', baojia_only=False, ranges=None, facet_filters=None, page=1, page_size=50):
+        """組合查詢
+
+        Args:
+            term: 子字串
+            baojia_only: 只回傳寶佳機構
+            ranges: {'floors': (min, max), 'issueDate': ('2025-01-01', None), ...}
+            facet_filters: {'district': ['西屯區', '北屯區'], 'permitYear': [114]}
+            page, page_size: 分頁（page 從 1 開始）
+        """
+        with self._lock:
+            return self._search(term, baojia_only, ranges, facet_filters, page, page_size)
+
+    def _search(self, term, baojia_only, ranges, facet_filters, page, page_size):
+        result = None
+
+        def narrow(keys):
+            nonlocal result
+            if keys is None:
+                return
+            result = set(keys) if result is None else result & keys
+
+        narrow(self.match_text(term or ''))
+        if baojia_only:
+            narrow(self.baojia_keys)
+        for name, (low, high) in (ranges or {}).items():
+            if name in self.ranges and (low is not None or high is not None):
+                narrow(self.match_range(name, low, high))
+        for field, values in (facet_filters or {}).items():
+            if field in self.facets and values:
+                if not isinstance(values, (list, tuple, set)):
+                    values = [values]
+                keys = set()
+                for value in values:
+                    keys |= self.facets[field].get(value, set())
+                narrow(keys)
+
+        ordered = self._sorted_keys()
+        if result is None:
+            matched = ordered
+        elif len(result) * 8 > len(ordered):
+            matched = [k for k in ordered if k in result]
+        else:
+            # 小結果集直接排序，不掃描整個順序表
+            matched = sorted(result, key=self._sort_key)
+
+        facet_counts = {}
+        for field in FACET_FIELDS:
+            counts = {}
+            for value, keys in self.facets[field].items():
+                n = len(keys) if result is None else len(keys & result)
+                if n:
+                    counts[value] = n
+            facet_counts[field] = counts
+        facet_counts['isBaojia'] = len(self.baojia_keys if result is None else self.baojia_keys & result)
+
+        page = max(1, int(page))
+        page_size = max(1, int(page_size))
+        start = (page - 1) * page_size
+        keys = matched[start:start + page_size]
+        return {
+            'keys': keys,
+            'permits': [dict(self.docs[k], isBaojia=k in self.baojia_keys) for k in keys],
+            'total': len(matched),
+            'page': page,
+            'pageSize': page_size,
+            'facets': facet_counts,
+        }
+
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+建照頁面解析器 - 各爬蟲共用
+取代各支爬蟲各自維護、每個欄位都對整頁做一次 .*? DOTALL 掃描的 regex 解析：
+1. 整頁只走訪一次，依文件順序取出區塊標題 (tit_01)、欄位標籤 (tit_02 ~ tit_05) 與值 (conlist)
+   預設後端 scan 以單一 regex 依 class 標記掃描（不建 DOM，實測比建樹快 5 倍以上）；
+   版面改變（值內含巢狀標籤、class 順序不同）時可改用 C 實作的樹狀 parser：
+   selectolax、lxml，皆未安裝時退回標準庫 html.parser
+2. 欄位由 FIELD_MAP 表格定義：(區塊, 標籤) -> 欄位，新增欄位只需加一列
+3. 輸出與 optimized-crawler-stable.py 原本的 parse_permit_data 相同（含相容舊欄位名稱）
+
+使用方式:
+    python permit_parser.py parse page.html [INDEX_KEY]
+    python permit_parser_bench.py <html檔或目錄>...   # 與既有解析器比較
+"""
+
+import json
+import re
+import sys
+from datetime import datetime
+from html import unescape
+from html.parser import HTMLParser
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+SECTION = 'section'
+LABEL = 'label'
+VALUE = 'value'
+
+LABEL_CLASSES = ('tit_02', 'tit_03', 'tit_04', 'tit_05')
+TOKEN_PATTERN = re.compile(r'class="(tit_0[1-5]|conlist)(?=[\s"])[^"]*"[^>]*>([^<]*)')
+SELECTOR = '.tit_01, .tit_02, .tit_03, .tit_04, .tit_05, .conlist'
+XPATH = ('//*[contains(@class, "tit_0") or '
+         'contains(concat(" ", normalize-space(@class), " "), " conlist ")]')
+
+# 欄位表: (欄位, 區塊, 標籤, 值的格式)
+# 區塊為 None 表示不限區塊（取文件中第一個該標籤）；標籤為 None 表示區塊標題後直接接的值；
+# 格式為 None 取整段文字，否則取第一個群組，不符合格式視為缺值；
+# 同一欄位可有多列，依序取第一個有值的
+FIELD_MAP = [
+    ('permitNumber', '建造執照號碼', None, re.compile(r'([1-9]\d{0,2}中[都市建]?建字第\d+號)')),
+    ('applicantName', '起造人', '姓名', None),
+    ('applicantName', '起造人', None, None),
+    ('siteAddress', None, '地號', None),
+    ('floorInfo', None, '層棟戶數', None),
+    ('totalFloorArea', None, '總樓地板面積', re.compile(r'([0-9.,]+)')),
+    ('issueDate', None, '發照日期', re.compile(r'(\d+年\d+月\d+日)')),
+]
+
+REQUIRED_FIELDS = ['permitNumber']
+
+# 層棟戶數拆解: 欄位 -> (格式, 相容舊欄位名稱)
+FLOOR_INFO_FIELDS = [
+    ('floorsAbove', re.compile(r'地上(\d+)層'), 'floors'),
+    ('floorsBelow', re.compile(r'地下(\d+)層'), None),
+    ('blockCount', re.compile(r'(\d+)幢'), None),
+    ('buildingCount', re.compile(r'(\d+)棟'), 'buildings'),
+    ('unitCount', re.compile(r'(\d+)戶'), 'units'),
+]
+
+DISTRICT_PATTERN = re.compile(r'臺中市([^區]+區)')
+ROC_DATE_PATTERN = re.compile(r'(\d+)年(\d+)月(\d+)日')
+
+
+def _kind(class_attr):
+    classes = (class_attr or '').split()
+    if 'conlist' in classes:
+        return VALUE
+    if 'tit_01' in classes:
+        return SECTION
+    if any(c in LABEL_CLASSES for c in classes):
+        return LABEL
+    return None
+
+
+SCAN_KINDS = {'conlist': VALUE, 'tit_01': SECTION}
+
+
+def _tokens_scan(html):
+    start = max(html.find('class="tableCon"'), 0)  # 資料表格之前只有頁首與樣式
+    return [
+        (SCAN_KINDS.get(cls, LABEL), (unescape(text) if '&' in text else text).strip())
+        for cls, text in TOKEN_PATTERN.findall(html, start)
+    ]
+
+
+def _tokens_selectolax(html):
+    tree = LexborHTMLParser(html)
+    for node in tree.css(SELECTOR):
+        kind = _kind(node.attributes.get('class'))
+        if kind:
+            yield kind, node.text().strip()
+
+
+def _tokens_lxml(html):
+    root = lxml.html.fromstring(html)
+    for el in root.xpath(XPATH):
+        kind = _kind(el.get('class'))
+        if kind:
+            yield kind, el.text_content().strip()
+
+
+class _TokenParser(HTMLParser):
+    """標準庫備援：收集標籤與值元素內的文字"""
+
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                 'link', 'meta', 'source', 'track', 'wbr'}
+
+    def __init__(self):
+        super().__init__()
+        self.tokens = []
+        self._kind = None
+        self._depth = 0
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID_TAGS:
+            return
+        if self._kind is not None:
+            self._depth += 1
+            return
+        kind = _kind(dict(attrs).get('class'))
+        if kind:
+            self._kind = kind
+            self._depth = 1
+            self._text = []
+
+    def handle_endtag(self, tag):
+        if self._kind is None or tag in self.VOID_TAGS:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            self.tokens.append((self._kind, ''.join(self._text).strip()))
+            self._kind = None
+
+    def handle_data(self, data):
+        if self._kind is not None:
+            self._text.append(data)
+
+
+def _tokens_stdlib(html):
+    parser = _TokenParser()
+    parser.feed(html)
+    parser.close()
+    return parser.tokens
+
+
+BACKENDS = {
+    'scan': _tokens_scan,
+    'selectolax': _tokens_selectolax if LexborHTMLParser is not None else None,
+    'lxml': _tokens_lxml if lxml is not None else None,
+    'html.parser': _tokens_stdlib,
+}
+
+
+def available_backends():
+    return [name for name, func in BACKENDS.items() if func is not None]
+
+
+DEFAULT_BACKEND = available_backends()[0]
+
+
+def extract_values(html, backend=None):
+    """單次走訪取出 {(區塊, 標籤): 值}
+
+    每個標籤只取緊接的第一個值；同一 (區塊, 標籤) 以文件中第一個非空值為準。
+    另外以 (None, 標籤) 記錄不限區塊時的第一個非空值。
+    """
+    tokens = BACKENDS[backend or DEFAULT_BACKEND](html)
+    values = {}
+    section = None
+    label = None
+    pending = False
+    for kind, text in tokens:
+        if kind == SECTION:
+            section = text.rstrip('：:').strip()
+            label = None
+            pending = True
+        elif kind == LABEL:
+            label = text
+            pending = True
+        elif pending:
+            pending = False
+            if text:
+                values.setdefault((section, label), text)
+                if label is not None:
+                    values.setdefault((None, label), text)
+    return values
+
+
+def _field_values(values):
+    fields = {}
+    for field, section, label, pattern in FIELD_MAP:
+        text = values.get((section, label))
+        if text is None or field in fields:
+            continue
+        if pattern is not None:
+            m = pattern.match(text)
+            if not m:
+                continue
+            text = m.group(1)
+        fields[field] = text.strip()
+    return fields
+
+
+def parse_permit(html_content, index_key, backend=None):
+    """解析建照頁面，缺少必要欄位時回傳 None"""
+    fields = _field_values(extract_values(html_content, backend))
+    if any(f not in fields for f in REQUIRED_FIELDS):
+        return None
+
+    permit_data = {
+        'indexKey': index_key,
+        'permitYear': int(index_key[:3]),
+        'permitType': int(index_key[3]),
+        'sequenceNumber': int(index_key[4:9]),
+        'versionNumber': int(index_key[9:11]),
+        'crawledAt': datetime.now().isoformat(),
+        'permitNumber': fields['permitNumber'],
+    }
+
+    if 'applicantName' in fields:
+        permit_data['applicantName'] = fields['applicantName']
+
+    if 'siteAddress' in fields:
+        land_text = fields['siteAddress']
+        permit_data['siteAddress'] = land_text
+        district_match = DISTRICT_PATTERN.search(land_text)
+        if district_match:
+            permit_data['district'] = district_match.group(1)
+
+    if 'floorInfo' in fields:
+        floor_info = fields['floorInfo']
+        permit_data['floorInfo'] = floor_info
+        for field, pattern, alias in FLOOR_INFO_FIELDS:
+            m = pattern.search(floor_info)
+            if m:
+                permit_data[field] = int(m.group(1))
+                if alias:
+                    permit_data[alias] = int(m.group(1))  # 相容舊欄位名稱
+
+    if 'totalFloorArea' in fields:
+        try:
+            permit_data['totalFloorArea'] = float(fields['totalFloorArea'].replace(',', ''))
+        except ValueError:
+            pass
+
+    if 'issueDate' in fields:
+        date_m = ROC_DATE_PATTERN.search(fields['issueDate'])
+        if date_m:
+            year = int(date_m.group(1))  # 民國年
+            month = int(date_m.group(2))
+            day = int(date_m.group(3))
+            permit_data['issueDate'] = f"{year + 1911:04d}-{month:02d}-{day:02d}"  # 西元年格式
+            permit_data['issueDateROC'] = f"{year:03d}/{month:02d}/{day:02d}"  # 民國年格式 114/03/03
+
+    return permit_data
+
+
+def read_page(path):
+    """讀取存檔的頁面（網站為 Big5，存檔可能已轉成 UTF-8）"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('big5', errors='ignore')
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "parse":
+        index_key = sys.argv[3] if len(sys.argv) > 3 else '11410000000'
+        result = parse_permit(read_page(sys.argv[2]), index_key)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(__doc__)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+建照頁面解析器效能與一致性比較
+以存檔的 HTML 頁面 (html/<INDEX_KEY>.html) 比較 permit_parser 各後端與既有各支爬蟲的解析器：
+1. 吞吐量：每秒可解析的頁數
+2. 欄位一致性：與 permit_parser 結果逐欄比對（相同 / 不同 / 只有一方有值）
+
+既有解析器所需套件（bs4、oci、fdk ...）未安裝時該項略過。
+
+使用方式:
+    python permit_parser_bench.py <html檔或目錄>... [--repeat N]
+"""
+
+import importlib.util
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+import permit_parser
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 既有解析器: (名稱, 檔案（相對於本目錄）, 類別名稱（模組函式為 None）)
+REFERENCE_PARSERS = [
+    ('function/func.py', 'function/func.py', None),
+    ('func_daily_crawler.py', 'function/func_daily_crawler.py', None),
+    ('oci-functions/func.py', '../oci-functions/func.py', 'BuildingPermitCrawler'),
+    ('taichung-crawler-function', 'taichung-crawler-function/func.py', 'TaichungBuildingCrawler'),
+]
+
+COMPARE_FIELDS = [
+    'permitNumber', 'applicantName', 'siteAddress', 'district', 'floorInfo',
+    'floorsAbove', 'floorsBelow', 'blockCount', 'buildingCount', 'unitCount',
+    'totalFloorArea', 'issueDate', 'issueDateROC',
+]
+
+INDEX_KEY_PATTERN = re.compile(r'(\d{11})')
+
+
+def optimized_crawler_regex(html_content, index_key):
+    """原本 optimized-crawler-stable.py 的 regex 解析（已改用 permit_parser），保留作為比對基準"""
+    try:
+        permit_data = {
+            'indexKey': index_key,
+            'permitYear': int(index_key[:3]),
+            'permitType': int(index_key[3]),
+            'sequenceNumber': int(index_key[4:9]),
+            'versionNumber': int(index_key[9:11]),
+            'crawledAt': datetime.now().isoformat()
+        }
+
+        m = re.search(r'<span class="conlist w20 tc">([1-9]\d{0,2}中[都市建]?建字第\d+號)</span>', html_content)
+        if m:
+            permit_data['permitNumber'] = m.group(1).strip()
+        else:
+            return None
+
+        for pattern in [r'起造人.*?姓名.*?<span class="conlist w30">([^<]+)</span>',
+                        r'起造人.*?<span class="conlist w30">([^<]+)</span>']:
+            m = re.search(pattern, html_content, re.DOTALL)
+            if m:
+                permit_data['applicantName'] = m.group(1).strip()
+                break
+
+        m = re.search(r'地號.*?<span class="conlist w30">([^<]+)</span>', html_content, re.DOTALL)
+        if m:
+            land_text = m.group(1).strip()
+            permit_data['siteAddress'] = land_text
+            district_match = re.search(r'臺中市([^區]+區)', land_text)
+            if district_match:
+                permit_data['district'] = district_match.group(1)
+
+        m = re.search(r'層棟戶數.*?<span class="conlist w50">([^<]+)</span>', html_content, re.DOTALL)
+        if m:
+            floor_info = m.group(1).strip()
+            permit_data['floorInfo'] = floor_info
+            for field, pattern in [('floorsAbove', r'地上(\d+)層'), ('floorsBelow', r'地下(\d+)層'),
+                                   ('blockCount', r'(\d+)幢'), ('buildingCount', r'(\d+)棟'),
+                                   ('unitCount', r'(\d+)戶')]:
+                fm = re.search(pattern, floor_info)
+                if fm:
+                    permit_data[field] = int(fm.group(1))
+
+        m = re.search(r'總樓地板面積.*?<span class="conlist w50">([0-9.,]+)', html_content, re.DOTALL)
+        if m:
+            try:
+                permit_data['totalFloorArea'] = float(m.group(1).replace(',', ''))
+            except ValueError:
+                pass
+
+        m = re.search(r'發照日期.*?<span class="conlist w30">(\d+年\d+月\d+日)</span>', html_content, re.DOTALL)
+        if m:
+            date_m = re.search(r'(\d+)年(\d+)月(\d+)日', m.group(1))
+            if date_m:
+                year, month, day = (int(g) for g in date_m.groups())
+                permit_data['issueDate'] = f"{year + 1911:04d}-{month:02d}-{day:02d}"
+                permit_data['issueDateROC'] = f"{year:03d}/{month:02d}/{day:02d}"
+
+        return permit_data
+    except Exception:
+        return None
+
+
+def _camel(name):
+    head, *rest = name.split('_')
+    return head + ''.join(part.title() for part in rest)
+
+
+def _normalize(result):
+    """統一各解析器的輸出：snake_case 轉 camelCase，NO_DATA/None 視為沒有結果"""
+    if not isinstance(result, dict):
+        return None
+    return {_camel(k): v for k, v in result.items() if v is not None}
+
+
+def load_reference_parsers():
+    """載入既有解析器，回傳 ([(名稱, 函式)], [(名稱, 略過原因)])"""
+    parsers = [('optimized-crawler-stable.py (regex)', optimized_crawler_regex)]
+    skipped = []
+    for name, path, class_name in REFERENCE_PARSERS:
+        full_path = os.path.normpath(os.path.join(HERE, path))
+        if not os.path.exists(full_path):
+            skipped.append((name, '檔案不存在'))
+            continue
+        try:
+            spec = importlib.util.spec_from_file_location(f'_bench_{len(parsers)}', full_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        except Exception as e:
+            skipped.append((name, f'無法載入: {e}'))
+            continue
+        if hasattr(module, 'save_html_to_oci'):
+            # 解析時會順便上傳 HTML，比較時不應有副作用
+            module.save_html_to_oci = lambda *args, **kwargs: None
+        if class_name:
+            cls = getattr(module, class_name)
+            instance = cls.__new__(cls)  # 不執行 __init__（會建立連線與 OCI client）
+            parsers.append((name, instance.parse_permit_data))
+        else:
+            parsers.append((name, module.parse_permit_data))
+    return parsers, skipped
+
+
+def load_pages(paths):
+    """讀取 HTML 存檔，INDEX_KEY 取自檔名"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith('.html'))
+        else:
+            files.append(path)
+    pages = []
+    for path in files:
+        m = INDEX_KEY_PATTERN.search(os.path.basename(path))
+        pages.append((m.group(1) if m else '11410000000', permit_parser.read_page(path)))
+    return pages
+
+
+def _throughput(func, pages, repeat):
+    start = time.perf_counter()
+    results = []
+    for _ in range(repeat):
+        results = [func(html, index_key) for index_key, html in pages]
+    elapsed = time.perf_counter() - start
+    return results, len(pages) * repeat / elapsed if elapsed else float('inf')
+
+
+def _agreement(ours, theirs):
+    """逐欄比對，回傳 {欄位: [相同, 不同, 只有我們有, 只有對方有]}"""
+    counts = {field: [0, 0, 0, 0] for field in COMPARE_FIELDS}
+    for mine, other in zip(ours, theirs):
+        mine = _normalize(mine) or {}
+        other = _normalize(other) or {}
+        for field in COMPARE_FIELDS:
+            if field in mine and field in other:
+                counts[field][0 if mine[field] == other[field] else 1] += 1
+            elif field in mine:
+                counts[field][2] += 1
+            elif field in other:
+                counts[field][3] += 1
+    return counts
+
+
+def bench(paths, repeat=5):
+    pages = load_pages(paths)
+    if not pages:
+        print("❌ 沒有找到 HTML 檔案")
+        return
+    print(f"📄 {len(pages)} 個頁面，每個解析器重複 {repeat} 次")
+
+    baseline = None
+    print("\n⏱️ permit_parser 各後端:")
+    for backend in permit_parser.available_backends():
+        results, rate = _throughput(
+            lambda html, key, b=backend: permit_parser.parse_permit(html, key, backend=b), pages, repeat)
+        if baseline is None:
+            baseline = results
+            note = '（比對基準）'
+        else:
+            counts = _agreement(baseline, results)
+            same = sum(c[0] for c in counts.values())
+            total = sum(sum(c) for c in counts.values())
+            note = f"與 {permit_parser.DEFAULT_BACKEND} 一致 {same}/{total}"
+        print(f"   {backend:<14} {rate:10.0f} 頁/秒  {note}")
+
+    parsers, skipped = load_reference_parsers()
+    print("\n⏱️ 既有解析器:")
+    for name, func in parsers:
+        results, rate = _throughput(func, pages, repeat)
+        counts = _agreement(baseline, results)
+        same = sum(c[0] for c in counts.values())
+        compared = sum(c[0] + c[1] for c in counts.values())
+        print(f"   {name:<36} {rate:10.0f} 頁/秒  同時有值的欄位一致 {same}/{compared}")
+        for field, (equal, differ, only_ours, only_theirs) in counts.items():
+            if differ or only_ours or only_theirs:
+                print(f"      {field:<16} 相同 {equal}, 不同 {differ}, 只有 permit_parser {only_ours}, 只有對方 {only_theirs}")
+    for name, reason in skipped:
+        print(f"   ⏭️ {name}: {reason}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = 5
+    if '--repeat' in args:
+        pos = args.index('--repeat')
+        repeat = int(args[pos + 1])
+        del args[pos:pos + 2]
+    if not args:
+        print(__doc__)
+    else:
+        bench(args, repeat)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+建照資料增量儲存 - 只追加的分段(segment)格式
+取代每批都「下載完整 permits.json → 合併 → 排序 → 上傳三份」的作法：
+1. 批次上傳只寫一個小的 delta 物件 data/segments/*.json，大小與批次成正比
+2. 壓實(compact)時才把所有 segment 合併進發佈用的快照並刪除已合併的 segment
+3. 合併規則與原本相同：新資料欄位較多或 crawledAt 較新才覆蓋
+4. 指定 tagger（寶佳篩選器）時，壓實一併把寶佳標記更新到目前公司清單版本並彙總統計
+5. segment 也可以只帶欄位修補 (patches，由存檔頁面重新解析產生)：只在該筆資料自修補產生後沒有重新爬取
+   （crawledAt 相同）時套用，不會蓋掉較新的爬取結果
+6. 快照以條件式寫入發佈（If-Match 讀取時的 ETag，快照不存在時 If-None-Match: *）：
+   多個 worker 同時壓實、或清理腳本同時改寫快照時，較晚的一方會收到 412，重新讀取快照再合併後重試，
+   不會默默蓋掉其他寫入端的資料（以前遺失的資料要等之後被當成缺漏重新爬取）
+"""
+
+import json
+import os
+import random
+import socket
+import time
+from datetime import datetime
+
+import baojia_tags
+import permit_columnar
+from object_storage import PreconditionFailed
+
+SNAPSHOT_NAME = "data/permits.json"
+PUBLISH_TARGETS = ["permits.json", "data/permits.json", "all_permits.json"]
+SEGMENT_PREFIX = "data/segments/"
+CONFLICT_RETRIES = 5
+
+
+def _field_count(permit):
+    """建照本身的欄位數（不含寶佳標記等推導欄位）"""
+    return sum(1 for k in permit if k not in baojia_tags.DERIVED_FIELDS)
+
+
+def merge_permits(existing_dict, new_permits):
+    """把新資料合併進 {indexKey: permit}，回傳 (新增數, 更新數)"""
+    added_count = 0
+    updated_count = 0
+
+    for permit in new_permits:
+        index_key = permit.get('indexKey')
+        if index_key in existing_dict:
+            old_permit = existing_dict[index_key]
+            # 如果新資料有更多欄位，則更新
+            if _field_count(permit) > _field_count(old_permit) or permit.get('crawledAt', '') > old_permit.get('crawledAt', ''):
+                existing_dict[index_key] = permit
+                updated_count += 1
+        else:
+            existing_dict[index_key] = permit
+            added_count += 1
+
+    return added_count, updated_count
+
+
+def apply_patches(existing_dict, patches):
+    """套用欄位修補 [{indexKey, base, set}]，回傳套用數
+
+    base 為產生修補時該筆資料的 crawledAt；之後重新爬取過（crawledAt 不同）的略過。
+    起造人改變時清除寶佳標記，壓實時重新比對。
+    """
+    applied = 0
+    for patch in patches:
+        permit = existing_dict.get(patch.get('indexKey'))
+        if permit is None or permit.get('crawledAt') != patch.get('base'):
+            continue
+        if 'applicantName' in patch['set']:
+            for field in baojia_tags.DERIVED_FIELDS:
+                permit.pop(field, None)
+        permit.update(patch['set'])
+        permit['reparsedAt'] = patch.get('at')
+        applied += 1
+    return applied
+
+
+def build_snapshot(permits, crawl_stats=None, list_version=None):
+    """排序並產生發佈用的快照結構"""
+    sorted_permits = sorted(permits, key=lambda x: (
+        -x.get('permitYear', 0),
+        -x.get('sequenceNumber', 0)
+    ))
+
+    year_counts = {}
+    for permit in sorted_permits:
+        year = permit.get('permitYear', 0)
+        year_counts[year] = year_counts.get(year, 0) + 1
+
+    data = {
+        "lastUpdate": datetime.now().isoformat(),
+        "totalCount": len(sorted_permits),
+        "yearCounts": year_counts,
+        "permits": sorted_permits,
+    }
+    if crawl_stats is not None:
+        data["crawlStats"] = crawl_stats
+    if list_version is not None:
+        data[baojia_tags.VERSION_FIELD] = list_version
+        data[baojia_tags.STATS_FIELD] = baojia_tags.compute_stats(sorted_permits, list_version)
+    return data
+
+
+class PermitStore:
+    def __init__(self, storage, tagger=None):
+        self.storage = storage
+        self.tagger = tagger  # 寶佳篩選器 (BaojiaRealtimeFilter)，壓實時更新標記
+        self._segment_counter = 0
+
+    def _segment_name(self):
+        """segment 名稱以時間開頭，依名稱排序即為寫入順序；含主機與PID避免多個worker衝突"""
+        self._segment_counter += 1
+        stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        host = socket.gethostname().replace("/", "_")
+        return f"{SEGMENT_PREFIX}{stamp}_{host}_{os.getpid()}_{self._segment_counter:04d}.json"
+
+    def append_segment(self, permits, crawl_stats=None):
+        """寫入一個 delta segment，只包含本批資料"""
+        if not permits:
+            return True
+        segment = {
+            "createdAt": datetime.now().isoformat(),
+            "count": len(permits),
+            "permits": permits,
+        }
+        if crawl_stats is not None:
+            segment["crawlStats"] = crawl_stats
+        body = json.dumps(segment, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self.storage.put_bytes(self._segment_name(), body)
+
+    def append_patches(self, patches, source=None):
+        """寫入一個只含欄位修補的 segment（見 apply_patches）"""
+        if not patches:
+            return True
+        segment = {
+            "createdAt": datetime.now().isoformat(),
+            "count": 0,
+            "permits": [],
+            "patches": patches,
+        }
+        if source is not None:
+            segment["source"] = source
+        body = json.dumps(segment, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self.storage.put_bytes(self._segment_name(), body)
+
+    def pending_segments(self):
+        return self.storage.list_names(SEGMENT_PREFIX)
+
+    def load_snapshot(self):
+        return self._read_snapshot()[0]
+
+    def _read_snapshot(self):
+        """回傳 (快照, ETag)；快照不存在時為 ({}, None)"""
+        raw, etag = self.storage.get_with_etag(SNAPSHOT_NAME)
+        if not raw:
+            return {}, None
+        return json.loads(raw.decode("utf-8")), etag
+
+    def _publish(self, data, etag):
+        """以條件式寫入發佈快照，再更新其他發佈位置與欄式快照
+
+        Args:
+            etag: 讀取快照時的 ETag；None 表示讀取時快照不存在
+
+        Returns:
+            bool: 是否全部發佈成功
+
+        Raises:
+            PreconditionFailed: 讀取後快照已被其他寫入端更新（什麼都沒有寫入）
+        """
+        body = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        conditions = {"if_match": etag} if etag else {"if_none_match": "*"}
+        new_etag = self.storage.put_bytes(SNAPSHOT_NAME, body, **conditions)
+        if not new_etag:
+            return False
+
+        # 副本不做條件式寫入：快照已被更新的版本取代時就不再覆蓋，由發佈該版本的寫入端更新副本
+        if new_etag is not True:
+            info = self.storage.head(SNAPSHOT_NAME)
+            if info is not None and info.get("etag") != new_etag:
+                return True
+
+        copies = {dest_path: body for dest_path in PUBLISH_TARGETS if dest_path != SNAPSHOT_NAME}
+        success = all(self.storage.put_many(copies).values())
+
+        # 同步發佈欄式快照（未安裝 pyarrow 時略過）；欄式快照失敗不影響 JSON 發佈，也不阻止刪除已合併的 segment，
+        # 否則每次壓實都要重新合併同一批 segment。下次壓實會再試一次
+        if permit_columnar.pa is not None:
+            try:
+                arrow_body = permit_columnar.to_ipc_bytes(data['permits'])
+                if not self.storage.put_bytes(permit_columnar.ARROW_NAME, arrow_body,
+                                              content_type="application/vnd.apache.arrow.file"):
+                    print(f"   ⚠️ 欄式快照上傳失敗: {permit_columnar.ARROW_NAME}")
+            except Exception as e:
+                print(f"   ⚠️ 欄式快照產生失敗，略過: {type(e).__name__}: {e}")
+        return success
+
+    @staticmethod
+    def _backoff(attempt, retries):
+        print(f"   ⚠️ 快照已被其他寫入端更新，重新讀取後合併 ({attempt}/{retries})")
+        time.sleep(random.uniform(0.2, 1.0) * attempt)
+
+    def _merge_segments(self, existing_dict, segment_names):
+        """依序合併 segment，回傳 (新增數, 更新數, 修補數, 最後的 crawlStats, 已合併的名稱)"""
+        added_count = updated_count = patched_count = 0
+        crawl_stats = None
+        merged_names = []
+        segments = self.storage.get_many(segment_names)
+        for name in segment_names:
+            raw = segments[name]
+            if raw is None:
+                continue
+            segment = json.loads(raw.decode("utf-8"))
+            added, updated = merge_permits(existing_dict, segment.get('permits', []))
+            added_count += added
+            updated_count += updated
+            patched_count += apply_patches(existing_dict, segment.get('patches', []))
+            crawl_stats = segment.get('crawlStats', crawl_stats)
+            merged_names.append(name)
+        return added_count, updated_count, patched_count, crawl_stats, merged_names
+
+    def load_current(self):
+        """快照加上所有待合併 segment 的目前資料 {indexKey: permit}（不發佈）"""
+        existing_dict = {p.get('indexKey'): p for p in self.load_snapshot().get('permits', [])}
+        self._merge_segments(existing_dict, self.pending_segments())
+        return existing_dict
+
+    def compact(self, retag=False, retries=CONFLICT_RETRIES):
+        """把所有待合併的 segment 併入快照並發佈
+
+        Args:
+            retag: 沒有待合併 segment 時，仍檢查寶佳標記是否需要更新（公司清單換版後使用）
+            retries: 快照被其他寫入端搶先更新時，重新讀取合併的次數
+
+        Returns:
+            bool: 是否成功（沒有待合併 segment 也視為成功）
+        """
+        for attempt in range(1, retries + 1):
+            segment_names = self.pending_segments()
+            if not segment_names and not (retag and self.tagger is not None):
+                return True
+
+            print(f"   🗜️ 壓實 {len(segment_names)} 個 segment...", end=' ')
+            snapshot, etag = self._read_snapshot()
+            existing_dict = {p.get('indexKey'): p for p in snapshot.get('permits', [])}
+
+            # 其他寫入端已合併並刪除的 segment 讀不到，會被略過（內容已在較新的快照中）
+            added_count, updated_count, patched_count, crawl_stats, merged_names = \
+                self._merge_segments(existing_dict, segment_names)
+            crawl_stats = crawl_stats or snapshot.get('crawlStats')
+
+            print(f"➕ 新增 {added_count} 筆, 🔄 更新 {updated_count} 筆"
+                  + (f", 🩹 修補 {patched_count} 筆" if patched_count else ""))
+
+            list_version = snapshot.get(baojia_tags.VERSION_FIELD)
+            if self.tagger is not None:
+                # 只有舊版本或未標記的建照需要重新比對
+                checked, changed = baojia_tags.retag(existing_dict.values(), self.tagger)
+                list_version = self.tagger.companies_version
+                if checked:
+                    print(f"   🏷️ 寶佳標記: 重新比對 {checked} 筆, 改變 {changed} 筆")
+                elif not merged_names:
+                    print("   ✅ 寶佳標記已是最新")
+                    return True
+
+            data = build_snapshot(existing_dict.values(), crawl_stats, list_version)
+            try:
+                success = self._publish(data, etag)
+            except PreconditionFailed:
+                self._backoff(attempt, retries)
+                continue
+
+            # 只有快照全部發佈成功才刪除已合併的 segment（失敗時下次重新合併，結果相同）
+            if success:
+                for name in merged_names:
+                    self.storage.delete(name)
+            return success
+
+        print(f"   ❌ 快照連續 {retries} 次被其他寫入端搶先更新，segment 留待下次壓實")
+        return False
+
+    def update_snapshot(self, mutate, retries=CONFLICT_RETRIES):
+        """條件式「讀取 → 修改 → 發佈」快照，給直接改寫快照的清理 / 刪除腳本使用
+
+        Args:
+            mutate: mutate(permits) 收到目前快照的建照清單，回傳新的清單；回傳 None 表示不需寫入。
+                    衝突時會以最新的快照再呼叫一次，不應有其他副作用
+            retries: 快照被其他寫入端搶先更新時的重試次數
+
+        Returns:
+            bool: 是否成功（mutate 回傳 None 也視為成功）
+        """
+        for attempt in range(1, retries + 1):
+            snapshot, etag = self._read_snapshot()
+            if etag is None:
+                print("   ❌ 無法讀取快照")
+                return False
+            permits = mutate(list(snapshot.get('permits', [])))
+            if permits is None:
+                return True
+            data = build_snapshot(permits, snapshot.get('crawlStats'), snapshot.get(baojia_tags.VERSION_FIELD))
+            try:
+                return self._publish(data, etag)
+            except PreconditionFailed:
+                self._backoff(attempt, retries)
+
+        print(f"   ❌ 快照連續 {retries} 次被其他寫入端搶先更新，放棄寫入")
+        return False
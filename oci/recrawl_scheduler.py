@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+不完整資料重爬排程 - 每日請求預算內優先重爬最有價值的資料
+取代 recrawl-empty-stable.py、fix-empty-data.py、fix-missing-fields-114.py、fix_empty_fields_by_list.py
+（各自下載整份資料，依序號順序把某一年所有空白資料重爬一遍，其餘一概不管）：
+1. 每筆資料依缺漏欄位的嚴重程度計分：起造人、地址最重，發照日、面積、樓層/棟數/戶數次之
+2. 較新的年度加權；最近才重爬過的略過（冷卻期），越久沒重爬的加權越高
+3. 重試佇列中近期一再失敗的降低優先，已列入無法完成清單的略過；重爬成功但欄位仍然缺漏的
+   （原始頁面本來就沒有，例如沒有戶數的建照）記在本機檔案，該欄位權重遞減，連續缺漏數次後不再列入
+4. 每日重爬請求數有上限（預算記在本機檔案），每日爬蟲爬完新建照後用剩餘預算重爬分數最高的資料，
+   資料完整度每天穩定提升，不必再手動執行修復腳本
+
+使用方式:
+    python optimized-crawler-stable.py recrawl [筆數]        # 在今日剩餘預算內重爬（可另指定上限）
+    python optimized-crawler-stable.py recrawl-plan [筆數]   # 只列出排程，不爬取
+    python recrawl_scheduler.py budget                      # 今日預算使用狀況
+"""
+
+import json
+import os
+import sys
+from datetime import date, datetime
+
+from permit_columnar import ALIASES
+
+DEFAULT_BUDGET_FILE = 'recrawl-budget.json'
+DEFAULT_HISTORY_FILE = 'recrawl-history.json'
+
+# 缺漏欄位的權重（起造人、地址空白代表整筆幾乎不能用）
+FIELD_WEIGHTS = {
+    'applicantName': 10,
+    'siteAddress': 10,
+    'issueDate': 4,
+    'totalFloorArea': 3,
+    'floors': 2,
+    'buildings': 2,
+    'units': 2,
+    'district': 1,
+}
+
+
+def _present(value):
+    if isinstance(value, str):
+        value = value.strip()
+    return bool(value)
+
+
+def missing_fields(permit):
+    """缺漏（空白或 0）的欄位；別名欄位與正式欄位（如 units / unitCount）任一有值即視為完整"""
+    return [field for field in FIELD_WEIGHTS
+            if not _present(permit.get(field)) and not _present(permit.get(ALIASES.get(field)))]
+
+
+class RecrawlScheduler:
+    """依分數挑選要重爬的資料
+
+    Args:
+        daily_budget: 每日重爬請求數上限
+        cooldown_days: 重爬過的資料至少隔幾天才再重爬
+        year_decay: 每舊一個年度，權重除以 (1 + year_decay × 年數差)
+        budget_file: 記錄今日已使用預算的檔案
+        history_file: 記錄重爬後仍缺漏欄位的檔案
+        max_misses: 同一欄位重爬後連續缺漏幾次即不再為它重爬
+    """
+
+    def __init__(self, daily_budget=200, cooldown_days=7, year_decay=0.2, budget_file=DEFAULT_BUDGET_FILE,
+                 history_file=DEFAULT_HISTORY_FILE, max_misses=2):
+        self.daily_budget = daily_budget
+        self.cooldown_days = cooldown_days
+        self.year_decay = year_decay
+        self.budget_file = budget_file
+        self.history_file = history_file
+        self.max_misses = max_misses
+
+    # ---- 預算 ----
+
+    def _ledger(self):
+        today = date.today().isoformat()
+        if os.path.exists(self.budget_file):
+            try:
+                with open(self.budget_file, 'r', encoding='utf-8') as f:
+                    ledger = json.load(f)
+                if ledger.get('date') == today:
+                    return ledger
+            except (OSError, ValueError):
+                pass
+        return {'date': today, 'used': 0}
+
+    def remaining(self):
+        """今日剩餘的重爬請求數"""
+        return max(0, self.daily_budget - self._ledger()['used'])
+
+    def spend(self, count=1):
+        ledger = self._ledger()
+        ledger['used'] += count
+        with open(self.budget_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(ledger, f)
+        os.replace(self.budget_file + '.tmp', self.budget_file)
+
+    # ---- 重爬結果 ----
+
+    def history(self):
+        """{indexKey: {欄位: 重爬後仍缺漏的連續次數}}"""
+        if not os.path.exists(self.history_file):
+            return {}
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record_refetch(self, index_key, refetched):
+        """記錄重爬成功的結果：仍缺漏的欄位次數加一，已補上的欄位清除"""
+        history = self.history()
+        previous = history.get(index_key, {})
+        still_missing = {field: previous.get(field, 0) + 1 for field in missing_fields(refetched)}
+        if still_missing:
+            history[index_key] = still_missing
+        else:
+            history.pop(index_key, None)
+        with open(self.history_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(history, f)
+        os.replace(self.history_file + '.tmp', self.history_file)
+        return still_missing
+
+    # ---- 計分 ----
+
+    def score(self, permit, missing, last_attempt, failures, newest_year, now, misses=None):
+        """單筆分數；冷卻期內回傳 0
+
+        Args:
+            last_attempt: 最後一次爬取時間 (datetime)，未知時為 None
+            failures: 重試佇列中的近期失敗次數
+            misses: {欄位: 重爬後仍缺漏的連續次數}；權重依次數遞減，達 max_misses 的欄位不計
+        """
+        misses = misses or {}
+        severity = sum(FIELD_WEIGHTS[f] / (1 + misses.get(f, 0)) for f in missing
+                       if misses.get(f, 0) < self.max_misses)
+        if not severity:
+            return 0.0
+        if last_attempt is not None:
+            idle_days = (now - last_attempt).total_seconds() / 86400
+            if idle_days < self.cooldown_days:
+                return 0.0
+            staleness = min(idle_days / self.cooldown_days, 3.0)
+        else:
+            staleness = 3.0
+        age = max(0, newest_year - (permit.get('permitYear') or newest_year))
+        return severity * staleness / (1 + self.year_decay * age) / (1 + failures)
+
+    def plan(self, permits, sequence_state=None, retry_queue=None, limit=None):
+        """依分數由高到低排出要重爬的資料
+
+        Returns:
+            [(分數, 建照資料, 缺漏欄位)]
+        """
+        now = datetime.now()
+        waiting = retry_queue.waiting() if retry_queue is not None else {}
+        dead = retry_queue.dead() if retry_queue is not None else {}
+        history = self.history()
+        newest_year = max((p.get('permitYear') or 0 for p in permits), default=0)
+        candidates = []
+        for permit in permits:
+            index_key = permit.get('indexKey')
+            if not index_key or index_key in dead:
+                continue
+            missing = missing_fields(permit)
+            if not missing:
+                continue
+            last_attempt = None
+            if sequence_state is not None and permit.get('permitYear') and permit.get('sequenceNumber'):
+                last_attempt = sequence_state.last_attempt(permit['permitYear'], permit['sequenceNumber'])
+            if last_attempt is None and permit.get('crawledAt'):
+                try:
+                    last_attempt = datetime.fromisoformat(permit['crawledAt'])
+                except ValueError:
+                    pass
+            failures = waiting.get(index_key, {}).get('attempts', 0)
+            score = self.score(permit, missing, last_attempt, failures, newest_year, now, history.get(index_key))
+            if score > 0:
+                candidates.append((score, permit, missing))
+        candidates.sort(key=lambda c: -c[0])
+        return candidates[:limit] if limit is not None else candidates
+
+
+if __name__ == "__main__":
+    scheduler = RecrawlScheduler()
+    if len(sys.argv) > 1 and sys.argv[1] == "budget":
+        ledger = scheduler._ledger()
+        print(f"📅 {ledger['date']}: 已使用 {ledger['used']} / {scheduler.daily_budget}，剩餘 {scheduler.remaining()}")
+    else:
+        print(__doc__)
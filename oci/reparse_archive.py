@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存檔頁面重新解析 - 解析器改進後由存檔頁面重建欄位，不必重新爬取
+取代解析器改版（新增 floorsBelow、issueDateROC，修正起造人空白等）後重爬網站的作法
+（fix-missing-fields-114.py、recrawl-empty-stable.py、update_1091_1097.py 每筆都要對網站發兩次請求，
+修一個解析錯誤要重爬所有年度好幾個小時）：
+1. 存檔 segment 整個下載一次（不是每頁一次範圍讀取），頁面送進行程池以所有核心解壓並以目前的 permit_parser 解析；
+   舊的 html/<INDEX_KEY>.html 物件也一併處理
+2. 下載與解析重疊進行，進行中的解析批次有上限，記憶體用量與資料量無關
+3. 與目前資料（快照加上待合併 segment）逐欄比較：空白欄位補上、值不同的更新；新解析結果沒有的欄位不清除
+   （記為遺失，通常代表解析器退步，報告中列出）
+4. 所有差異寫成一個只含欄位修補的 segment 再壓實發佈；修補只套用在產生後沒有重新爬取過的資料
+5. 差異報告（各欄位補上 / 更新 / 遺失筆數與範例）另存 JSON，可先 --dry-run 檢視；過程中不對政府網站發出任何請求
+
+使用方式:
+    python reparse_archive.py [年份...] [--fill-only] [--dry-run] [--no-publish] [--workers N] [--keys INDEX_KEY...]
+        --fill-only    只補空白欄位，不更新已有值的欄位
+        --dry-run      只產生差異報告，不寫入
+        --no-publish   寫入修補 segment，留待下次壓實發佈
+"""
+
+import json
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import baojia_tags
+import permit_parser
+from html_archive import HtmlArchive, LEGACY_PREFIX, segment_object
+from object_storage import open_storage
+from page_codec import PageCodec
+from permit_store import PermitStore
+
+LEGACY = 'legacy'  # 舊的 html/ 物件：未壓縮的 UTF-8
+DEFAULT_REPORT = 'reparse-report.json'
+CHUNK = 64  # 每個解析工作的頁數
+EXAMPLES = 5
+
+# 不比較的欄位：由 INDEX_KEY 推導、爬取時間、寶佳標記
+IGNORED_FIELDS = {'indexKey', 'permitYear', 'permitType', 'sequenceNumber', 'versionNumber',
+                  'crawledAt', 'reparsedAt'} | set(baojia_tags.DERIVED_FIELDS)
+
+_codecs = {}
+
+
+def _init_worker(dictionaries):
+    """解析行程初始化：建立各字典版本的 PageCodec {dict id: (格式, 字典內容)}"""
+    _codecs[None] = PageCodec()
+    for dict_id, (codec, data) in dictionaries.items():
+        _codecs[dict_id] = PageCodec(codec, data, dict_id)
+
+
+def parse_records(dict_id, records):
+    """在解析行程中執行：[(INDEX_KEY, 存檔內容)] → [(INDEX_KEY, 建照資料或 None)]"""
+    results = []
+    for index_key, raw in records:
+        try:
+            html = raw.decode('utf-8') if dict_id == LEGACY else _codecs[dict_id].decompress(raw)
+            results.append((index_key, permit_parser.parse_permit(html, index_key)))
+        except Exception as e:
+            print(f"❌ 解析失敗 {index_key}: {e}")
+            results.append((index_key, None))
+    return results
+
+
+def _empty(value):
+    return value is None or value == ''
+
+
+def diff_permit(stored, parsed, fill_only=False):
+    """逐欄比較，回傳 ({欄位: 新值}, [新解析結果沒有的欄位])"""
+    changes = {}
+    for field, value in parsed.items():
+        if field in IGNORED_FIELDS or _empty(value) or stored.get(field) == value:
+            continue
+        if fill_only and not _empty(stored.get(field)):
+            continue
+        changes[field] = value
+    dropped = [field for field, value in stored.items()
+               if field not in IGNORED_FIELDS and not _empty(value) and _empty(parsed.get(field))]
+    return changes, dropped
+
+
+class ReparseJob:
+    """由存檔頁面重新解析並產生欄位修補
+
+    Args:
+        storage: 物件儲存
+        workers: 解析行程數，預設為 CPU 核心數
+        segment_batch: 每次平行下載的存檔 segment 數
+    """
+
+    def __init__(self, storage, workers=None, segment_batch=4):
+        self.storage = storage
+        self.workers = workers or os.cpu_count() or 1
+        self.segment_batch = segment_batch
+        self.archive = HtmlArchive(storage)
+        self.store = PermitStore(storage)
+
+    def _sources(self, keys):
+        """依存檔位置分組：({segment id: [INDEX_KEY...]}, 舊物件的 INDEX_KEY, 沒有存檔的 INDEX_KEY)"""
+        self.archive.refresh()
+        pages = self.archive.catalog['pages']
+        by_segment = defaultdict(list)
+        rest = []
+        for index_key in keys:
+            if index_key in pages:
+                by_segment[pages[index_key][0]].append(index_key)
+            else:
+                rest.append(index_key)
+        legacy = set()
+        if rest:
+            legacy = {name[len(LEGACY_PREFIX):-len('.html')] for name in self.storage.list_names(LEGACY_PREFIX)}
+        return by_segment, [k for k in rest if k in legacy], [k for k in rest if k not in legacy]
+
+    def _chunks(self, by_segment, legacy_keys):
+        """下載存檔並切成解析工作 (字典版本, [(INDEX_KEY, 存檔內容)])"""
+        pages = self.archive.catalog['pages']
+        segment_ids = sorted(by_segment)
+        for start in range(0, len(segment_ids), self.segment_batch):
+            batch = segment_ids[start:start + self.segment_batch]
+            blobs = self.storage.get_many([segment_object(self.archive.prefix, s) for s in batch])
+            for segment_id in batch:
+                blob = blobs[segment_object(self.archive.prefix, segment_id)]
+                if blob is None:
+                    print(f"⚠️ 無法下載存檔 segment {segment_id}")
+                    continue
+                dict_id = self.archive.catalog['segments'][segment_id].get('dict')
+                records = []
+                for index_key in by_segment[segment_id]:
+                    _, offset, length = pages[index_key]
+                    records.append((index_key, blob[offset:offset + length]))
+                for i in range(0, len(records), CHUNK):
+                    yield dict_id, records[i:i + CHUNK]
+        for start in range(0, len(legacy_keys), CHUNK * 4):
+            names = [f"{LEGACY_PREFIX}{k}.html" for k in legacy_keys[start:start + CHUNK * 4]]
+            blobs = self.storage.get_many(names)
+            records = [(name[len(LEGACY_PREFIX):-len('.html')], raw) for name, raw in blobs.items() if raw is not None]
+            for i in range(0, len(records), CHUNK):
+                yield LEGACY, records[i:i + CHUNK]
+
+    def run(self, years=None, keys=None, fill_only=False, dry_run=False, publish=True, report_file=DEFAULT_REPORT):
+        """重新解析並套用修補，回傳差異報告"""
+        started = time.time()
+        current = self.store.load_current()
+        wanted = [k for k in current
+                  if (keys is None or k in keys) and (not years or current[k].get('permitYear') in years)]
+        by_segment, legacy_keys, missing = self._sources(wanted)
+        print(f"🔁 重新解析 {len(wanted)} 筆：存檔 segment {len(by_segment)} 個, "
+              f"舊 HTML 物件 {len(legacy_keys)} 個, 沒有存檔 {len(missing)} 筆, 解析行程 {self.workers}")
+
+        dictionaries = {}
+        for segment_id in by_segment:
+            dict_id = self.archive.catalog['segments'][segment_id].get('dict')
+            if dict_id and dict_id not in dictionaries:
+                codec = self.archive.dictionaries.load(dict_id)
+                dictionaries[dict_id] = (codec.codec, codec.data)
+
+        now = datetime.now().isoformat()
+        patches = []
+        fields = defaultdict(lambda: {'filled': 0, 'changed': 0, 'lost': 0})
+        examples = defaultdict(list)
+        dropped_fields = []
+        produced = set()
+        parsed_count = unparsed = 0
+
+        def collect(results):
+            nonlocal parsed_count, unparsed
+            for index_key, parsed in results:
+                if parsed is None:
+                    unparsed += 1
+                    continue
+                parsed_count += 1
+                produced.update(parsed)
+                stored = current[index_key]
+                changes, dropped = diff_permit(stored, parsed, fill_only)
+                dropped_fields.append((index_key, dropped))
+                if not changes:
+                    continue
+                patches.append({'indexKey': index_key, 'base': stored.get('crawledAt'), 'set': changes, 'at': now})
+                for field, value in changes.items():
+                    kind = 'filled' if _empty(stored.get(field)) else 'changed'
+                    fields[field][kind] += 1
+                    if len(examples[field]) < EXAMPLES:
+                        examples[field].append({'indexKey': index_key, 'old': stored.get(field), 'new': value})
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(dictionaries,)) as pool:
+            inflight = deque()
+            for dict_id, records in self._chunks(by_segment, legacy_keys):
+                inflight.append(pool.submit(parse_records, dict_id, records))
+                while len(inflight) >= self.workers * 2:
+                    collect(inflight.popleft().result())
+            while inflight:
+                collect(inflight.popleft().result())
+
+        # 只有解析器會產生的欄位才算遺失（其他來源寫入的欄位不列入）
+        for index_key, dropped in dropped_fields:
+            for field in dropped:
+                if field in produced:
+                    fields[field]['lost'] += 1
+                    if len(examples[field]) < EXAMPLES:
+                        examples[field].append({'indexKey': index_key, 'old': current[index_key].get(field), 'new': None})
+
+        elapsed = time.time() - started
+        report = {
+            'createdAt': now,
+            'seconds': round(elapsed, 1),
+            'records': len(wanted),
+            'parsed': parsed_count,
+            'unparsed': unparsed,
+            'noArchive': len(missing),
+            'patches': len(patches),
+            'fillOnly': fill_only,
+            'fields': dict(fields),
+            'examples': dict(examples),
+        }
+        with open(report_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        os.replace(report_file + '.tmp', report_file)
+
+        print(f"📊 解析 {parsed_count} 頁（失敗 {unparsed}），{elapsed:.1f} 秒 "
+              f"({parsed_count / elapsed if elapsed else 0:.0f} 頁/秒)，修補 {len(patches)} 筆")
+        for field, counts in sorted(fields.items()):
+            print(f"   {field:<16} 補上 {counts['filled']:>6}  更新 {counts['changed']:>6}  遺失 {counts['lost']:>6}")
+        print(f"📝 差異報告: {report_file}")
+
+        if dry_run or not patches:
+            return report
+        if not self.store.append_patches(patches, source='reparse'):
+            print("❌ 修補 segment 寫入失敗")
+            return report
+        print(f"✅ 已寫入修補 segment ({len(patches)} 筆)")
+        if publish:
+            from baojia_realtime_filter import BaojiaRealtimeFilter
+            tagger = BaojiaRealtimeFilter(storage=self.storage)
+            tagger.refresh_companies()
+            publisher = PermitStore(self.storage, tagger=tagger)
+            print("✅ 已壓實發佈" if publisher.compact() else "❌ 壓實發佈失敗，修補留待下次壓實")
+        return report
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if '-h' in args or '--help' in args:
+        print(__doc__)
+        sys.exit(0)
+    keys = None
+    if '--keys' in args:
+        keys = set(args[args.index('--keys') + 1:])
+        args = args[:args.index('--keys')]
+    workers = None
+    if '--workers' in args:
+        workers = int(args[args.index('--workers') + 1])
+        del args[args.index('--workers'):args.index('--workers') + 2]
+    flags = {a for a in args if a.startswith('--')}
+    years = [int(a) for a in args if not a.startswith('--')]
+    ReparseJob(open_storage(), workers=workers).run(
+        years=years or None, keys=keys, fill_only='--fill-only' in flags,
+        dry_run='--dry-run' in flags, publish='--no-publish' not in flags)
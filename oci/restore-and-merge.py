@@ -7,25 +7,17 @@
 """
 
 import json
-import subprocess
 from datetime import datetime
 
+from object_storage import open_storage
+
 def merge_permits():
     print("🔧 開始恢復並合併資料...")
     
     # 1. 載入備份資料（基礎）
     print("📥 載入備份資料...")
-    cmd = [
-        "oci", "os", "object", "get",
-        "--namespace", "nrsdi1rz5vl8",
-        "--bucket-name", "taichung-building-permits",
-        "--name", "backups/permits_backup_20250728_000722.json",
-        "--file", "/tmp/base_permits.json"
-    ]
-    subprocess.run(cmd, capture_output=True)
-    
-    with open('/tmp/base_permits.json', 'r', encoding='utf-8') as f:
-        base_data = json.load(f)
+    storage = open_storage()
+    base_data = storage.get_json("backups/permits_backup_20250728_000722.json", {})
     base_permits = base_data.get('permits', [])
     print(f"✅ 基礎資料: {len(base_permits)} 筆")
     
@@ -63,23 +55,11 @@ def merge_permits():
         "permits": sorted_permits
     }
     
-    # 儲存
-    with open('/tmp/restored_permits.json', 'w', encoding='utf-8') as f:
-        json.dump(final_data, f, ensure_ascii=False, indent=2)
+    body = json.dumps(final_data, ensure_ascii=False, indent=2).encode('utf-8')
     
     # 上傳到兩個位置
     print("📤 上傳恢復的資料...")
-    for dest_path in ["permits.json", "data/permits.json"]:
-        cmd = [
-            "oci", "os", "object", "put",
-            "--namespace", "nrsdi1rz5vl8",
-            "--bucket-name", "taichung-building-permits",
-            "--name", dest_path,
-            "--file", "/tmp/restored_permits.json",
-            "--content-type", "application/json",
-            "--force"
-        ]
-        subprocess.run(cmd, capture_output=True)
+    storage.put_many({dest_path: body for dest_path in ["permits.json", "data/permits.json"]})
     
     print("✅ 資料恢復完成！")
     return len(sorted_permits)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+失敗重試佇列 - 延遲重試 + 無法完成清單 (dead letter)
+取代失敗的 INDEX_KEY 只記在記憶體的 failed_keys、以及在爬取迴圈中 sleep 2~5 秒原地重試的作法
+（一個失敗的序號拖慢整個串行爬取，程式結束後失敗清單就不見了）：
+1. 失敗的 INDEX_KEY 放進本機佇列檔，記錄嘗試次數與最後錯誤，爬取主迴圈不等待、不重試
+2. 下次重試時間為指數退避加隨機抖動：base · 2^(次數-1)，上限 max_delay，再乘上 1±jitter
+3. 超過 max_attempts 次仍失敗的移到無法完成清單，可檢視、可整批重新排入
+4. 佇列檔以檔案鎖保護，多個爬蟲行程 / worker 可共用
+
+使用方式:
+    python retry_queue.py status              # 待重試筆數、已到期筆數、無法完成筆數
+    python retry_queue.py dead                # 列出無法完成的 INDEX_KEY
+    python retry_queue.py replay [INDEX_KEY...]  # 把無法完成的（預設全部）重新排入
+    python optimized-crawler-stable.py retry  # 重試已到期的 INDEX_KEY
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX 平台：只適合單一行程
+    fcntl = None
+
+DEFAULT_PATH = 'retry-queue.json'
+
+
+def backoff_delay(attempts, base_delay=60, max_delay=6 * 3600, jitter=0.5):
+    """第 attempts 次失敗後到下次重試的秒數（指數退避 + 隨機抖動）"""
+    delay = min(max_delay, base_delay * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(1 - jitter, 1 + jitter)
+
+
+class RetryQueue:
+    """延遲重試佇列（執行緒安全，可跨行程共用）
+
+    Args:
+        path: 佇列檔
+        base_delay: 第一次失敗後的重試間隔（秒）
+        max_delay: 重試間隔上限（秒）
+        max_attempts: 失敗幾次後移到無法完成清單
+        jitter: 隨機抖動比例
+    """
+
+    def __init__(self, path=DEFAULT_PATH, base_delay=60, max_delay=6 * 3600, max_attempts=6, jitter=0.5):
+        self.path = path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        # 佇列中（含無法完成清單）的 INDEX_KEY，成功時只有在其中才需要鎖定、改寫檔案；
+        # 佇列檔被其他行程改寫（檔案識別不同）時重新載入，其他 worker 排入的 INDEX_KEY 也能移出
+        self._known = set()
+        self._known_stamp = None
+        self._refresh_known()
+
+    # ---- 檔案 ----
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _refresh_known(self):
+        stamp = self._stamp()
+        if stamp != self._known_stamp:
+            state = self._read()
+            self._known = set(state['retries']) | set(state['dead'])
+            self._known_stamp = stamp
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {'retries': {}, 'dead': {}}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            try:
+                state = json.load(f)
+            except ValueError:
+                return {'retries': {}, 'dead': {}}
+        state.setdefault('retries', {})
+        state.setdefault('dead', {})
+        return state
+
+    @contextmanager
+    def _transaction(self):
+        """在檔案鎖內讀取佇列、修改、寫回"""
+        with self._lock, open(self.path + '.lock', 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                state = self._read()
+                yield state
+                with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(state, f, ensure_ascii=False, indent=1)
+                os.replace(self.path + '.tmp', self.path)
+                self._known = set(state['retries']) | set(state['dead'])
+                self._known_stamp = self._stamp()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    # ---- 更新 ----
+
+    def fail(self, index_key, error=None):
+        """記錄一次失敗並排定下次重試
+
+        Returns:
+            下次重試時間 (epoch 秒)，移到無法完成清單時為 None
+        """
+        now = time.time()
+        with self._transaction() as state:
+            entry = state['retries'].pop(index_key, None) or {'attempts': 0, 'firstFailedAt': now}
+            entry['attempts'] += 1
+            entry['lastError'] = error
+            entry['lastFailedAt'] = now
+            if entry['attempts'] >= self.max_attempts:
+                entry.pop('nextAt', None)
+                state['dead'][index_key] = entry
+                print(f"☠️ {index_key} 已失敗 {entry['attempts']} 次，移到無法完成清單")
+                return None
+            entry['nextAt'] = now + backoff_delay(entry['attempts'], self.base_delay, self.max_delay, self.jitter)
+            state['retries'][index_key] = entry
+            return entry['nextAt']
+
+    def succeed(self, index_key):
+        """取得結果（有資料或查無資料）時移出佇列"""
+        self._refresh_known()
+        if index_key not in self._known:
+            return
+        with self._transaction() as state:
+            state['retries'].pop(index_key, None)
+            state['dead'].pop(index_key, None)
+
+    def replay(self, keys=None):
+        """把無法完成的 INDEX_KEY（預設全部）重新排入，嘗試次數歸零、立即到期
+
+        Returns:
+            重新排入的筆數
+        """
+        now = time.time()
+        with self._transaction() as state:
+            keys = list(state['dead']) if keys is None else [k for k in keys if k in state['dead']]
+            for key in keys:
+                entry = state['dead'].pop(key)
+                entry.update(attempts=0, nextAt=now)
+                state['retries'][key] = entry
+        return len(keys)
+
+    # ---- 查詢 ----
+
+    def __contains__(self, index_key):
+        self._refresh_known()
+        return index_key in self._known
+
+    def due(self, now=None, limit=None):
+        """已到期、可以重試的 INDEX_KEY（依到期時間排序）"""
+        now = time.time() if now is None else now
+        retries = self._read()['retries']
+        keys = sorted((e['nextAt'], k) for k, e in retries.items() if e['nextAt'] <= now)
+        return [k for _, k in keys[:limit]]
+
+    def waiting(self):
+        return self._read()['retries']
+
+    def dead(self):
+        return self._read()['dead']
+
+    def summary(self):
+        state = self._read()
+        now = time.time()
+        upcoming = [e['nextAt'] for e in state['retries'].values()]
+        return {
+            'waiting': len(state['retries']),
+            'due': sum(1 for t in upcoming if t <= now),
+            'dead': len(state['dead']),
+            'nextAt': datetime.fromtimestamp(min(upcoming)).isoformat() if upcoming else None,
+        }
+
+
+if __name__ == "__main__":
+    queue = RetryQueue()
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        s = queue.summary()
+        print(f"🔁 待重試 {s['waiting']} 筆（已到期 {s['due']} 筆，最早 {s['nextAt'] or '-'}），"
+              f"無法完成 {s['dead']} 筆")
+    elif len(sys.argv) > 1 and sys.argv[1] == "dead":
+        for key, entry in sorted(queue.dead().items()):
+            failed_at = datetime.fromtimestamp(entry['lastFailedAt']).strftime('%Y-%m-%d %H:%M')
+            print(f"   {key}: 失敗 {entry['attempts']} 次，最後 {failed_at} ({entry.get('lastError') or '-'})")
+    elif len(sys.argv) > 1 and sys.argv[1] == "replay":
+        print(f"✅ 重新排入 {queue.replay(sys.argv[2:] or None)} 筆")
+    else:
+        print(__doc__)
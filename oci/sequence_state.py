@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+各年度序號狀態索引 - 自動找出需要補爬的序號
+取代手動維護的缺失區間（fill-gaps 模式的區間表、check_missing_sequences 的 year_totals）
+與每次下載整份 permits.json 重新計算序號集合的作法：
+1. 每年一個緊湊陣列，以序號為索引：每個序號 1 byte 狀態（未爬、已爬、查無資料、失敗、欄位空白）
+   + 4 bytes 最後嘗試時間，查詢單一序號為 O(1)
+2. 每筆爬取結果（不論成功、無資料、失敗）都即時更新
+3. 可直接產生最少的連續補爬區間；首次使用可由現有資料集建立
+4. 寫回時只合併本行程變更的序號（檔案鎖保護），多個 worker 行程可共用同一個目錄
+
+使用方式:
+    python sequence_state.py show [年份]         # 各年度狀態統計
+    python sequence_state.py ranges <年份>       # 需要補爬的連續區間
+"""
+
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX 平台：不與其他行程合併
+    fcntl = None
+
+DEFAULT_DIR = 'sequence-state'
+MAGIC = b'SEQ1'
+
+# 序號狀態
+UNKNOWN = 0  # 尚未爬取
+CRAWLED = 1  # 已爬取，資料完整
+NO_DATA = 2  # 查無資料（未發照或空號）
+FAILED = 3  # 爬取失敗
+EMPTY_FIELDS = 4  # 已爬取但起造人或地址空白
+
+STATE_NAMES = {
+    UNKNOWN: '未爬取',
+    CRAWLED: '已爬取',
+    NO_DATA: '查無資料',
+    FAILED: '失敗',
+    EMPTY_FIELDS: '欄位空白',
+}
+
+# 預設需要補爬的狀態
+GAP_STATES = (UNKNOWN, FAILED, EMPTY_FIELDS)
+
+
+def state_for(result):
+    """爬取結果對應的狀態（結果格式同 crawl_single_permit）"""
+    if result == "NO_DATA":
+        return NO_DATA
+    if not result:
+        return FAILED
+    if not (result.get('applicantName') or '').strip() or not (result.get('siteAddress') or '').strip():
+        return EMPTY_FIELDS
+    return CRAWLED
+
+
+def parse_index_key(index_key):
+    """INDEX_KEY (年3碼 + 類別1碼 + 序號5碼 + 版本2碼) -> (年份, 序號)"""
+    return int(index_key[:3]), int(index_key[4:9])
+
+
+class YearState:
+    """單一年度：states[seq] 為狀態，attempts[seq] 為最後嘗試時間 (epoch 秒)"""
+
+    def __init__(self, size=0):
+        self.states = bytearray(size)
+        self.attempts = array('I', bytes(4 * size))
+
+    def grow(self, seq):
+        if seq >= len(self.states):
+            extra = max(seq + 1, len(self.states) * 2, 1024) - len(self.states)
+            self.states.extend(bytes(extra))
+            self.attempts.extend(array('I', bytes(4 * extra)))
+
+    def to_bytes(self):
+        attempts = array('I', self.attempts)
+        if sys.byteorder == 'big':
+            attempts.byteswap()
+        return MAGIC + struct.pack('<I', len(self.states)) + bytes(self.states) + attempts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, raw):
+        if raw[:4] != MAGIC:
+            raise ValueError("不是序號狀態檔")
+        (size,) = struct.unpack('<I', raw[4:8])
+        year = cls()
+        year.states = bytearray(raw[8:8 + size])
+        year.attempts = array('I')
+        year.attempts.frombytes(raw[8 + size:8 + size * 5])
+        if sys.byteorder == 'big':
+            year.attempts.byteswap()
+        return year
+
+
+def _apply(year_state, seq, state, at):
+    """把一次結果套用到年度陣列（規則見 SequenceStateIndex.record）"""
+    old = year_state.states[seq]
+    if not (old in (CRAWLED, EMPTY_FIELDS) and state in (FAILED, NO_DATA)):
+        year_state.states[seq] = state
+    year_state.attempts[seq] = max(at, year_state.attempts[seq])
+
+
+class SequenceStateIndex:
+    """各年度序號狀態，存放在本機目錄（每年一個檔案）"""
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        self.years = {}
+        self._dirty = {}  # year -> 本行程變更過的序號
+        self._lock = threading.Lock()
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if name.endswith('.bin') and name[:-4].isdigit():
+                    self.years[int(name[:-4])] = self._load(int(name[:-4]))
+
+    def _path(self, year):
+        return os.path.join(self.directory, f"{year}.bin")
+
+    def _load(self, year):
+        with open(self._path(year), 'rb') as f:
+            return YearState.from_bytes(f.read())
+
+    # ---- 更新 ----
+
+    def record(self, year, seq, state, at=None):
+        """記錄一次爬取結果
+
+        已有資料的序號不會因一次失敗或查無資料被降級（只更新嘗試時間）。
+        """
+        at = int(at if at is not None else time.time())
+        with self._lock:
+            year_state = self.years.setdefault(year, YearState())
+            year_state.grow(seq)
+            _apply(year_state, seq, state, at)
+            self._dirty.setdefault(year, set()).add(seq)
+
+    def record_result(self, index_key, result):
+        year, seq = parse_index_key(index_key)
+        self.record(year, seq, state_for(result))
+
+    def seed(self, permits):
+        """由現有資料集建立（只填入尚未記錄的序號）
+
+        Returns:
+            填入的序號數
+        """
+        added = 0
+        with self._lock:
+            for permit in permits:
+                year = permit.get('permitYear')
+                seq = permit.get('sequenceNumber')
+                if not year or not seq:
+                    continue
+                year_state = self.years.setdefault(year, YearState())
+                year_state.grow(seq)
+                if year_state.states[seq] == UNKNOWN:
+                    year_state.states[seq] = state_for(permit)
+                    self._dirty.setdefault(year, set()).add(seq)
+                    added += 1
+        return added
+
+    def save(self):
+        """寫回有變更的年度
+
+        先讀取檔案目前內容（其他行程可能已寫入），只套用本行程變更過的序號，
+        再寫暫存檔後改名，避免寫到一半中斷；合併結果同時更新記憶體中的狀態。
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, '.lock'), 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    for year, seqs in self._dirty.items():
+                        self.years[year] = self._merge(year, seqs)
+                    self._dirty.clear()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _merge(self, year, seqs):
+        """把本行程變更的序號套用到檔案目前的內容並寫回，回傳合併後的年度"""
+        mine = self.years[year]
+        path = self._path(year)
+        merged = self._load(year) if os.path.exists(path) else YearState()
+        for seq in sorted(seqs):
+            merged.grow(seq)
+            _apply(merged, seq, mine.states[seq], mine.attempts[seq])
+        with open(path + '.tmp', 'wb') as f:
+            f.write(merged.to_bytes())
+        os.replace(path + '.tmp', path)
+        return merged
+
+    # ---- 查詢 ----
+
+    def state(self, year, seq):
+        year_state = self.years.get(year)
+        if year_state is None or seq >= len(year_state.states):
+            return UNKNOWN
+        return year_state.states[seq]
+
+    def last_attempt(self, year, seq):
+        """最後嘗試時間 (datetime)，從未嘗試回傳 None"""
+        year_state = self.years.get(year)
+        if year_state is None or seq >= len(year_state.attempts) or not year_state.attempts[seq]:
+            return None
+        return datetime.fromtimestamp(year_state.attempts[seq])
+
+    def last_issued(self, year):
+        """已知有資料的最大序號，沒有則回傳 0"""
+        year_state = self.years.get(year)
+        if year_state is None:
+            return 0
+        for seq in range(len(year_state.states) - 1, 0, -1):
+            if year_state.states[seq] in (CRAWLED, EMPTY_FIELDS):
+                return seq
+        return 0
+
+    def counts(self, year, end=None):
+        """1..end（預設為 last_issued）各狀態的數量"""
+        end = self.last_issued(year) if end is None else end
+        year_state = self.years.get(year)
+        states = year_state.states[1:end + 1] if year_state else b''
+        result = {state: states.count(state) for state in STATE_NAMES}
+        result[UNKNOWN] += max(0, end - len(states))
+        return result
+
+    def sequences(self, year, states=GAP_STATES, start=1, end=None, retry_after=None):
+        """依序列出 start..end 中狀態屬於 states 的序號
+
+        Args:
+            end: 預設為 last_issued（最新已知有資料的序號之後不算缺漏）
+            retry_after: 秒數；最後嘗試在此時間內的序號略過（剛失敗的不立即重試）
+        """
+        end = self.last_issued(year) if end is None else end
+        wanted = set(states)
+        cutoff = time.time() - retry_after if retry_after else None
+        year_state = self.years.get(year)
+        for seq in range(max(start, 1), end + 1):
+            if year_state is None or seq >= len(year_state.states):
+                if UNKNOWN in wanted:
+                    yield seq
+                continue
+            if year_state.states[seq] not in wanted:
+                continue
+            if cutoff is not None and year_state.attempts[seq] > cutoff:
+                continue
+            yield seq
+
+    def ranges(self, year, states=GAP_STATES, start=1, end=None, retry_after=None):
+        """需要處理的序號合併成最少的連續區間 [(起, 迄)]"""
+        ranges = []
+        for seq in self.sequences(year, states, start, end, retry_after):
+            if ranges and ranges[-1][1] == seq - 1:
+                ranges[-1][1] = seq
+            else:
+                ranges.append([seq, seq])
+        return [tuple(r) for r in ranges]
+
+
+def print_summary(index, years=None):
+    for year in years or sorted(index.years):
+        end = index.last_issued(year)
+        counts = index.counts(year, end)
+        detail = ', '.join(f"{STATE_NAMES[s]} {n}" for s, n in counts.items() if n)
+        print(f"   {year}年 (1-{end:05d}): {detail}")
+
+
+if __name__ == "__main__":
+    index = SequenceStateIndex()
+    if len(sys.argv) > 1 and sys.argv[1] == "show":
+        years = [int(y) for y in sys.argv[2:]] or None
+        if not index.years:
+            print("ℹ️ 尚無序號狀態，請先執行: python optimized-crawler-stable.py seed-state")
+        print_summary(index, years)
+    elif len(sys.argv) > 2 and sys.argv[1] == "ranges":
+        year = int(sys.argv[2])
+        gaps = index.ranges(year)
+        print(f"📋 {year}年需要補爬 {sum(e - s + 1 for s, e in gaps)} 筆，{len(gaps)} 個區間")
+        for start, end in gaps:
+            print(f"   {start:05d}-{end:05d} ({end - start + 1}筆)")
+    else:
+        print(__doc__)
@@ -24,7 +24,6 @@ if __name__ == "__main__":
     
     # 創建爬蟲實例
     crawler = OptimizedCrawler()
-    crawler.request_delay = 0.8  # 可調整延遲
     crawler.batch_size = 30       # 可調整批次大小
     
     # 開始爬取
@@ -8,8 +8,11 @@ from flask import Flask, jsonify, request, send_file
 from flask_cors import CORS
 import json
 import os
-import subprocess
+import threading
 from baojia_realtime_filter import BaojiaRealtimeFilter
+from baojia_tags import BaojiaTagView
+from permit_dataset import PermitDataset
+from permit_index import PermitIndex
 
 app = Flask(__name__)
 CORS(app)
@@ -17,6 +20,35 @@ CORS(app)
 # 初始化寶佳篩選器
 baojia_filter = BaojiaRealtimeFilter()
 
+# 建照資料集記憶體快取（背景依 ETag 重新驗證）
+dataset = PermitDataset(refresh_interval=int(os.environ.get('DATASET_REFRESH_SECONDS', 60))).start()
+
+# 寶佳標記：讀取寫入時預先計算的欄位，只補上公司清單換版後尚未寫回的差異
+baojia_view = BaojiaTagView(baojia_filter)
+
+# 搜尋索引，資料集換版時增量更新
+permit_index = PermitIndex(baojia_view.is_baojia)
+
+def _on_dataset_change(snapshot):
+    baojia_view.rebuild(snapshot)
+    permit_index.build(snapshot.permits)
+
+dataset.on_change(_on_dataset_change)
+
+def _retag_changed():
+    """背景重新標記：只更新寶佳公司改變的建照"""
+    try:
+        affected = baojia_view.rebuild(dataset.get())
+        permit_index.update_baojia({k: company is not None for k, company in affected.items()})
+        print(f"🏷️ 公司清單換版，{len(affected)} 筆建照寶佳標記改變")
+    except Exception as e:
+        print(f"⚠️ 重新標記失敗: {e}")
+
+# 公司清單換版（重新驗證發現新 ETag 或本機新增/刪除）時在背景重新標記，不阻塞請求
+baojia_filter.on_companies_changed(
+    lambda: threading.Thread(target=_retag_changed, name='baojia-retag', daemon=True).start()
+)
+
 @app.route('/')
 def index():
     """首頁 - 返回前端介面"""
@@ -26,97 +58,89 @@ def index():
 def get_all_permits():
     """取得所有建照資料"""
     try:
-        # 下載最新資料
-        permits_file = '/tmp/all_permits.json'
-        
-        subprocess.run([
-            'oci', 'os', 'object', 'get',
-            '--namespace', 'nrsdi1rz5vl8',
-            '--bucket-name', 'taichung-building-permits',
-            '--name', 'data/permits.json',
-            '--file', permits_file
-        ], capture_output=True, check=True)
+        baojia_filter.refresh_companies()
+        snapshot = dataset.get()
         
-        with open(permits_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # 為每筆資料添加寶佳標記
-        permits = data.get('permits', [])
-        for permit in permits:
-            applicant = permit.get('applicantName', '')
-            permit['isBaojia'] = baojia_filter.is_baojia_company(applicant)
+        # 寶佳標記已在寫入時計算；只有換版後標記改變的建照才複製一份（不修改共用快取）
+        permits = [baojia_view.view(permit) for permit in snapshot.permits]
         
         return jsonify({
             'permits': permits,
             'totalCount': len(permits),
-            'lastUpdated': data.get('lastUpdated', ''),
+            'lastUpdated': snapshot.last_updated,
             'baojiCompaniesCount': len(baojia_filter.companies)
         })
         
     except Exception as e:
         return jsonify({'error': f'載入建照資料失敗: {str(e)}'}), 500
 
+def _range_param(data, name):
+    """讀取 xxxMin / xxxMax 範圍參數"""
+    low = data.get(f'{name}Min')
+    high = data.get(f'{name}Max')
+    return (low if low != '' else None, high if high != '' else None)
+
 @app.route('/api/permits/search', methods=['POST'])
 def search_permits():
-    """智慧搜尋建照"""
+    """智慧搜尋建照（索引查詢，支援範圍、facet 與分頁）
+    
+    參數: search, baojiOnly, district, year, floorsMin/Max, unitsMin/Max,
+          areaMin/Max, issueDateFrom/To, page, pageSize
+    """
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         search_term = data.get('search', '').lower().strip()
         baojia_only = data.get('baojiOnly', False)
         
-        # 取得所有建照
-        permits_file = '/tmp/search_permits.json'
-        subprocess.run([
-            'oci', 'os', 'object', 'get',
-            '--namespace', 'nrsdi1rz5vl8',
-            '--bucket-name', 'taichung-building-permits',
-            '--name', 'data/permits.json',
-            '--file', permits_file
-        ], capture_output=True, check=True)
+        baojia_filter.refresh_companies()
+        snapshot = dataset.get()
         
-        with open(permits_file, 'r', encoding='utf-8') as f:
-            all_data = json.load(f)
+        ranges = {
+            'floors': _range_param(data, 'floors'),
+            'units': _range_param(data, 'units'),
+            'area': _range_param(data, 'area'),
+            'issueDate': (data.get('issueDateFrom') or None, data.get('issueDateTo') or None),
+        }
+        years = data.get('year') or []
+        if not isinstance(years, list):
+            years = [years]
+        facet_filters = {
+            'district': data.get('district'),
+            'permitYear': [int(y) for y in years],
+        }
         
-        permits = all_data.get('permits', [])
-        filtered_permits = []
-        
-        for permit in permits:
-            # 寶佳篩選
-            applicant = permit.get('applicantName', '')
-            is_baojia = baojia_filter.is_baojia_company(applicant)
-            permit['isBaojia'] = is_baojia
-            
-            if baojia_only and not is_baojia:
-                continue
-            
-            # 智慧搜尋
-            if search_term:
-                searchable_text = ' '.join([
-                    permit.get('permitNumber', ''),
-                    permit.get('applicantName', ''),
-                    permit.get('constructionAddress', ''),
-                    permit.get('projectName', '')
-                ]).lower()
-                
-                if search_term not in searchable_text:
-                    continue
-            
-            filtered_permits.append(permit)
+        result = permit_index.search(
+            search_term,
+            baojia_only=baojia_only,
+            ranges=ranges,
+            facet_filters=facet_filters,
+            page=data.get('page', 1),
+            page_size=min(int(data.get('pageSize', 50)), 1000)
+        )
         
         return jsonify({
-            'permits': filtered_permits,
-            'totalCount': len(filtered_permits),
+            'permits': result['permits'],
+            'totalCount': result['total'],
+            'page': result['page'],
+            'pageSize': result['pageSize'],
+            'facets': result['facets'],
             'searchTerm': search_term,
             'baojiOnly': baojia_only,
-            'lastUpdated': all_data.get('lastUpdated', '')
+            'lastUpdated': snapshot.last_updated
         })
         
     except Exception as e:
         return jsonify({'error': f'搜尋失敗: {str(e)}'}), 500
 
+@app.route('/api/permits/cache', methods=['GET'])
+def get_cache_status():
+    """資料集快取狀態"""
+    return jsonify(dataset.status())
+
 @app.route('/api/baojia/companies', methods=['GET'])
 def get_baojia_companies():
     """取得寶佳機構公司清單"""
+    baojia_filter.refresh_companies()
     return jsonify({
         'companies': sorted(list(baojia_filter.companies)),
         'count': len(baojia_filter.companies)
@@ -141,7 +165,7 @@ def manage_baojia_company():
                     'companies': sorted(list(baojia_filter.companies))
                 })
             else:
-                return jsonify({'error': '公司已存在或名稱無效'}), 400
+                return jsonify({'error': '公司已存在、名稱無效或同步失敗'}), 400
         
         elif action == 'remove':
             success = baojia_filter.remove_company_realtime(company_name)
@@ -151,7 +175,7 @@ def manage_baojia_company():
                     'companies': sorted(list(baojia_filter.companies))
                 })
             else:
-                return jsonify({'error': '公司不存在'}), 404
+                return jsonify({'error': '公司不存在或同步失敗'}), 404
         
         else:
             return jsonify({'error': '無效的操作'}), 400
@@ -163,44 +187,23 @@ def manage_baojia_company():
 def get_baojia_stats():
     """取得寶佳機構統計資料"""
     try:
-        # 下載最新資料
-        permits_file = '/tmp/baojia_stats.json'
-        subprocess.run([
-            'oci', 'os', 'object', 'get',
-            '--namespace', 'nrsdi1rz5vl8',
-            '--bucket-name', 'taichung-building-permits',
-            '--name', 'data/permits.json',
-            '--file', permits_file
-        ], capture_output=True, check=True)
+        baojia_filter.refresh_companies()
+        snapshot = dataset.get()
         
-        with open(permits_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        permits = data.get('permits', [])
-        baojia_permits = []
-        company_stats = {}
-        
-        for permit in permits:
-            applicant = permit.get('applicantName', '')
-            if baojia_filter.is_baojia_company(applicant):
-                baojia_permits.append(permit)
-                
-                # 統計各公司建案數
-                matched_company = applicant
-                for company in baojia_filter.companies:
-                    if baojia_filter._smart_match(applicant, company):
-                        matched_company = company
-                        break
-                
-                company_stats[matched_company] = company_stats.get(matched_company, 0) + 1
+        # 預先彙總的統計（壓實時產生，換版後由背景重新計算）
+        stats = baojia_view.stats
+        if stats is None:
+            baojia_view.rebuild(snapshot)
+            stats = baojia_view.stats
+        company_stats = stats['companyStats']
         
         return jsonify({
             'totalCompanies': len(baojia_filter.companies),
-            'totalBaojiPermits': len(baojia_permits),
-            'totalPermits': len(permits),
+            'totalBaojiPermits': stats['totalBaojiPermits'],
+            'totalPermits': stats['totalPermits'],
             'companyStats': company_stats,
             'topCompanies': sorted(company_stats.items(), key=lambda x: x[1], reverse=True)[:10],
-            'lastUpdated': data.get('lastUpdated', '')
+            'lastUpdated': snapshot.last_updated
         })
         
     except Exception as e:
@@ -210,29 +213,15 @@ def get_baojia_stats():
 def check_permit(permit_number):
     """檢查單筆建照是否為寶佳機構"""
     try:
-        # 下載最新資料
-        permits_file = '/tmp/check_permit.json'
-        subprocess.run([
-            'oci', 'os', 'object', 'get',
-            '--namespace', 'nrsdi1rz5vl8',
-            '--bucket-name', 'taichung-building-permits',
-            '--name', 'data/permits.json',
-            '--file', permits_file
-        ], capture_output=True, check=True)
-        
-        with open(permits_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
         # 尋找指定建照
-        for permit in data.get('permits', []):
+        for permit in dataset.get().permits:
             if permit.get('permitNumber') == permit_number:
-                applicant = permit.get('applicantName', '')
-                is_baojia = baojia_filter.is_baojia_company(applicant)
+                permit = baojia_view.view(permit)
                 
                 return jsonify({
                     'permitNumber': permit_number,
-                    'applicantName': applicant,
-                    'isBaojia': is_baojia,
+                    'applicantName': permit.get('applicantName', ''),
+                    'isBaojia': permit['isBaojia'],
                     'permitData': permit
                 })
         
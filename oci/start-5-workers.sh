@@ -35,61 +35,28 @@ if [ $START -lt 881 ]; then
     START=881
 fi
 
-# 每個進程處理200個序號
-CHUNK=200
+# 5個進程共處理1000個序號：切成20筆一個區塊放進工作佇列，worker 依完成速度自行領取
+END=$((START + 999))
 
 echo ""
-echo "📋 工作分配:"
+echo "📋 工作分配: 114年 $START - $END"
+python3 work_queue.py add 114 $START $END 20
 
 # 啟動5個工作進程
 for i in {1..5}; do
-    WORKER_START=$((START + (i-1) * CHUNK))
-    WORKER_END=$((WORKER_START + CHUNK - 1))
-    
-    echo "   Worker $i: $WORKER_START - $WORKER_END"
-    
-    # 創建並執行工作腳本
-    cat > worker_$i.sh << EOF
-#!/bin/bash
-cd "/mnt/c/claude code/建照爬蟲/oci"
-python3 -c "
-import sys
-sys.path.append('.')
-# 載入爬蟲類別
-exec(open('optimized-crawler.py').read().split('if __name__ == \"__main__\":')[0])
-
-# 建立爬蟲實例
-crawler = OptimizedCrawler()
-crawler.request_delay = 1.5  # 增加延遲避免並發問題
-crawler.batch_size = 20
-
-print(f'🔧 Worker $i: 爬取 114年 $WORKER_START-$WORKER_END')
-print('=' * 70)
-
-try:
-    crawler.crawl_year_range(114, $WORKER_START, $WORKER_END, False)
-    print(f'\\n✅ Worker $i 完成任務')
-except Exception as e:
-    print(f'\\n❌ Worker $i 錯誤: {e}')
-    crawler.save_progress()
-"
-EOF
-    
-    chmod +x worker_$i.sh
-    
-    # 啟動工作進程
     LOG_FILE="worker_${i}_$(date +%Y%m%d_%H%M%S).log"
-    nohup ./worker_$i.sh > $LOG_FILE 2>&1 &
+    nohup python3 optimized-crawler-stable.py work worker-114-$i > $LOG_FILE 2>&1 &
     PID=$!
     echo "   ✅ Worker $i 已啟動 (PID: $PID, Log: $LOG_FILE)"
     
-    sleep 2  # 避免同時啟動造成問題
+    sleep 2  # 錯開暖機
 done
 
 echo ""
 echo "💡 監控指令:"
-echo "   查看所有工作進程: ps aux | grep 'worker_[0-9].sh' | grep -v grep"
+echo "   查看佇列進度: python3 work_queue.py status"
+echo "   查看所有工作進程: ps aux | grep 'optimized-crawler-stable.py work' | grep -v grep"
 echo "   查看工作日誌: tail -f worker_1_*.log"
-echo "   停止所有工作進程: pkill -f 'worker_[0-9].sh'"
+echo "   停止所有工作進程: pkill -INT -f 'optimized-crawler-stable.py work'"
 echo ""
-echo "✅ 5個並行爬蟲已啟動！"
\ No newline at end of file
+echo "✅ 5個並行爬蟲已啟動！"
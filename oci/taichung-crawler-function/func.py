@@ -47,6 +47,14 @@ class TaichungBuildingCrawler:
         self.crawl_type = 1
         self.delay_ms = 2000
         
+        # 失敗的 INDEX_KEY 存在 Object Storage 的延遲重試佇列（格式同 retry_queue.py），
+        # 下次執行時退避時間已到的才重試，不在同一次執行中 sleep 原地重試
+        self.retry_object = "data/retry-queue.json"
+        self.retry_base_delay = 3600  # 每日執行一次，第一次重試至少隔一小時
+        self.retry_max_delay = 7 * 86400
+        self.retry_max_attempts = 5
+        self.retry_per_run = 10
+        
         # 初始化OCI Object Storage客戶端
         self.object_storage_client = oci.object_storage.ObjectStorageClient({})
         
@@ -75,44 +83,87 @@ class TaichungBuildingCrawler:
             "version": int(index_key[9:11])
         }
 
-    def fetch_page_with_retry(self, index_key, max_retries=3):
-        """獲取頁面內容（含重新整理機制）"""
+    def fetch_page(self, index_key):
+        """獲取頁面內容（兩段式：第一次建立 session，第二次取得資料），不原地重試
+
+        Returns:
+            頁面文字、"NO_DATA"（查無資料），或 None（失敗，由呼叫端排入重試佇列）
+        """
         url = f"{self.base_url}?INDEX_KEY={index_key}"
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8'
+        }
         
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"🔍 爬取 INDEX_KEY: {index_key} (嘗試 {attempt + 1}/{max_retries})")
-                
-                # 第一次請求
-                response = requests.get(url, headers={
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8'
-                }, timeout=30)
-
-                if response.status_code == 200:
-                    time.sleep(1)  # 等待1秒
-                    
-                    # 第二次請求（重新整理）
-                    response = requests.get(url, headers={
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                        'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8'
-                    }, timeout=30)
-
-                    if response.status_code == 200:
-                        text = response.text
-                        if '建築執照號碼' in text or '○○○代表遺失個資歡迎' in text:
-                            return text
-                        
-            except Exception as e:
-                logger.error(f"❌ 獲取頁面錯誤 (嘗試 {attempt + 1}/{max_retries}): {e}")
-                
-            if attempt < max_retries - 1:
-                time.sleep(2)
+        try:
+            logger.info(f"🔍 爬取 INDEX_KEY: {index_key}")
+            session = requests.Session()
+            
+            # 第一次請求
+            response = session.get(url, headers=headers, timeout=30)
+            if response.status_code != 200:
+                return None
+            time.sleep(1)  # 等待1秒
+            
+            # 第二次請求（重新整理）
+            response = session.get(url, headers=headers, timeout=30)
+            if response.status_code != 200:
+                return None
+            text = response.text
+            if '查無任何資訊' in text:
+                return "NO_DATA"
+            if any(mark in text for mark in ('建造執照號碼', '建築執照號碼', '○○○代表遺失個資歡迎')):
+                return text
+            
+        except Exception as e:
+            logger.error(f"❌ 獲取頁面錯誤: {e}")
         
         return None
 
+    def load_retry_queue(self):
+        """載入延遲重試佇列 {"retries": {INDEX_KEY: {...}}, "dead": {...}}"""
+        try:
+            response = self.object_storage_client.get_object(
+                namespace_name=self.namespace,
+                bucket_name=self.bucket_name,
+                object_name=self.retry_object
+            )
+            queue = json.loads(response.data.content.decode('utf-8'))
+        except Exception:
+            queue = {}
+        queue.setdefault("retries", {})
+        queue.setdefault("dead", {})
+        return queue
+
+    def save_retry_queue(self, queue):
+        try:
+            self.object_storage_client.put_object(
+                namespace_name=self.namespace,
+                bucket_name=self.bucket_name,
+                object_name=self.retry_object,
+                put_object_body=json.dumps(queue, ensure_ascii=False, indent=1).encode('utf-8'),
+                content_type="application/json"
+            )
+        except Exception as e:
+            logger.error(f"儲存重試佇列錯誤: {e}")
+
+    def schedule_retry(self, queue, index_key, error):
+        """記錄一次失敗：指數退避加隨機抖動排定下次重試，失敗太多次移到無法完成清單"""
+        now = time.time()
+        entry = queue["retries"].pop(index_key, None) or {"attempts": 0, "firstFailedAt": now}
+        entry["attempts"] += 1
+        entry["lastError"] = error
+        entry["lastFailedAt"] = now
+        if entry["attempts"] >= self.retry_max_attempts:
+            entry.pop("nextAt", None)
+            queue["dead"][index_key] = entry
+            logger.error(f"☠️ {index_key} 已失敗 {entry['attempts']} 次，移到無法完成清單")
+            return
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (entry["attempts"] - 1))
+        entry["nextAt"] = now + delay * random.uniform(0.5, 1.5)
+        queue["retries"][index_key] = entry
+
     def parse_permit_data(self, html_content, index_key):
         """解析建照資料"""
         try:
@@ -342,13 +393,19 @@ class TaichungBuildingCrawler:
             return 0
         return max([p.get("sequenceNumber", 0) for p in filtered])
 
-    def crawl_single_permit(self, index_key):
-        """爬取單一建照"""
+    def crawl_single_permit(self, index_key, retry_queue=None):
+        """爬取單一建照；失敗時排入重試佇列，取得結果時移出"""
         try:
-            html_content = self.fetch_page_with_retry(index_key)
+            html_content = self.fetch_page(index_key)
             if not html_content:
                 logger.error(f"❌ 無法獲取頁面: {index_key}")
                 self.stats["errorRecords"] += 1
+                if retry_queue is not None:
+                    self.schedule_retry(retry_queue, index_key, "fetch failed")
+                return None
+            if retry_queue is not None:
+                retry_queue["retries"].pop(index_key, None)
+            if html_content == "NO_DATA":
                 return None
 
             permit_data = self.parse_permit_data(html_content, index_key)
@@ -384,15 +441,26 @@ class TaichungBuildingCrawler:
             logger.info(f"🔢 從序號 {current_sequence} 開始爬取")
 
             new_permits = []
+            existing_keys = {p.get("indexKey") for p in existing_permits}
+
+            # 先重試退避時間已到的失敗序號
+            retry_queue = self.load_retry_queue()
+            now = time.time()
+            due = sorted((e["nextAt"], k) for k, e in retry_queue["retries"].items() if e["nextAt"] <= now)
+            for _, index_key in due[:self.retry_per_run]:
+                permit_data = self.crawl_single_permit(index_key, retry_queue)
+                if permit_data and index_key not in existing_keys:
+                    new_permits.append(permit_data)
+                time.sleep(self.delay_ms / 1000)
 
             # 限制Functions執行時間，最多爬取50筆
             while consecutive_failures < max_consecutive_failures and len(new_permits) < 50:
                 index_key = self.generate_index_key(self.start_year, self.crawl_type, current_sequence)
-                permit_data = self.crawl_single_permit(index_key)
+                permit_data = self.crawl_single_permit(index_key, retry_queue)
 
                 if permit_data:
                     # 檢查是否已存在
-                    exists = any(p.get("indexKey") == index_key for p in existing_permits)
+                    exists = index_key in existing_keys
                     if not exists:
                         new_permits.append(permit_data)
                         consecutive_failures = 0
@@ -416,6 +484,7 @@ class TaichungBuildingCrawler:
 
             # 儲存資料
             self.save_data(all_permits)
+            self.save_retry_queue(retry_queue)
 
             self.stats["endTime"] = datetime.now()
             self.save_log()
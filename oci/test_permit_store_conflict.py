@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快照條件式發佈測試 - 兩個寫入端同時壓實 / 改寫快照時不可遺失任何 segment 的建照
+以本機目錄 (LocalStorage) 模擬 bucket，不需要 OCI 帳號
+
+使用方式:
+    python -m pytest test_permit_store_conflict.py
+"""
+
+from object_storage import LocalStorage
+from permit_store import PermitStore, SNAPSHOT_NAME
+
+
+class InterleavedStorage:
+    """第一次發佈快照前先執行 before_publish()，模擬另一個寫入端在讀取與發佈之間搶先更新"""
+
+    def __init__(self, storage, before_publish):
+        self._storage = storage
+        self._before_publish = before_publish
+
+    def __getattr__(self, name):
+        return getattr(self._storage, name)
+
+    def put_bytes(self, name, data, *args, **kwargs):
+        if name == SNAPSHOT_NAME and self._before_publish is not None:
+            hook, self._before_publish = self._before_publish, None
+            hook()
+        return self._storage.put_bytes(name, data, *args, **kwargs)
+
+
+def make_permits(year, start, count):
+    return [{
+        'indexKey': f"{year}1{seq:05d}00",
+        'permitYear': year,
+        'sequenceNumber': seq,
+        'permitNumber': f"{year}中都建字第{seq:05d}號",
+        'applicantName': f"測試起造人{seq}",
+    } for seq in range(start, start + count)]
+
+
+def snapshot_keys(storage):
+    return {p['indexKey'] for p in PermitStore(storage).load_snapshot().get('permits', [])}
+
+
+def test_conflicting_compactions(tmp_path):
+    """A 讀取快照後、發佈前，B 追加並壓實自己的 segment；A 重試後兩邊的建照都要在快照中"""
+    storage = LocalStorage(str(tmp_path))
+    store_b = PermitStore(storage)
+    seed = make_permits(114, 1, 5)
+    store_b.append_segment(seed)
+    store_b.compact()
+
+    permits_a = make_permits(114, 100, 5)
+    permits_b = make_permits(114, 200, 5)
+
+    def writer_b():
+        store_b.append_segment(permits_b)
+        assert store_b.compact()
+
+    store_a = PermitStore(InterleavedStorage(storage, writer_b))
+    store_a.append_segment(permits_a)
+    ok = store_a.compact()
+
+    expected = {p['indexKey'] for p in seed + permits_a + permits_b}
+    missing = expected - snapshot_keys(storage)
+    pending = store_b.pending_segments()
+    assert ok
+    assert not missing
+    assert not pending
+
+
+def test_update_snapshot_conflict(tmp_path):
+    """清理腳本改寫快照時，另一個寫入端搶先壓實新的 segment；重試後新建照不可被覆蓋掉"""
+    storage = LocalStorage(str(tmp_path))
+    store_b = PermitStore(storage)
+    seed = make_permits(113, 1, 5)
+    store_b.append_segment(seed)
+    store_b.compact()
+
+    permits_b = make_permits(113, 300, 5)
+
+    def writer_b():
+        store_b.append_segment(permits_b)
+        assert store_b.compact()
+
+    removed = seed[0]['indexKey']
+    store_a = PermitStore(InterleavedStorage(storage, writer_b))
+    ok = store_a.update_snapshot(lambda permits: [p for p in permits if p['indexKey'] != removed])
+
+    expected = {p['indexKey'] for p in seed[1:] + permits_b}
+    keys = snapshot_keys(storage)
+    missing = expected - keys
+    assert ok
+    assert not missing
+    assert removed not in keys
@@ -4,24 +4,16 @@
 """
 
 import json
-import subprocess
 import re
 from datetime import datetime
 
+from object_storage import open_storage
+
 def get_latest_permits():
     """取得最新的建照資料"""
     try:
-        cmd = ["oci", "os", "object", "get",
-               "--namespace", "nrsdi1rz5vl8",
-               "--bucket-name", "taichung-building-permits",
-               "--name", "permits.json",
-               "--file", "/tmp/permits.json"]
-        result = subprocess.run(cmd, capture_output=True)
-        
-        if result.returncode == 0:
-            with open('/tmp/permits.json', 'r', encoding='utf-8') as f:
-                permits = json.load(f)
-            
+        permits = open_storage().get_json("permits.json")
+        if permits is not None:
             # 按 indexKey 排序，取最新的5筆
             if permits:
                 permits_sorted = sorted(permits, key=lambda x: x.get('indexKey', ''), reverse=True)
@@ -102,21 +94,8 @@ def main():
     print(f"  113年: {progress['113']['current']}")
     print(f"  112年: {progress['112']['current']}")
     
-    # 儲存記錄
-    with open('/tmp/latest-execution-record.json', 'w', encoding='utf-8') as f:
-        json.dump(execution_record, f, ensure_ascii=False, indent=2)
-    
     # 上傳到OCI
-    cmd = ["oci", "os", "object", "put",
-           "--namespace", "nrsdi1rz5vl8",
-           "--bucket-name", "taichung-building-permits",
-           "--name", "logs/latest-execution-record.json",
-           "--file", "/tmp/latest-execution-record.json",
-           "--content-type", "application/json",
-           "--force"]
-    
-    result = subprocess.run(cmd, capture_output=True)
-    if result.returncode == 0:
+    if open_storage().put_json("logs/latest-execution-record.json", execution_record, indent=2):
         print("✅ 執行記錄已更新")
     else:
         print("❌ 上傳失敗")
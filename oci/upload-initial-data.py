@@ -3,20 +3,19 @@
 上傳初始資料到OCI Object Storage
 """
 
-import oci
 import json
 import sys
 from datetime import datetime
 
+from object_storage import open_storage
+
 def upload_to_oci():
     """上傳資料到OCI"""
     try:
         # 初始化OCI客戶端
-        config = {}
-        object_storage_client = oci.object_storage.ObjectStorageClient(config)
-        
         namespace = "nrsdi1rz5vl8"
         bucket_name = "taichung-building-permits"
+        storage = open_storage(namespace, bucket_name)
         
         print("🚀 開始上傳資料到OCI Object Storage")
         print(f"Namespace: {namespace}")
@@ -31,13 +30,8 @@ def upload_to_oci():
         
         # 上傳建照資料
         print("  上傳 permits.json...", end='')
-        object_storage_client.put_object(
-            namespace_name=namespace,
-            bucket_name=bucket_name,
-            object_name="data/permits.json",
-            put_object_body=json.dumps(permits_data, ensure_ascii=False, indent=2).encode('utf-8'),
-            content_type="application/json"
-        )
+        if not storage.put_json("data/permits.json", permits_data, indent=2):
+            raise RuntimeError("data/permits.json 上傳失敗")
         print(" ✅")
         
         # 讀取執行記錄
@@ -48,13 +42,8 @@ def upload_to_oci():
         
         # 上傳執行記錄
         print("  上傳 crawl-logs.json...", end='')
-        object_storage_client.put_object(
-            namespace_name=namespace,
-            bucket_name=bucket_name,
-            object_name="data/crawl-logs.json",
-            put_object_body=json.dumps(logs_data, ensure_ascii=False, indent=2).encode('utf-8'),
-            content_type="application/json"
-        )
+        if not storage.put_json("data/crawl-logs.json", logs_data, indent=2):
+            raise RuntimeError("data/crawl-logs.json 上傳失敗")
         print(" ✅")
         
         print("\n✅ 資料上傳成功！")
@@ -5,10 +5,11 @@
 """
 
 import json
-import oci
 from datetime import datetime
 import random
 
+from object_storage import open_storage
+
 def generate_permits_112_114():
     """生成112-114年的建照資料"""
     permits = []
@@ -128,9 +129,9 @@ def upload_to_oci():
     """上傳資料到OCI"""
     try:
         # 初始化OCI客戶端
-        client = oci.object_storage.ObjectStorageClient({})
         namespace = "nrsdi1rz5vl8"
         bucket_name = "taichung-building-permits"
+        storage = open_storage(namespace, bucket_name)
         
         print("✅ OCI客戶端初始化成功")
         
@@ -151,15 +152,8 @@ def upload_to_oci():
         
         # 上傳建照資料
         print("📤 上傳建照資料...")
-        content = json.dumps(data, ensure_ascii=False, indent=2)
-        
-        client.put_object(
-            namespace_name=namespace,
-            bucket_name=bucket_name,
-            object_name="data/permits.json",
-            put_object_body=content.encode('utf-8'),
-            content_type="application/json"
-        )
+        if not storage.put_json("data/permits.json", data, indent=2):
+            raise RuntimeError("data/permits.json 上傳失敗")
         
         print(f"✅ 已上傳 {len(permits)} 筆建照資料")
         print(f"   112年: {data['yearCounts'][112]} 筆")
@@ -191,23 +185,16 @@ def upload_to_oci():
         # 上傳記錄
         print("\n📤 上傳執行記錄...")
         log_data = {"logs": logs}
-        log_content = json.dumps(log_data, ensure_ascii=False, indent=2)
-        
-        client.put_object(
-            namespace_name=namespace,
-            bucket_name=bucket_name,
-            object_name="data/crawl-logs.json",
-            put_object_body=log_content.encode('utf-8'),
-            content_type="application/json"
-        )
+        if not storage.put_json("data/crawl-logs.json", log_data, indent=2):
+            raise RuntimeError("data/crawl-logs.json 上傳失敗")
         
         print("✅ 已上傳執行記錄")
         
         # 確認已上傳
         print("\n📋 已上傳的檔案:")
-        objects = client.list_objects(namespace, bucket_name, prefix="data/")
-        for obj in objects.data.objects:
-            print(f"   - {obj.name} ({obj.size} bytes)")
+        for name in storage.list_names("data/"):
+            info = storage.head(name) or {}
+            print(f"   - {name} ({info.get('content-length', '?')} bytes)")
         
         print("\n🎉 資料上傳完成！")
         print(f"監控網頁: https://objectstorage.ap-tokyo-1.oraclecloud.com/n/{namespace}/b/{bucket_name}/o/index-new.html")
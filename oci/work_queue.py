@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+補爬工作佇列 - 租約制分派序號區塊
+取代 worker_N / worker_113_N / smart_worker_N 各自寫死 tasks 範圍的作法
+（某個 worker 慢或掛掉，它的範圍就停住，其他 worker 早已閒置）：
+1. 範圍切成小區塊放進佇列，worker 每次租用一個區塊，租約有期限，爬取時持續續約並回報進度
+2. worker 掛掉（租約過期）時，區塊由其他 worker 從最後已上傳的序號接手
+3. 沒有待分派的區塊時，向剩餘最多的進行中區塊「偷」後半段，所有 worker 幾乎同時完成
+4. 佇列狀態放在可替換的後端：本機用 SQLite 或 JSON 檔（檔案鎖保護），
+   任何數量的行程隨時加入或離開；後端只需提供 transaction()
+
+使用方式:
+    python work_queue.py add <年份> <起> <迄> [區塊大小]   # 加入範圍
+    python work_queue.py add-gaps [年份...]               # 依序號狀態索引加入缺漏區間
+    python work_queue.py status                          # 佇列狀態
+    python optimized-crawler-stable.py work <worker名稱>   # 啟動 worker（可開多個）
+"""
+
+import json
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+from crawl_journal import CrawlJournal
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX 平台：JSON 檔後端只適合單一行程
+    fcntl = None
+
+DEFAULT_PATH = 'work-queue.sqlite'
+
+# 區塊狀態
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+
+FIELDS = ('id', 'year', 'start', 'end', 'nextSeq', 'cursor', 'state', 'owner', 'expires', 'attempts', 'updated')
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class SQLiteBackend:
+    """SQLite 後端：每個交易以 BEGIN IMMEDIATE 取得寫入鎖，只寫回有變更的區塊"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, year INTEGER, start INTEGER, "
+                       "end INTEGER, nextSeq INTEGER, cursor INTEGER, state TEXT, owner TEXT, expires REAL, "
+                       "attempts INTEGER, updated REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    @contextmanager
+    def transaction(self):
+        """取得 {'chunks': [區塊 dict], 'meta': {}}，離開時寫回"""
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute(f"SELECT {', '.join(FIELDS)} FROM chunks ORDER BY id").fetchall()
+            chunks = [dict(zip(FIELDS, row)) for row in rows]
+            original = {chunk['id']: dict(chunk) for chunk in chunks}
+            meta = dict(db.execute("SELECT key, value FROM meta").fetchall())
+            state = {'chunks': chunks, 'meta': dict(meta)}
+            yield state
+            for chunk in state['chunks']:
+                if original.get(chunk['id']) != chunk:
+                    db.execute(f"INSERT OR REPLACE INTO chunks ({', '.join(FIELDS)}) "
+                               f"VALUES ({', '.join('?' * len(FIELDS))})", [chunk[f] for f in FIELDS])
+            for key, value in state['meta'].items():
+                if meta.get(key) != value:
+                    db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+
+class FileBackend:
+    """JSON 檔後端：整份讀寫，以旁邊的 .lock 檔加檔案鎖（同機多行程）"""
+
+    def __init__(self, path='work-queue.json'):
+        self.path = path
+
+    @contextmanager
+    def transaction(self):
+        with open(self.path + '.lock', 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                state = {'chunks': [], 'meta': {}}
+                if os.path.exists(self.path):
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        state = json.load(f)
+                yield state
+                with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(state, f, ensure_ascii=False)
+                os.replace(self.path + '.tmp', self.path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def open_backend(path=DEFAULT_PATH):
+    """依副檔名選擇後端：.json 為 JSON 檔，其他為 SQLite"""
+    if path.endswith('.json'):
+        return FileBackend(path)
+    return SQLiteBackend(path)
+
+
+class WorkQueue:
+    """序號區塊佇列
+
+    Args:
+        backend: 提供 transaction() 的後端
+        min_steal: 偷取時雙方至少各留下的序號數
+    """
+
+    def __init__(self, backend=None, min_steal=5):
+        self.backend = backend or SQLiteBackend()
+        self.min_steal = min_steal
+
+    # ---- 加入工作 ----
+
+    def add_range(self, year, start, end, chunk_size=20):
+        """把 start..end 切成區塊加入佇列（相同區塊已存在則略過）
+
+        Returns:
+            新加入的區塊數
+        """
+        added = 0
+        with self.backend.transaction() as state:
+            chunks = state['chunks']
+            existing = {(c['year'], c['start'], c['end']) for c in chunks}
+            next_id = max((c['id'] for c in chunks), default=0) + 1
+            for low in range(start, end + 1, chunk_size):
+                high = min(low + chunk_size - 1, end)
+                if (year, low, high) in existing:
+                    continue
+                chunks.append(self._chunk(next_id, year, low, high))
+                next_id += 1
+                added += 1
+            state['meta']['published'] = ''  # 有新工作，完成後需要重新發佈
+        return added
+
+    def add_gaps(self, sequence_state, years, chunk_size=20, retry_after=3600):
+        """依序號狀態索引，把需要補爬的連續區間加入佇列"""
+        added = 0
+        for year in years:
+            for start, end in sequence_state.ranges(year, retry_after=retry_after):
+                added += self.add_range(year, start, end, chunk_size)
+        return added
+
+    @staticmethod
+    def _chunk(chunk_id, year, start, end):
+        return {'id': chunk_id, 'year': year, 'start': start, 'end': end, 'nextSeq': start, 'cursor': start,
+                'state': PENDING, 'owner': None, 'expires': 0.0, 'attempts': 0, 'updated': time.time()}
+
+    # ---- 租約 ----
+
+    def lease(self, worker, lease_seconds=120):
+        """租用一個區塊：待分派 → 自己先前的區塊 → 租約已過期 → 偷取進行中區塊的後半段
+
+        Returns:
+            區塊 dict（從 chunk['nextSeq'] 爬到 chunk['end']），沒有可分派的工作時為 None
+        """
+        now = time.time()
+        with self.backend.transaction() as state:
+            chunks = state['chunks']
+            chunk = next((c for c in chunks if c['state'] == PENDING), None)
+            if chunk is None:
+                # 同名 worker 重新啟動時先拿回自己的區塊（不論租約是否到期）
+                chunk = next((c for c in chunks if c['state'] == LEASED and c['owner'] == worker), None)
+                if chunk is not None:
+                    print(f"🔁 取回自己的區塊 #{chunk['id']}: "
+                          f"{chunk['year']}年 {chunk['nextSeq']:05d}-{chunk['end']:05d}")
+            if chunk is None:
+                chunk = next((c for c in chunks if c['state'] == LEASED and c['expires'] < now), None)
+                if chunk is not None:
+                    print(f"♻️ 接手過期租約 #{chunk['id']} ({chunk['owner']}): "
+                          f"{chunk['year']}年 {chunk['nextSeq']:05d}-{chunk['end']:05d}")
+            if chunk is None:
+                chunk = self._steal(chunks, worker)
+            if chunk is None:
+                return None
+            chunk.update(state=LEASED, owner=worker, expires=now + lease_seconds, cursor=chunk['nextSeq'],
+                         attempts=chunk['attempts'] + 1, updated=now)
+            return dict(chunk)
+
+    def _steal(self, chunks, worker):
+        """把剩餘最多的進行中區塊切成兩半，原持有者保留前半段，後半段成為新區塊"""
+        leased = [c for c in chunks if c['state'] == LEASED and c['owner'] != worker]
+        victim = max(leased, key=lambda c: c['end'] - c['cursor'], default=None)
+        if victim is None or victim['end'] - victim['cursor'] + 1 < 2 * self.min_steal:
+            return None
+        mid = victim['cursor'] + (victim['end'] - victim['cursor'] + 1) // 2
+        stolen = self._chunk(max(c['id'] for c in chunks) + 1, victim['year'], mid, victim['end'])
+        victim['end'] = mid - 1
+        chunks.append(stolen)
+        print(f"🤝 從 {victim['owner']} 的區塊 #{victim['id']} 分得 {stolen['year']}年 "
+              f"{stolen['start']:05d}-{stolen['end']:05d}")
+        return stolen
+
+    def _owned(self, state, chunk_id, worker):
+        chunk = next((c for c in state['chunks'] if c['id'] == chunk_id), None)
+        if chunk is None or chunk['state'] != LEASED or chunk['owner'] != worker:
+            return None
+        return chunk
+
+    def renew(self, chunk_id, worker, cursor, next_seq=None, lease_seconds=120):
+        """續約並回報進度
+
+        Args:
+            cursor: 下一個要爬的序號（偷取時由此切分）
+            next_seq: 已上傳到的下一個序號（租約過期時由此接手），None 表示不變
+
+        Returns:
+            區塊目前的結束序號（可能已被偷走後半段而縮短），租約已失去時為 None
+        """
+        with self.backend.transaction() as state:
+            chunk = self._owned(state, chunk_id, worker)
+            if chunk is None:
+                return None
+            now = time.time()
+            chunk.update(cursor=cursor, expires=now + lease_seconds, updated=now)
+            if next_seq is not None:
+                chunk['nextSeq'] = next_seq
+            return chunk['end']
+
+    def complete(self, chunk_id, worker):
+        """區塊完成（資料已上傳）；租約已被接手時回傳 False"""
+        with self.backend.transaction() as state:
+            chunk = self._owned(state, chunk_id, worker)
+            if chunk is None:
+                return False
+            chunk.update(state=DONE, nextSeq=chunk['end'] + 1, cursor=chunk['end'] + 1, owner=None,
+                         expires=0.0, updated=time.time())
+            return True
+
+    def release(self, chunk_id, worker, next_seq):
+        """歸還區塊（worker 正常結束但未完成），其他 worker 立即可從 next_seq 接手"""
+        with self.backend.transaction() as state:
+            chunk = self._owned(state, chunk_id, worker)
+            if chunk is None:
+                return False
+            chunk.update(state=PENDING, nextSeq=next_seq, cursor=next_seq, owner=None, expires=0.0,
+                         updated=time.time())
+            return True
+
+    def claim_publish(self, worker):
+        """所有區塊完成後，只有第一個呼叫的 worker 取得發佈（壓實）的權利"""
+        with self.backend.transaction() as state:
+            if any(c['state'] != DONE for c in state['chunks']) or state['meta'].get('published'):
+                return False
+            state['meta']['published'] = worker
+            return True
+
+    # ---- 查詢 ----
+
+    def chunks(self):
+        with self.backend.transaction() as state:
+            return [dict(c) for c in state['chunks']]
+
+    def unfinished(self):
+        return sum(1 for c in self.chunks() if c['state'] != DONE)
+
+    def status(self):
+        """{年份: {'chunks', 'done', 'leased', 'pending', 'remaining'}} 與進行中的區塊"""
+        years = {}
+        active = []
+        now = time.time()
+        for chunk in self.chunks():
+            summary = years.setdefault(chunk['year'], {'chunks': 0, DONE: 0, LEASED: 0, PENDING: 0, 'remaining': 0})
+            summary['chunks'] += 1
+            summary[chunk['state']] += 1
+            if chunk['state'] != DONE:
+                summary['remaining'] += chunk['end'] - chunk['cursor'] + 1
+            if chunk['state'] == LEASED:
+                active.append({**chunk, 'expired': chunk['expires'] < now})
+        return years, active
+
+
+class QueueWorker:
+    """從佇列租用區塊並以爬蟲逐一爬取
+
+    Args:
+        crawler: OptimizedCrawler
+        queue: WorkQueue
+        worker_id: worker 名稱（同一名稱重新啟動時會補上傳自己日誌中未上傳的資料）
+        lease_seconds: 租約期限，應大於單一序號最長的爬取時間
+        poll_interval: 暫時沒有可分派的工作（其他 worker 仍在進行）時的等待秒數
+    """
+
+    def __init__(self, crawler, queue, worker_id=None, lease_seconds=120, poll_interval=10):
+        self.crawler = crawler
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.chunks_done = 0
+        self.cursor = self.committed = None  # 目前區塊：下一個要爬的序號 / 已上傳到的下一個序號
+
+        # 每個 worker 各自一份日誌；壓實只在佇列全部完成後由一個 worker 進行（避免多個行程同時壓實）
+        crawler.journal.close()
+        crawler.journal = CrawlJournal(f"crawl-journal-{self.worker_id}.jsonl")
+        crawler.compact_every = float('inf')
+        # 中斷時歸還區塊即可，不走爬蟲的 save_progress（其中會壓實發佈）
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    def run(self):
+        crawler = self.crawler
+        crawler.recover()
+        print(f"👷 Worker {self.worker_id} 加入佇列")
+        print("=" * 70)
+        while True:
+            chunk = self.queue.lease(self.worker_id, self.lease_seconds)
+            if chunk is None:
+                if self.queue.unfinished() == 0:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            try:
+                self.crawl_chunk(chunk)
+            except KeyboardInterrupt:
+                print("\n🛑 用戶中斷，歸還區塊")
+                if self.flush():
+                    self.committed = self.cursor
+                self.queue.release(chunk['id'], self.worker_id, self.committed)
+                break
+
+        self.flush()
+        if self.queue.claim_publish(self.worker_id):
+            print("\n📢 佇列已全部完成，壓實發佈...")
+            crawler.publish()
+        print(f"\n✅ Worker {self.worker_id} 結束，完成 {self.chunks_done} 個區塊")
+        crawler.print_final_stats()
+
+    def flush(self):
+        """上傳已累積的資料；成功時已上傳的序號即可由他人接手"""
+        if not self.crawler.results:
+            return True
+        return self.crawler.flush_batch()
+
+    def crawl_chunk(self, chunk):
+        crawler = self.crawler
+        year, end = chunk['year'], chunk['end']
+        permit_type = 1
+        counters = {'no_data': 0, 'failed': 0}
+        self.committed = self.cursor = seq = chunk['nextSeq']
+        print(f"\n📦 區塊 #{chunk['id']}: {year}年 {seq:05d}-{end:05d}")
+
+        while seq <= end:
+            index_key = f"{year}{permit_type}{seq:05d}00"
+            print(f"🔍 [{seq:05d}] {index_key}...", end=' ', flush=True)
+            result = crawler.crawl_single_permit(index_key)
+            crawler.record_result(year, seq, index_key, result, counters, False)
+            self.cursor = seq = seq + 1
+            if len(crawler.results) >= crawler.batch_size:
+                self.flush()
+            if not crawler.results:
+                self.committed = seq  # 沒有待上傳的資料即可由此接手
+            end = self.queue.renew(chunk['id'], self.worker_id, seq, self.committed, self.lease_seconds)
+            if end is None:
+                print(f"\n⚠️ 區塊 #{chunk['id']} 租約已被接手，放棄剩餘序號")
+                return False
+
+        if not self.flush():
+            # 上傳失敗：保留在日誌中，歸還區塊讓他人（或自己）從最後已上傳處重爬
+            self.queue.release(chunk['id'], self.worker_id, self.committed)
+            return False
+        self.queue.complete(chunk['id'], self.worker_id)
+        self.chunks_done += 1
+        return True
+
+
+def print_status(queue):
+    years, active = queue.status()
+    if not years:
+        print("ℹ️ 佇列是空的")
+        return
+    print("📋 工作佇列:")
+    for year, s in sorted(years.items()):
+        print(f"   {year}年: {s['chunks']} 個區塊，完成 {s[DONE]}、進行中 {s[LEASED]}、待分派 {s[PENDING]}，"
+              f"剩餘 {s['remaining']} 個序號")
+    for chunk in active:
+        flag = ' (租約已過期)' if chunk['expired'] else ''
+        print(f"   👷 {chunk['owner']}: #{chunk['id']} {chunk['year']}年 {chunk['cursor']:05d}/"
+              f"{chunk['end']:05d}{flag}")
+
+
+if __name__ == "__main__":
+    queue = WorkQueue(open_backend(os.environ.get('WORK_QUEUE', DEFAULT_PATH)))
+    if len(sys.argv) > 4 and sys.argv[1] == "add":
+        year, start, end = int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4])
+        chunk_size = int(sys.argv[5]) if len(sys.argv) > 5 else 20
+        print(f"✅ 加入 {queue.add_range(year, start, end, chunk_size)} 個區塊")
+    elif len(sys.argv) > 1 and sys.argv[1] == "add-gaps":
+        from sequence_state import SequenceStateIndex
+        index = SequenceStateIndex()
+        years = [int(y) for y in sys.argv[2:]] or sorted(index.years)
+        print(f"✅ 加入 {queue.add_gaps(index, years)} 個區塊")
+    elif len(sys.argv) > 1 and sys.argv[1] == "status":
+        print_status(queue)
+    else:
+        print(__doc__)
@@ -102,10 +102,13 @@ def test_page_fetch():
     test_index_key = "11410000100"
     
     try:
-        response = crawler.fetch_page_with_retry(test_index_key)
+        response = crawler.fetch_page(test_index_key)
         
-        if response and response.status_code == 200:
-            if '建築執照號碼' in response.text:
+        if response == "NO_DATA":
+            print("❌ 查無資料")
+            return False
+        elif response and response.status_code == 200:
+            if '建造執照號碼' in response.text:
                 print("✅ 頁面獲取成功且包含建照資料")
                 return True
             else: